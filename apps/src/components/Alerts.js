@@ -187,12 +187,68 @@ function Alerts({ showToast }) {
     }
   }, [showToast]);
 
-  // جلب التنبيهات عند تحميل المكون
+  // جلب التنبيهات عند تحميل المكون، ثم تحديث دوري كل 5 دقائق (يعمل دائماً كاحتياط)،
+  // وتحديث فوري عند وصول أحداث التغيير من الخادم (SSE) إذا كان الخادم يعمل عبر ASGI
   useEffect(() => {
     fetchAlerts();
-    // يمكن إضافة تحديث دوري للتنبيهات هنا، مثلاً كل 5 دقائق
     const intervalId = setInterval(fetchAlerts, 5 * 60 * 1000); // كل 5 دقائق
-    return () => clearInterval(intervalId); // تنظيف عند إلغاء تحميل المكون
+    const authToken = localStorage.getItem('authToken');
+    if (!authToken) {
+      return () => clearInterval(intervalId);
+    }
+    let eventSource = null;
+    let refreshTimeoutId = null;
+    let reconnectTimeoutId = null;
+    let lastEventId = null;
+    let stopped = false;
+    const scheduleRefresh = () => {
+      // تجميع الأحداث المتتالية في طلب تحديث واحد
+      clearTimeout(refreshTimeoutId);
+      refreshTimeoutId = setTimeout(fetchAlerts, 1000);
+    };
+    const connect = async () => {
+      try {
+        // تذكرة قصيرة العمر بدلاً من وضع التوكن في الرابط (يظهر في سجلات الخادم)
+        const response = await fetch(`${API_BASE_URL}/events/ticket/`, {
+          method: 'POST',
+          headers: { 'Authorization': `Token ${authToken}` },
+        });
+        if (!response.ok || stopped) {
+          return; // 501: الخادم يعمل عبر WSGI، الاستطلاع الدوري يكفي
+        }
+        const { ticket } = await response.json();
+        const resume = lastEventId ? `&last_event_id=${encodeURIComponent(lastEventId)}` : '';
+        eventSource = new EventSource(`${API_BASE_URL}/events/?ticket=${encodeURIComponent(ticket)}${resume}`);
+        eventSource.addEventListener('change', (event) => {
+          lastEventId = event.lastEventId;
+          const change = JSON.parse(event.data);
+          if (['printjob', 'photosession', 'paymentreceipt'].includes(change.model)) {
+            scheduleRefresh();
+          }
+        });
+        // الخادم يطلب إعادة التحميل الكامل (فقدان أحداث أثناء الانقطاع)
+        eventSource.addEventListener('reset', scheduleRefresh);
+        eventSource.onerror = () => {
+          // التذكرة صالحة لدقيقة فقط: عند انقطاع الاتصال نطلب تذكرة جديدة بعد قليل
+          eventSource.close();
+          if (!stopped) {
+            reconnectTimeoutId = setTimeout(connect, 5000);
+          }
+        };
+      } catch (err) {
+        console.error("تعذر الاتصال ببث التغييرات:", err);
+      }
+    };
+    connect();
+    return () => { // تنظيف عند إلغاء تحميل المكون
+      stopped = true;
+      clearInterval(intervalId);
+      clearTimeout(refreshTimeoutId);
+      clearTimeout(reconnectTimeoutId);
+      if (eventSource) {
+        eventSource.close();
+      }
+    };
   }, [fetchAlerts]);
 
   if (loading) {
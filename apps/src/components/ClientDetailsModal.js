@@ -8,11 +8,7 @@ import {
   CheckCircleIcon, XCircleIcon // For delivered status
 } from '@heroicons/react/24/solid';
 import {
-  getClientById,
-  getClientPrintJobs,
-  getClientPaymentReceipts,
-  getClientTotalRemainingAmountCombined,
-  getClientPhotoSessions,
+  getClientOverview, // NEW: all client data in one batch request
   downloadPaymentReceiptPdf,
   generatePrintInvoicePdf,
   generatePhotoBookingReceiptPdf,
@@ -78,20 +74,13 @@ function ClientDetailsModal({ isOpen, onClose, clientId, initialTab = 'printing'
     setLoading(true);
     setError(null);
     try {
-      const details = await getClientById(authToken, clientId);
-      setClientDetails(details);
-
-      const printJobs = await getClientPrintJobs(authToken, clientId);
-      setClientPrintJobs(printJobs);
-
-      const photoSessions = await getClientPhotoSessions(authToken, clientId);
-      setClientPhotoSessions(photoSessions);
-
-      const receipts = await getClientPaymentReceipts(authToken, clientId);
-      setClientPaymentReceipts(receipts);
-
-      const remainingAmountData = await getClientTotalRemainingAmountCombined(authToken, clientId);
-      setTotalRemainingAmount(remainingAmountData.total_remaining_amount);
+      // طلب واحد (/api/batch/) بدلاً من خمسة طلبات منفصلة
+      const overview = await getClientOverview(authToken, clientId);
+      setClientDetails(overview.details);
+      setClientPrintJobs(overview.printJobs);
+      setClientPhotoSessions(overview.photoSessions);
+      setClientPaymentReceipts(overview.receipts);
+      setTotalRemainingAmount(overview.totalRemainingAmount);
 
     } catch (err) {
       console.error('Error fetching client details and related data:', err);
@@ -325,6 +325,57 @@
     };
 
 
+    /**
+     * تنفيذ عدة طلبات API في رحلة واحدة عبر /api/batch/.
+     * @param {string} authToken - توكن المصادقة.
+     * @param {Array} requests - مصفوفة من {id, method, path, body}، حيث path يبدأ بـ /api/.
+     * @param {boolean} atomic - تنفيذ الطلبات داخل معاملة واحدة.
+     * @returns {Promise<Object>} - كائن يربط id كل طلب باستجابته {status, headers, body}.
+     */
+    export const batchRequests = async (authToken, requests, atomic = false) => {
+      const response = await fetch(`${API_BASE_URL}/batch/`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': `Token ${authToken}`,
+        },
+        body: JSON.stringify({ requests, atomic }),
+      });
+      if (!response.ok) {
+        const errorData = await response.json();
+        throw new Error(errorData.detail || 'فشل تنفيذ الطلبات المجمعة');
+      }
+      const data = await response.json();
+      return Object.fromEntries(data.responses.map((item, index) => [item.id ?? index, item]));
+    };
+
+    /**
+     * جلب تفاصيل العميل وكل البيانات المرتبطة به في طلب واحد.
+     * @param {string} authToken - توكن المصادقة.
+     * @param {number} clientId - معرف العميل.
+     * @returns {Promise<Object>} - {details, printJobs, photoSessions, receipts, totalRemainingAmount}.
+     */
+    export const getClientOverview = async (authToken, clientId) => {
+      const responses = await batchRequests(authToken, [
+        { id: 'details', method: 'GET', path: `/api/clients/${clientId}/` },
+        { id: 'printJobs', method: 'GET', path: `/api/clients/${clientId}/printjobs/` },
+        { id: 'photoSessions', method: 'GET', path: `/api/clients/${clientId}/photosessions/` },
+        { id: 'receipts', method: 'GET', path: `/api/clients/${clientId}/receipts/` },
+        { id: 'remaining', method: 'GET', path: `/api/clients/${clientId}/total-remaining-amount-combined/` },
+      ], true);
+      const failed = Object.values(responses).find((item) => item.status >= 400);
+      if (failed) {
+        throw new Error((failed.body && failed.body.detail) || 'فشل جلب تفاصيل العميل');
+      }
+      return {
+        details: responses.details.body,
+        printJobs: responses.printJobs.body,
+        photoSessions: responses.photoSessions.body,
+        receipts: responses.receipts.body,
+        totalRemainingAmount: responses.remaining.body.total_remaining_amount,
+      };
+    };
+
     // ===========================================================================
     // وظائف طلبات الطباعة (Print Jobs)
     // ===========================================================================
@@ -1,10 +1,88 @@
 # C:\Users\SAMAH\Downloads\api\stapi\print\admin.py
 
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin # استيراد UserAdmin الأصلي
 from django.contrib.auth.models import User
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+from django.db import DatabaseError, connections, transaction
+from django.utils.functional import cached_property
 # استيراد النماذج الجديدة: PhotographyPackage, Photographer, PhotoSession
-from .models import Client, PrintJob, PaymentReceipt, Profile, PhotographyPackage, Photographer, PhotoSession
+from .models import Client, PrintJob, PaymentReceipt, Profile, PhotographyPackage, Photographer, PhotoSession, CalendarFeed, BulkExport
+from . import bulk_exports, client_search, exports
+
+    # ===========================================================================
+    # ترقيم صفحات بعدد تقديري للجداول الكبيرة
+    # ===========================================================================
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for admin changelists of large tables. An unfiltered list takes its row
+    count from the database statistics (PostgreSQL reltuples, SQLite sqlite_stat1 after
+    ANALYZE, else MAX(id) - MIN(id) + 1) instead of COUNT(*) over the whole table.
+    Filtered lists and tables below ADMIN_EXACT_COUNT_LIMIT rows are counted exactly.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > getattr(settings, 'ADMIN_EXACT_COUNT_LIMIT', 10000):
+                return estimate
+        return super().count
+
+
+def estimated_row_count(model, using):
+    connection = connections[using]
+    table = model._meta.db_table
+    try:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [connection.ops.quote_name(table)])
+            elif connection.vendor == 'sqlite':
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+            else:
+                cursor.execute('SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s', [table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        # sqlite_stat1 غير موجود قبل تشغيل ANALYZE
+        row = None
+    if row is not None and row[0] is not None:
+        estimate = int(str(row[0]).split()[0])
+        if estimate >= 0:
+            return estimate
+    # استعلامان منفصلان: كل منهما قراءة واحدة من طرف فهرس المفتاح الأساسي
+    ids = model._default_manager.using(using).order_by('pk').values_list('pk', flat=True)
+    first, last = ids.first(), ids.last()
+    if first is None:
+        return 0
+    return last - first + 1
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Defaults for tables with tens of thousands of rows: no second COUNT(*) for the
+    "N total" link, estimated pagination and ordering by the primary key index.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    ordering = ('-id',)
+
+    # ===========================================================================
+    # إجراءات جماعية: مستندات PDF (ZIP) و CSV للسجلات المحددة (print/bulk_exports.py)
+    # ===========================================================================
+@admin.action(description='تنزيل مستندات PDF للسجلات المحددة (ZIP)')
+def export_pdf_zip(modeladmin, request, queryset):
+    return bulk_exports.run_admin_action(modeladmin, request, queryset, 'pdf_zip')
+
+
+@admin.action(description='تصدير السجلات المحددة (CSV)')
+def export_csv(modeladmin, request, queryset):
+    return bulk_exports.run_admin_action(modeladmin, request, queryset, 'csv')
 
     # ===========================================================================
     # تسجيل النماذج في لوحة الإدارة
@@ -12,32 +90,41 @@ from .models import Client, PrintJob, PaymentReceipt, Profile, PhotographyPackag
 
     # تسجيل نموذج العميل
 @admin.register(Client)
-class ClientAdmin(admin.ModelAdmin):
+class ClientAdmin(LargeTableAdmin):
     list_display = ('name', 'phone', 'email', 'created_at')
-    search_fields = ('name', 'phone', 'email')
+    # بحث بالبادئة على الاسم الموحد وأرقام الهاتف (مستخدم أيضاً في autocomplete_fields)، انظر get_search_results
+    search_fields = ('normalized_name', 'phone_digits')
     list_filter = ('created_at',)
-    ordering = ('-created_at',)
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        return queryset.filter(client_search.search_q(search_term)), False
 
     # تسجيل نموذج طلب الطباعة
 @admin.register(PrintJob)
-class PrintJobAdmin(admin.ModelAdmin):
+class PrintJobAdmin(LargeTableAdmin):
     list_display = ('receipt_number', 'client', 'print_type', 'size', 'total_amount', 'paid_amount', 'remaining_amount', 'status', 'delivery_date', 'issued_by')
-    list_filter = ('status', 'print_type', 'size', 'delivery_date')
-    search_fields = ('receipt_number', 'client__name', 'notes', 'issued_by')
-    raw_id_fields = ('client',) # لتحسين أداء اختيار العميل إذا كان هناك عدد كبير من العملاء
-    date_hierarchy = 'created_at'
-    ordering = ('-created_at',)
+    list_select_related = ('client', 'issued_by')
+    # created_at كفلتر بدلاً من date_hierarchy (الذي يجمع السنوات والأشهر من الجدول كاملاً)
+    list_filter = ('status', 'print_type', 'size', 'delivery_date', 'created_at')
+    search_fields = ('=receipt_number', '^client__name', '=client__phone')
+    autocomplete_fields = ('client',) # بحث في العملاء بدلاً من تحميلهم كلهم في قائمة
+    actions = (export_pdf_zip, export_csv)
     readonly_fields = ('remaining_amount', 'receipt_number', 'issued_by') # جعل هذه الحقول للقراءة فقط في لوحة الإدارة
 
     # تسجيل نموذج إيصال الدفع
 @admin.register(PaymentReceipt)
-class PaymentReceiptAdmin(admin.ModelAdmin):
+class PaymentReceiptAdmin(LargeTableAdmin):
     # تم إزالة 'booking' من list_display و raw_id_fields
     list_display = ('receipt_number', 'receipt_type', 'printing', 'total_amount', 'paid_amount', 'payment_method', 'issued_by', 'date_issued')
+    # printing.__str__ يعرض اسم العميل
+    list_select_related = ('printing__client', 'issued_by')
     list_filter = ('receipt_type', 'payment_method', 'date_issued')
-    search_fields = ('receipt_number', 'issued_by', 'notes')
-    raw_id_fields = ('printing',) # تم إزالة 'booking'
-    ordering = ('-date_issued',)
+    search_fields = ('=receipt_number', '=printing__receipt_number', '=photography_session__receipt_number')
+    autocomplete_fields = ('printing', 'photography_session')
+    actions = (export_pdf_zip, export_csv)
     readonly_fields = ('date_issued',) # تاريخ الإصدار يتم تعيينه تلقائياً
 
     # ===========================================================================
@@ -58,15 +145,62 @@ class PhotographerAdmin(admin.ModelAdmin):
     ordering = ('name',)
 
 @admin.register(PhotoSession)
-class PhotoSessionAdmin(admin.ModelAdmin):
+class PhotoSessionAdmin(LargeTableAdmin):
     list_display = ('receipt_number', 'client', 'package', 'photographer', 'session_date', 'total_amount', 'paid_amount', 'remaining_amount', 'status', 'issued_by')
+    list_select_related = ('client', 'package', 'photographer', 'issued_by')
     list_filter = ('status', 'session_date', 'package', 'photographer')
-    search_fields = ('receipt_number', 'client__name', 'location', 'notes')
-    raw_id_fields = ('client', 'package', 'photographer') # لتحسين الأداء
-    date_hierarchy = 'session_date'
+    search_fields = ('=receipt_number', '^client__name', '=client__phone')
+    autocomplete_fields = ('client', 'package', 'photographer')
+    # يطابق الفهرس (session_date, session_time)
     ordering = ('-session_date', '-session_time')
+    actions = (export_pdf_zip, export_csv)
     readonly_fields = ('remaining_amount', 'receipt_number', 'issued_by') # جعل هذه الحقول للقراءة فقط
 
+@admin.register(CalendarFeed)
+class CalendarFeedAdmin(admin.ModelAdmin):
+    list_display = ('name', 'photographer', 'is_active', 'created_at')
+    list_select_related = ('photographer',)
+    list_filter = ('is_active',)
+    readonly_fields = ('token', 'created_by')
+
+@admin.register(BulkExport)
+class BulkExportAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'kind', 'model_name', 'row_count', 'status', 'created_by', 'download_link')
+    list_filter = ('status', 'kind')
+    list_select_related = ('created_by',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        # كل موظف يرى ملفاته فقط
+        return queryset if request.user.is_superuser else queryset.filter(created_by=request.user)
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/', self.admin_site.admin_view(self.download_view), name='print_bulkexport_download'),
+        ] + super().get_urls()
+
+    @admin.display(description='التنزيل')
+    def download_link(self, obj):
+        if obj.status != 'done':
+            return obj.error or '-'
+        return format_html('<a href="{}">تنزيل</a>', reverse('admin:print_bulkexport_download', args=[obj.pk]))
+
+    def download_view(self, request, pk):
+        export = get_object_or_404(self.get_queryset(request), pk=pk, status='done')
+        if not self.has_view_permission(request, export):
+            raise PermissionDenied
+        extension = 'zip' if export.kind == 'pdf_zip' else 'csv'
+        return exports.StreamingFileResponse(
+            open(bulk_exports.absolute_path(export.file_path), 'rb'), as_attachment=True,
+            filename=f'{export.model_name}_{export.pk}.{extension}',
+        )
+
     # ===========================================================================
     # دمج Profile مع User في لوحة الإدارة
     # ===========================================================================
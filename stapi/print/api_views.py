@@ -1,44 +1,50 @@
 # C:\Users\SAMAH\Downloads\api\stapi\print\api_views.py
 
-from rest_framework import viewsets, status
+from rest_framework import viewsets, mixins, status, serializers
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from django.shortcuts import get_object_or_404
+from django.http import Http404
 from django.urls import reverse
 from django.conf import settings
-from django.template.loader import render_to_string
-from weasyprint import HTML, CSS
-from django.contrib.staticfiles.storage import staticfiles_storage
 from django.utils import timezone
 import json
+from datetime import date, datetime
 from decimal import Decimal
-import qrcode
-import io
-import base64
-from django.http import HttpResponse
 
 from rest_framework.views import APIView
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.authtoken.models import Token
 
 from django.contrib.auth.models import User
 from django.db import models
-from django.db.models import Q
+from django.db.models import Q, F, Sum, Value, OuterRef, Subquery, Prefetch, DecimalField
+from django.db.models.functions import Coalesce
+from rest_framework.pagination import PageNumberPagination
 
 # استيراد النماذج
-from .models import Client, PrintJob, PaymentReceipt, Profile, PhotographyPackage, Photographer, PhotoSession
+from .models import (
+    Client, PrintJob, PaymentReceipt, Profile, PhotographyPackage, Photographer, PhotoSession, REMAINING_AMOUNT,
+    ArchivedPrintJob, ArchivedPhotoSession, ArchivedPaymentReceipt, SessionPhoto, CalendarFeed, new_feed_token,
+)
+from .normalization import digits_only, normalize_name
 # استيراد Serializers
 from .serializers import (
     ClientSerializer, PrintJobSerializer, PaymentReceiptSerializer, UserSerializer,
-    ProfileSerializer, PhotographyPackageSerializer, PhotographerSerializer, PhotoSessionSerializer
+    ProfileSerializer, PhotographyPackageSerializer, PhotographerSerializer, PhotoSessionSerializer,
+    BatchRequestSerializer, DashboardPrintJobSerializer, DashboardPhotoSessionSerializer,
+    SessionPhotoSerializer, SessionPhotoUploadSerializer, CalendarFeedSerializer, photographer_cache,
 )
+from .mixins import ReplicaRoutingMixin, ConditionalGetMixin, ResponseCacheMixin, DeltaSyncMixin, ExportMixin, ArchiveMixin
+from .authentication import CachedTokenAuthentication
+from .permissions import IsManager, is_manager
+from . import availability, batch, client_search, exports, ledger, photos, rendering
 
 # ===========================================================================
 # View لإدارة تسجيل الخروج (Logout)
 # ===========================================================================
 class LogoutView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
@@ -52,13 +58,72 @@ class LogoutView(APIView):
 # View لبيانات المستخدم الحالي (CurrentUserView) - مفصولة عن UserViewSet
 # ===========================================================================
 class CurrentUserView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         serializer = UserSerializer(request.user)
         return Response(serializer.data)
 
+# ===========================================================================
+# View لتنفيذ عدة طلبات في رحلة واحدة (Batch)
+# ===========================================================================
+class BatchView(APIView):
+    """
+    POST {"requests": [{"id": "client", "method": "GET", "path": "/api/clients/1/"}, ...],
+          "atomic": false}
+    Runs every sub-request through the URL resolver as the current user and returns
+    {"responses": [{"id", "status", "headers", "body"}, ...]} in the same order.
+    """
+    permission_classes = [IsAuthenticated]
+    # دفعة داخل دفعة تضاعف العمل في كل مستوى (print/batch.py)
+    allowed_in_batch = False
+
+    def post(self, request):
+        serializer = BatchRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        responses = batch.run_batch(
+            request, serializer.validated_data['requests'], atomic=serializer.validated_data['atomic']
+        )
+        return Response({'responses': responses})
+
+
+# ===========================================================================
+# View لمطابقة المبالغ المدفوعة مع إيصالات الدفع (للمدير فقط)
+# ===========================================================================
+class LedgerReconciliationView(APIView):
+    """
+    GET  ?model=printjob|photosession&limit=100 -> {"reports": [...]} of the rows whose
+         paid_amount differs from the sum of their receipts.
+    POST {"repair": true} -> sets paid_amount to the receipts total for those rows and
+         returns the report taken before the repair plus {"repaired": {model: count}}.
+    """
+    permission_classes = [IsAuthenticated, IsManager]
+
+    def _model_names(self, request):
+        model_name = request.query_params.get('model') or (request.data.get('model') if request.method == 'POST' else None)
+        if not model_name:
+            return list(ledger.LEDGER_MODELS)
+        if model_name not in ledger.LEDGER_MODELS:
+            raise serializers.ValidationError({'model': f"نوع غير معروف، القيم المسموحة: {', '.join(ledger.LEDGER_MODELS)}"})
+        return [model_name]
+
+    def _limit(self, request):
+        try:
+            return max(0, min(int(request.query_params.get('limit', 100)), 1000))
+        except ValueError:
+            raise serializers.ValidationError({'limit': 'يجب أن يكون رقماً صحيحاً.'})
+
+    def get(self, request):
+        model_names, limit = self._model_names(request), self._limit(request)
+        return Response({'reports': [ledger.report(name, limit) for name in model_names]})
+
+    def post(self, request):
+        model_names, limit = self._model_names(request), self._limit(request)
+        result = {'reports': [ledger.report(name, limit) for name in model_names]}
+        if request.data.get('repair'):
+            result['repaired'] = {name: ledger.repair(name) for name in model_names}
+        return Response(result)
 
 # ===========================================================================
 # ViewSet للمستخدمين (Users) - تم التعديل لصلاحيات أكثر مرونة
@@ -69,102 +134,221 @@ class UserViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        if self.request.user.is_staff or (hasattr(self.request.user, 'profile') and self.request.user.profile.role == 'manager'):
+        if is_manager(self.request.user):
             return User.objects.all().select_related('profile').order_by('username')
-        return User.objects.filter(id=self.request.user.id).select_related('profile')
+        return User.objects.filter(id=self.request.user.id).select_related('profile').order_by('username')
 
     def perform_create(self, serializer):
-        if not (self.request.user.is_staff or (hasattr(self.request.user, 'profile') and self.request.user.profile.role == 'manager')):
+        if not is_manager(self.request.user):
             raise serializers.ValidationError({"detail": "ليس لديك صلاحية لإنشاء مستخدمين."})
         role = self.request.data.get('role', 'employee')
-        if role == 'manager' and not (self.request.user.is_staff or (hasattr(self.request.user, 'profile') and self.request.user.profile.role == 'manager')):
+        if role == 'manager' and not is_manager(self.request.user):
             raise serializers.ValidationError({"detail": "ليس لديك صلاحية لإنشاء مستخدم بدور مدير."})
         serializer.save()
 
     def perform_update(self, serializer):
-        is_manager = self.request.user.is_staff or (hasattr(self.request.user, 'profile') and self.request.user.profile.role == 'manager')
-        if self.get_object() != self.request.user and not is_manager:
+        user_is_manager = is_manager(self.request.user)
+        target_user = serializer.instance
+        if target_user != self.request.user and not user_is_manager:
             raise serializers.ValidationError({"detail": "ليس لديك صلاحية لتعديل مستخدمين آخرين."})
 
         if 'role' in self.request.data:
             new_role = self.request.data['role']
-            current_user_profile = self.get_object().profile if hasattr(self.get_object(), 'profile') else None
+            current_user_profile = target_user.profile if hasattr(target_user, 'profile') else None
             current_user_role = current_user_profile.role if current_user_profile else None
 
-            if not is_manager:
+            if not user_is_manager:
                 if new_role != current_user_role:
                     raise serializers.ValidationError({"detail": "ليس لديك صلاحية لتغيير دور المستخدم."})
             else:
-                if self.get_object() == self.request.user and new_role == 'employee':
+                if target_user == self.request.user and new_role == 'employee':
                     if User.objects.filter(profile__role='manager').count() <= 1:
                         raise serializers.ValidationError({"detail": "يجب أن يكون هناك مدير واحد على الأقل في النظام."})
         serializer.save()
 
     def perform_destroy(self, instance):
-        if not (self.request.user.is_staff or (hasattr(self.request.user, 'profile') and self.request.user.profile.role == 'manager')):
+        if not is_manager(self.request.user):
             raise serializers.ValidationError({"detail": "ليس لديك صلاحية لحذف المستخدمين."})
         if hasattr(instance, 'profile') and instance.profile.role == 'manager':
             if User.objects.filter(profile__role='manager').count() <= 1:
                 raise serializers.ValidationError({"detail": "لا يمكن حذف المدير الأخير في النظام."})
         instance.delete()
 
+# ===========================================================================
+# الرصيد المتبقي للعميل محسوباً في SQL + أدوات لوحة العميل
+# ===========================================================================
+def _outstanding_subquery(model):
+    remaining = (
+        model.objects.filter(client=OuterRef('pk')).order_by().values('client')
+        .annotate(total=Sum(REMAINING_AMOUNT)).values('total')
+    )
+    return Coalesce(Subquery(remaining), Value(Decimal('0.00')), output_field=DecimalField(max_digits=12, decimal_places=2))
+
+
+def with_outstanding_balance(queryset):
+    """
+    Annotate clients with print_jobs_outstanding, photo_sessions_outstanding and
+    outstanding_balance (one correlated subquery per table, no rows loaded).
+    """
+    return queryset.annotate(
+        print_jobs_outstanding=_outstanding_subquery(PrintJob),
+        photo_sessions_outstanding=_outstanding_subquery(PhotoSession),
+    ).annotate(outstanding_balance=F('print_jobs_outstanding') + F('photo_sessions_outstanding'))
+
+
+def _receipts_prefetch():
+    return Prefetch(
+        'payment_receipts',
+        queryset=PaymentReceipt.objects.select_related('issued_by').order_by('-date_issued'),
+    )
+
+
+class DashboardPagination(PageNumberPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def __init__(self, page_query_param):
+        self.page_query_param = page_query_param
+
+    def paginate(self, queryset, request, view, serializer_class):
+        page = self.paginate_queryset(queryset, request, view=view)
+        return self.get_paginated_response(serializer_class(page, many=True).data).data
+
 # ===========================================================================
 # ViewSet للعملاء
 # ===========================================================================
-class ClientViewSet(viewsets.ModelViewSet):
+class ClientViewSet(ReplicaRoutingMixin, ResponseCacheMixin, ConditionalGetMixin, DeltaSyncMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = Client.objects.all()
     serializer_class = ClientSerializer
     permission_classes = [IsAuthenticated]
+    # total_remaining_amount_on_jobs يعتمد على طلبات الطباعة وجلسات التصوير
+    etag_dependencies = (PrintJob, PhotoSession)
+    # الحد الأقصى للاستعلامات (يُفحص بواسطة QueryInspectorMiddleware في الوضع الصارم)
+    query_budget = {
+        'dashboard': 10, 'printjobs': 5, 'photosessions': 5, 'receipts': 4, 'total_remaining_amount_combined': 3,
+        'autocomplete': 4,
+    }
     filterset_fields = ['name', 'phone', 'email']
+    export_fields = ('id', 'name', 'phone', 'email', 'address', 'created_at', 'updated_at')
 
     def get_queryset(self):
         queryset = super().get_queryset()
         search_term = self.request.query_params.get('search', None)
         if search_term:
-            queryset = queryset.filter(
-                Q(name__icontains=search_term) |
-                Q(phone__icontains=search_term) |
-                Q(email__icontains=search_term)
-            )
+            # المطابقة على الاسم الموحد وأرقام الهاتف: "احمد" تطابق "أحمد" و"0791" تطابق "079 1..."
+            condition = Q(normalized_name__contains=normalize_name(search_term)) | Q(email__icontains=search_term)
+            digits = digits_only(search_term)
+            if digits:
+                condition |= Q(phone_digits__contains=digits)
+            queryset = queryset.filter(condition)
         return queryset
 
+    @action(detail=False, methods=['get'])
+    def autocomplete(self, request):
+        """
+        ?q=<part of the name or phone>[&limit=10]
+        Clients whose name (or a word of it) or phone starts with q, best matches first.
+        """
+        term = request.query_params.get('q', '').strip()
+        try:
+            limit = int(request.query_params.get('limit') or getattr(settings, 'CLIENT_AUTOCOMPLETE_LIMIT', 10))
+        except ValueError:
+            return Response({'detail': 'limit يجب أن يكون رقماً صحيحاً.'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, getattr(settings, 'CLIENT_AUTOCOMPLETE_MAX_LIMIT', 25)))
+        return Response({'results': client_search.autocomplete(term, limit) if term else []})
+
+    def get_annotated_object(self):
+        # نفس get_object لكن مع الرصيد المتبقي محسوباً في SQL
+        queryset = with_outstanding_balance(self.filter_queryset(self.get_queryset()))
+        client = get_object_or_404(queryset, pk=self.kwargs['pk'])
+        self.check_object_permissions(self.request, client)
+        return client
+
+    def _client_receipts(self, client):
+        # كل إيصال يتبع طلب طباعة أو جلسة تصوير، فالـ JOIN لا يكرر الصفوف ولا حاجة لـ distinct()
+        return PaymentReceipt.objects.filter(
+            Q(printing__client_id=client.pk) | Q(photography_session__client_id=client.pk)
+        ).select_related('printing', 'photography_session', 'issued_by').order_by('-date_issued')
+
     @action(detail=True, methods=['get'])
     def printjobs(self, request, pk=None):
-        client = self.get_object()
-        print_jobs = client.print_jobs.all()
+        client = self.get_annotated_object()
+        # الطلبات تُربط بنفس كائن العميل (المحسوب رصيده مسبقاً) فلا استعلامات لكل صف
+        print_jobs = client.print_jobs.select_related('issued_by').prefetch_related(_receipts_prefetch())
         serializer = PrintJobSerializer(print_jobs, many=True)
         return Response(serializer.data)
 
     @action(detail=True, methods=['get'])
     def receipts(self, request, pk=None):
         client = self.get_object()
-        receipts = PaymentReceipt.objects.filter(Q(printing__client=client) | Q(photography_session__client=client)).distinct().order_by('-date_issued')
-        serializer = PaymentReceiptSerializer(receipts, many=True)
+        serializer = PaymentReceiptSerializer(self._client_receipts(client), many=True)
         return Response(serializer.data)
 
     @action(detail=True, methods=['get'], url_path='photosessions')
     def photosessions(self, request, pk=None):
-        client = self.get_object()
-        photo_sessions = client.photo_sessions.all().order_by('-created_at')
+        client = self.get_annotated_object()
+        photo_sessions = client.photo_sessions.select_related('issued_by').order_by('-created_at')
         serializer = PhotoSessionSerializer(photo_sessions, many=True)
         return Response(serializer.data) # Fixed: changed serializer_sessions to serializer
 
     @action(detail=True, methods=['get'], url_path='total-remaining-amount-combined')
     def total_remaining_amount_combined(self, request, pk=None):
-        client = self.get_object()
-        total_remaining_print_jobs = sum(job.remaining_amount for job in client.print_jobs.all())
-        total_remaining_photo_sessions = sum(session.remaining_amount for session in client.photo_sessions.all())
-        total_combined_remaining = total_remaining_print_jobs + total_remaining_photo_sessions
-        return Response({'total_remaining_amount': total_combined_remaining})
+        client = self.get_annotated_object()
+        return Response({'total_remaining_amount': client.outstanding_balance})
+
+    @action(detail=True, methods=['get'])
+    def dashboard(self, request, pk=None):
+        """
+        Everything the client modal shows, in a fixed number of queries:
+        ?jobs_page=, ?sessions_page= and ?page_size= page the print jobs and photo sessions
+        (each with its receipts), ?timeline_limit= caps the merged receipt timeline.
+        """
+        client = self.get_annotated_object()
+        print_jobs = (
+            client.print_jobs.select_related('issued_by')
+            .prefetch_related(_receipts_prefetch()).order_by('-created_at', '-pk')
+        )
+        photo_sessions = (
+            client.photo_sessions.select_related('issued_by')
+            .prefetch_related(_receipts_prefetch()).order_by('-created_at', '-pk')
+        )
+        try:
+            timeline_limit = max(1, min(int(request.query_params.get('timeline_limit', 50)), 200))
+        except ValueError:
+            timeline_limit = 50
+
+        return Response({
+            'client': ClientSerializer(client).data,
+            'outstanding_balance': {
+                'print_jobs': client.print_jobs_outstanding,
+                'photo_sessions': client.photo_sessions_outstanding,
+                'total': client.outstanding_balance,
+            },
+            'print_jobs': DashboardPagination('jobs_page').paginate(
+                print_jobs, request, self, DashboardPrintJobSerializer
+            ),
+            'photo_sessions': DashboardPagination('sessions_page').paginate(
+                photo_sessions, request, self, DashboardPhotoSessionSerializer
+            ),
+            'receipt_timeline': PaymentReceiptSerializer(self._client_receipts(client)[:timeline_limit], many=True).data,
+        })
 
 # ===========================================================================
 # ViewSet لطلبات الطباعة
 # ===========================================================================
-class PrintJobViewSet(viewsets.ModelViewSet):
+class PrintJobViewSet(ReplicaRoutingMixin, ResponseCacheMixin, ConditionalGetMixin, DeltaSyncMixin, ExportMixin, ArchiveMixin, viewsets.ModelViewSet):
     queryset = PrintJob.objects.all().select_related('client', 'issued_by').order_by('-created_at')
+    archive_queryset = ArchivedPrintJob.objects.all().select_related('client', 'issued_by').order_by('-created_at')
     serializer_class = PrintJobSerializer
     permission_classes = [IsAuthenticated]
+    etag_dependencies = (Client, PhotoSession, PaymentReceipt)
     filterset_fields = ['status', 'print_type', 'size', 'client__name', 'receipt_number']
+    export_fields = (
+        'id', 'receipt_number', 'client_id', 'client__name', 'print_type', 'size',
+        'total_amount', 'paid_amount', 'remaining_amount', 'delivery_date', 'status', 'notes',
+        'issued_by__username', 'created_at', 'updated_at',
+    )
+    export_annotations = {'remaining_amount': REMAINING_AMOUNT}
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -248,39 +432,9 @@ class PrintJobViewSet(viewsets.ModelViewSet):
         if print_job.remaining_amount > 0:
             return Response({'detail': 'لا يمكن إنشاء فاتورة نهائية قبل دفع المبلغ بالكامل.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        company_info = {
-            'name': 'استوديو الإبداع',
-            'address': 'شارع الفن، مدينة الإبداع، 12345',
-            'phone': '01001234567',
-            'email': 'info@creative-studio.com',
-            'website': 'www.creative-studio.com',
-            'tax_id': 'VAT123456789',
-        }
-        company_logo_static_url = staticfiles_storage.url('images/logo.png')
-        qr_data = f"Print Job: {print_job.receipt_number}\nClient: {print_job.client.name}\nTotal: {print_job.total_amount}\nPaid: {print_job.paid_amount}"
-        qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4)
-        qr.add_data(qr_data)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = io.BytesIO()
-        img.save(buffer, format="PNG")
-        qr_code_base64 = base64.b64encode(buffer.getvalue()).decode()
-
-        context = {
-            'print_job': print_job,
-            'client': print_job.client,
-            'company': company_info,
-            'company_logo_absolute_url': company_logo_static_url,
-            'qr_code_base64': qr_code_base64,
-            'receipts': print_job.payment_receipts.all().order_by('date_issued'),
-        }
-        html_string = render_to_string('print/print_invoice_template.html', context)
-        html = HTML(string=html_string, base_url=request.build_absolute_uri('/'))
-        pdf_file = html.write_pdf()
-        response = HttpResponse(pdf_file, content_type='application/pdf')
+        context = rendering.print_job_invoice_context(print_job)
         file_name = f"final_invoice_printjob_{print_job.receipt_number}.pdf"
-        response['Content-Disposition'] = f'attachment; filename="{file_name}"'
-        return response
+        return rendering.render_pdf_response('print/print_invoice_template.html', context, request, file_name)
 
     @action(detail=True, methods=['get'], url_path='payment-receipts')
     def payment_receipts_list(self, request, pk=None):
@@ -293,11 +447,18 @@ class PrintJobViewSet(viewsets.ModelViewSet):
 # ===========================================================================
 # ViewSet لإيصالات الدفع
 # ===========================================================================
-class PaymentReceiptViewSet(viewsets.ModelViewSet):
+class PaymentReceiptViewSet(ReplicaRoutingMixin, ResponseCacheMixin, ConditionalGetMixin, DeltaSyncMixin, ExportMixin, ArchiveMixin, viewsets.ModelViewSet):
     queryset = PaymentReceipt.objects.all().select_related('printing', 'photography_session', 'issued_by').order_by('-date_issued')
+    archive_queryset = ArchivedPaymentReceipt.objects.all().select_related('printing', 'photography_session', 'issued_by').order_by('-date_issued')
     serializer_class = PaymentReceiptSerializer
     permission_classes = [IsAuthenticated]
+    etag_dependencies = (PrintJob, PhotoSession)
     filterset_fields = ['receipt_type', 'payment_method', 'issued_by__username', 'receipt_number']
+    export_fields = (
+        'id', 'receipt_number', 'receipt_type', 'printing_id', 'printing__receipt_number',
+        'photography_session_id', 'photography_session__receipt_number', 'total_amount',
+        'paid_amount', 'payment_method', 'notes', 'issued_by__username', 'date_issued', 'updated_at',
+    )
 
     def perform_create(self, serializer):
         # NEW: Ensure total_amount and paid_amount are handled correctly for direct creation
@@ -311,108 +472,48 @@ class PaymentReceiptViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'], url_path='generate-pdf-receipt')
     def generate_pdf_receipt(self, request, pk=None):
         receipt = self.get_object()
-        company_info = {
-            'name': 'استوديو الإبداع',
-            'address': 'شارع الفن، مدينة الإبداع، 12345',
-            'phone': '01001234567',
-            'email': 'info@creative-studio.com',
-            'website': 'www.creative-studio.com',
-            'tax_id': 'VAT123456789',
-        }
-        company_logo_static_url = staticfiles_storage.url('images/logo.png')
-        # Use receipt.paid_amount and receipt.total_amount for QR data
-        qr_data = f"Receipt: {receipt.receipt_number}\nPaid: {receipt.paid_amount}\nTotal: {receipt.total_amount}\nMethod: {receipt.payment_method}"
-        qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4)
-        qr.add_data(qr_data)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = io.BytesIO()
-        img.save(buffer, format="PNG")
-        qr_code_base64 = base64.b64encode(buffer.getvalue()).decode()
-
-        context = {
-            'receipt': receipt,
-            'printing': receipt.printing,
-            'photography_session': receipt.photography_session,
-            'company': company_info,
-            'company_logo_absolute_url': company_logo_static_url,
-            'qr_code_base64': qr_code_base64,
-            'remaining_amount': receipt.printing.remaining_amount if receipt.printing else (receipt.photography_session.remaining_amount if receipt.photography_session else Decimal('0.00')),
-        }
-        html_string = render_to_string('print/printing_receipt_template.html', context)
-        html = HTML(string=html_string, base_url=request.build_absolute_uri('/'))
-        pdf_file = html.write_pdf()
-        response = HttpResponse(pdf_file, content_type='application/pdf')
+        context = rendering.payment_receipt_context(receipt)
         file_name = f"payment_receipt_{receipt.receipt_number}.pdf"
-        response['Content-Disposition'] = f'attachment; filename="{file_name}"'
-        return response
+        return rendering.render_pdf_response('print/printing_receipt_template.html', context, request, file_name)
 
 # ===========================================================================
 # ViewSet لباقات التصوير
 # ===========================================================================
-class PhotographyPackageViewSet(viewsets.ModelViewSet):
+class PhotographyPackageViewSet(ReplicaRoutingMixin, ConditionalGetMixin, DeltaSyncMixin, viewsets.ModelViewSet):
     queryset = PhotographyPackage.objects.all().order_by('price')
     serializer_class = PhotographyPackageSerializer
-    permission_classes = [IsAuthenticated]
-    
-    def get_queryset(self):
-        if self.request.user.is_staff or (hasattr(self.request.user, 'profile') and self.request.user.profile.role == 'manager'):
-            return PhotographyPackage.objects.all().order_by('price')
-        raise Response({"detail": "ليس لديك صلاحية لعرض باقات التصوير."}, status=status.HTTP_403_FORBIDDEN)
-
-    def perform_create(self, serializer):
-        if not (self.request.user.is_staff or (hasattr(self.request.user, 'profile') and self.request.user.profile.role == 'manager')):
-            raise serializers.ValidationError({"detail": "ليس لديك صلاحية لإنشاء باقات تصوير جديدة."})
-        serializer.save()
-
-    def perform_update(self, serializer):
-        if not (self.request.user.is_staff or (hasattr(self.request.user, 'profile') and self.request.user.profile.role == 'manager')):
-            raise serializers.ValidationError({"detail": "ليس لديك صلاحية لتعديل باقات التصوير."})
-        serializer.save()
-
-    def perform_destroy(self, instance):
-        if not (self.request.user.is_staff or (hasattr(self.request.user, 'profile') and self.request.user.profile.role == 'manager')):
-            raise serializers.ValidationError({"detail": "ليس لديك صلاحية لحذف باقات التصوير."})
-        instance.delete()
+    # إدارة باقات التصوير متاحة للمدير فقط (عرض، إنشاء، تعديل، حذف)
+    permission_classes = [IsAuthenticated, IsManager]
 
 
 # ===========================================================================
 # ViewSet للمصورين
 # ===========================================================================
-class PhotographerViewSet(viewsets.ModelViewSet):
+class PhotographerViewSet(ReplicaRoutingMixin, ConditionalGetMixin, DeltaSyncMixin, viewsets.ModelViewSet):
     queryset = Photographer.objects.all().order_by('name')
     serializer_class = PhotographerSerializer
-    permission_classes = [IsAuthenticated]
-
-    def get_queryset(self):
-        if self.request.user.is_staff or (hasattr(self.request.user, 'profile') and self.request.user.profile.role == 'manager'):
-            return Photographer.objects.all().order_by('name')
-        raise Response({"detail": "ليس لديك صلاحية لعرض المصورين."}, status=status.HTTP_403_FORBIDDEN)
-
-    def perform_create(self, serializer):
-        if not (self.request.user.is_staff or (hasattr(self.request.user, 'profile') and self.request.user.profile.role == 'manager')):
-            raise serializers.ValidationError({"detail": "ليس لديك صلاحية لإنشاء مصورين جدد."})
-        serializer.save()
-
-    def perform_update(self, serializer):
-        if not (self.request.user.is_staff or (hasattr(self.request.user, 'profile') and self.request.user.profile.role == 'manager')):
-            raise serializers.ValidationError({"detail": "ليس لديك صلاحية لتعديل المصورين."})
-        serializer.save()
-
-    def perform_destroy(self, instance):
-        if not (self.request.user.is_staff or (hasattr(self.request.user, 'profile') and self.request.user.profile.role == 'manager')):
-            raise serializers.ValidationError({"detail": "ليس لديك صلاحية لحذف المصورين."})
-        instance.delete()
+    # إدارة المصورين متاحة للمدير فقط (عرض، إنشاء، تعديل، حذف)
+    permission_classes = [IsAuthenticated, IsManager]
 
 
 # ===========================================================================
 # ViewSet لجلسات التصوير
 # ===========================================================================
-class PhotoSessionViewSet(viewsets.ModelViewSet):
-    queryset = PhotoSession.objects.all().select_related('client', 'package', 'photographer', 'issued_by').order_by('-created_at')
+class PhotoSessionViewSet(ReplicaRoutingMixin, ResponseCacheMixin, ConditionalGetMixin, DeltaSyncMixin, ExportMixin, ArchiveMixin, viewsets.ModelViewSet):
+    # package و photographer يُعرضان من الذاكرة (package_cache / photographer_cache) فلا حاجة لضمهما
+    queryset = PhotoSession.objects.all().select_related('client', 'issued_by').order_by('-created_at')
+    archive_queryset = ArchivedPhotoSession.objects.all().select_related('client', 'issued_by').order_by('-created_at')
     serializer_class = PhotoSessionSerializer
     permission_classes = [IsAuthenticated]
+    etag_dependencies = (Client, PrintJob, PhotographyPackage, Photographer)
     filterset_fields = ['status', 'client__name', 'package__name', 'photographer__name', 'receipt_number', 'session_date']
+    export_fields = (
+        'id', 'receipt_number', 'client_id', 'client__name', 'package__name', 'photographer__name',
+        'session_date', 'session_time', 'duration_minutes', 'location', 'event_type', 'total_amount', 'paid_amount',
+        'remaining_amount', 'status', 'editing_status', 'final_delivery_date', 'notes',
+        'issued_by__username', 'created_at', 'updated_at',
+    )
+    export_annotations = {'remaining_amount': REMAINING_AMOUNT}
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -494,40 +595,9 @@ class PhotoSessionViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'], url_path='generate-booking-receipt')
     def generate_booking_receipt(self, request, pk=None):
         photo_session = self.get_object()
-        company_info = {
-            'name': 'استوديو الإبداع',
-            'address': 'شارع الفن، مدينة الإبداع، 12345',
-            'phone': '01001234567',
-            'email': 'info@creative-studio.com',
-            'website': 'www.creative-studio.com',
-            'tax_id': 'VAT123456789',
-        }
-        company_logo_static_url = staticfiles_storage.url('images/logo.png')
-        qr_data = f"Booking: {photo_session.receipt_number}\nClient: {photo_session.client.name}\nDate: {photo_session.session_date}\nPaid: {photo_session.paid_amount}"
-        qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4)
-        qr.add_data(qr_data)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = io.BytesIO()
-        img.save(buffer, format="PNG")
-        qr_code_base64 = base64.b64encode(buffer.getvalue()).decode()
-
-        context = {
-            'photo_session': photo_session,
-            'client': photo_session.client,
-            'company': company_info,
-            'company_logo_absolute_url': company_logo_static_url,
-            'qr_code_base64': qr_code_base64,
-            'receipts': photo_session.payment_receipts.all().order_by('date_issued'),
-            'booking_receipt_color': '#FFD700',
-        }
-        html_string = render_to_string('print/photo_booking_receipt_template.html', context)
-        html = HTML(string=html_string, base_url=request.build_absolute_uri('/'))
-        pdf_file = html.write_pdf()
-        response = HttpResponse(pdf_file, content_type='application/pdf')
+        context = rendering.photo_booking_context(photo_session)
         file_name = f"booking_receipt_photosession_{photo_session.receipt_number}.pdf"
-        response['Content-Disposition'] = f'attachment; filename="{file_name}"'
-        return response
+        return rendering.render_pdf_response('print/photo_booking_receipt_template.html', context, request, file_name)
 
     @action(detail=True, methods=['get'], url_path='generate-final-invoice')
     def generate_final_invoice(self, request, pk=None):
@@ -535,41 +605,180 @@ class PhotoSessionViewSet(viewsets.ModelViewSet):
         if photo_session.remaining_amount > 0:
             return Response({'detail': 'لا يمكن إنشاء فاتورة نهائية قبل دفع المبلغ بالكامل.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        company_info = {
-            'name': 'استوديو الإبداع',
-            'address': 'شارع الفن، مدينة الإبداع، 12345',
-            'phone': '01001234567',
-            'email': 'info@creative-studio.com',
-            'website': 'www.creative-studio.com',
-            'tax_id': 'VAT123456789',
-        }
-        company_logo_static_url = staticfiles_storage.url('images/logo.png')
         qr_data = f"Photo Session: {photo_session.receipt_number}\nClient: {photo_session.client.name}\nTotal: {photo_session.total_amount}\nPaid: {photo_session.paid_amount}"
-        qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4)
-        qr.add_data(qr_data)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = io.BytesIO()
-        img.save(buffer, format="PNG")
-        qr_code_base64 = base64.b64encode(buffer.getvalue()).decode()
-
         context = {
             'photo_session': photo_session,
             'client': photo_session.client,
-            'company': company_info,
-            'company_logo_absolute_url': company_logo_static_url,
-            'qr_code_base64': qr_code_base64,
             'receipts': photo_session.payment_receipts.all().order_by('date_issued'),
             'final_receipt_color': '#ADD8E6',
+            **rendering.document_context(qr_data),
         }
-        html_string = render_to_string('print/photo_final_receipt_template.html', context)
-        html = HTML(string=html_string, base_url=request.build_absolute_uri('/'))
-        pdf_file = html.write_pdf()
-        response = HttpResponse(pdf_file, content_type='application/pdf')
         file_name = f"final_receipt_photosession_{photo_session.receipt_number}.pdf"
-        response['Content-Disposition'] = f'attachment; filename="{file_name}"'
+        return rendering.render_pdf_response('print/photo_final_receipt_template.html', context, request, file_name)
+
+    @action(detail=False, methods=['get'], url_path='availability')
+    def photographer_availability(self, request):
+        """
+        ?date_from=YYYY-MM-DD&date_to=YYYY-MM-DD[&photographer=1,2][&min_minutes=60]
+        Busy intervals and free working-hour slots of every active photographer (or the
+        given ones) in the range.
+        """
+        try:
+            date_from = date.fromisoformat(request.query_params.get('date_from', ''))
+            date_to = date.fromisoformat(request.query_params.get('date_to') or date_from.isoformat())
+            min_minutes = int(request.query_params.get('min_minutes') or getattr(settings, 'PHOTO_SESSION_DEFAULT_MINUTES', 120))
+        except ValueError:
+            return Response({'detail': 'date_from و date_to يجب أن تكون بالشكل YYYY-MM-DD و min_minutes رقماً صحيحاً.'}, status=status.HTTP_400_BAD_REQUEST)
+        max_days = getattr(settings, 'PHOTO_AVAILABILITY_MAX_DAYS', 62)
+        if not 0 <= (date_to - date_from).days < max_days:
+            return Response({'detail': f'النطاق يجب ألا يتجاوز {max_days} يوماً وأن يبدأ قبل نهايته.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.query_params.get('photographer'):
+            photographers = [
+                photographer_cache.get_object(int(pk)) for pk in request.query_params['photographer'].split(',') if pk.strip().isdigit()
+            ]
+            photographers = [photographer for photographer in photographers if photographer is not None]
+        else:
+            photographers = sorted((p for p in photographer_cache.all() if p.is_active), key=lambda p: p.name)
+
+        booked = availability.booked_intervals([p.pk for p in photographers], date_from, date_to)
+        window_start = datetime.combine(date_from, datetime.min.time())
+        day_start, day_end = availability.working_hours()
+        results = []
+        for photographer in photographers:
+            intervals = [interval for interval in booked[photographer.pk] if interval[1] > window_start]
+            free = availability.free_slots(availability.merge(intervals), date_from, date_to, min_minutes)
+            results.append({
+                'id': photographer.pk,
+                'name': photographer.name,
+                'busy': [{'session_id': pk, 'start': start, 'end': end} for start, end, pk in intervals],
+                'free': [{'start': start, 'end': end} for start, end in free],
+            })
+        return Response({
+            'date_from': date_from,
+            'date_to': date_to,
+            'working_hours': {'start': day_start, 'end': day_end},
+            'photographers': results,
+        })
+
+    @action(detail=True, methods=['get', 'post'], url_path='photos')
+    def photos(self, request, pk=None):
+        """
+        GET: the session's photos (paginated, ?status=ready).
+        POST {"filename", "size"}: start an upload, then send the bytes in chunks to
+        PUT /api/session-photos/{id}/content/ with a Content-Range header.
+        """
+        photo_session = self.get_object()
+        if request.method == 'POST':
+            upload = SessionPhotoUploadSerializer(data=request.data)
+            upload.is_valid(raise_exception=True)
+            photo = SessionPhoto.objects.create(
+                session=photo_session,
+                original_name=upload.validated_data['filename'],
+                file_path=photos.new_file_path(photo_session.pk, upload.validated_data['filename']),
+                size=upload.validated_data['size'],
+                uploaded_by=request.user,
+            )
+            return Response(SessionPhotoSerializer(photo, context={'request': request}).data, status=status.HTTP_201_CREATED)
+
+        queryset = SessionPhoto.objects.filter(session_id=photo_session.pk).order_by('id')
+        if request.query_params.get('status'):
+            queryset = queryset.filter(status=request.query_params['status'])
+        page = self.paginate_queryset(queryset)
+        serializer = SessionPhotoSerializer(page, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
+
+# ===========================================================================
+# ViewSet لصور جلسات التصوير: رفع الأجزاء وتنزيل الأصل والصور المصغرة
+# ===========================================================================
+class SessionPhotoViewSet(mixins.RetrieveModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    queryset = SessionPhoto.objects.all()
+    serializer_class = SessionPhotoSerializer
+    permission_classes = [IsAuthenticated]
+
+    @action(detail=True, methods=['put'], url_path='content')
+    def content(self, request, pk=None):
+        """
+        PUT raw bytes with "Content-Range: bytes <start>-<end>/<size>". Chunks must arrive
+        in order; on 409 resume from the returned received_bytes (also shown by GET).
+        The body is copied to disk in small blocks and never held in memory.
+        """
+        photo = self.get_object()
+        if photo.status != 'uploading':
+            return Response(
+                {'detail': 'اكتمل رفع هذه الصورة.', 'received_bytes': photo.received_bytes},
+                status=status.HTTP_409_CONFLICT,
+            )
+        content_range = photos.parse_content_range(request.headers.get('Content-Range'))
+        if content_range is None or content_range[2] != photo.size:
+            return Response(
+                {'detail': f'ترويسة Content-Range مطلوبة بالشكل bytes <start>-<end>/{photo.size}.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        start, end, _ = content_range
+        length = end - start + 1
+        if length > getattr(settings, 'PHOTO_UPLOAD_CHUNK_MAX', 8 * 1024 * 1024):
+            return Response({'detail': 'حجم الجزء أكبر من المسموح.'}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        if request.META.get('CONTENT_LENGTH') != str(length):
+            return Response({'detail': 'Content-Length لا يطابق Content-Range.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            photos.write_chunk(photo, start, length, request.stream)
+        except photos.UploadConflict as conflict:
+            return Response(
+                {'detail': 'الجزء لا يبدأ من آخر بايت مستلم.', 'received_bytes': conflict.received_bytes},
+                status=status.HTTP_409_CONFLICT,
+            )
+        return Response(self.get_serializer(photo).data)
+
+    def _ready_photo(self):
+        photo = self.get_object()
+        if photo.status != 'ready':
+            raise Http404
+        return photo
+
+    def _file_response(self, relative_path, cache_seconds, **kwargs):
+        try:
+            # يرسل الملف على دفعات دون تحميله كاملاً في الذاكرة (تحت WSGI وASGI)
+            response = exports.StreamingFileResponse(open(photos.absolute_path(relative_path), 'rb'), **kwargs)
+        except FileNotFoundError:
+            raise Http404
+        # أسماء الملفات عشوائية (uuid) ولا تتغير، فيمكن للمتصفح الاحتفاظ بها
+        response['Cache-Control'] = f'private, max-age={cache_seconds}'
         return response
 
+    @action(detail=True, methods=['get'], url_path='original')
+    def original(self, request, pk=None):
+        photo = self._ready_photo()
+        return self._file_response(photo.file_path, 3600, as_attachment=True, filename=photo.original_name)
+
+    @action(detail=True, methods=['get'], url_path='thumbnail')
+    def thumbnail(self, request, pk=None):
+        return self._file_response(self._ready_photo().thumbnail_path, 86400, content_type='image/jpeg')
+
+    @action(detail=True, methods=['get'], url_path='preview')
+    def preview(self, request, pk=None):
+        return self._file_response(self._ready_photo().preview_path, 86400, content_type='image/jpeg')
+
+# ===========================================================================
+# ViewSet لروابط تقويمات iCalendar (للمدير فقط)
+# ===========================================================================
+class CalendarFeedViewSet(viewsets.ModelViewSet):
+    queryset = CalendarFeed.objects.all().select_related('photographer').order_by('name')
+    serializer_class = CalendarFeedSerializer
+    permission_classes = [IsAuthenticated, IsManager]
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+
+    @action(detail=True, methods=['post'], url_path='rotate-token')
+    def rotate_token(self, request, pk=None):
+        # الرابط القديم يتوقف فوراً (مثلاً عند مغادرة المصور أو تسرب الرابط)
+        feed = self.get_object()
+        feed.token = new_feed_token()
+        feed.save(update_fields=['token'])
+        return Response(self.get_serializer(feed).data)
+
 # ===========================================================================
 # ViewSet لملفات التعريف (Profiles) - يستخدم بشكل أساسي لإدارة الأدوار
 # ===========================================================================
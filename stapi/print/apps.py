@@ -1,6 +1,7 @@
 # stapi/print/apps.py
 
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class PrintConfig(AppConfig):
@@ -10,6 +11,12 @@ class PrintConfig(AppConfig):
 
     def ready(self):
         """
-        Import signals when the app is ready.
+        Import signals and system checks when the app is ready, and the PDF libraries when
+        RENDERING_PRELOAD is set.
         """
+        import print.checks # noqa: F401
         import print.signals # noqa: F401
+
+        if getattr(settings, 'RENDERING_PRELOAD', False):
+            from print import rendering
+            rendering.preload()
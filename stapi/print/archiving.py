@@ -0,0 +1,86 @@
+# stapi/print/archiving.py
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import (
+    PrintJob, PhotoSession, PaymentReceipt, ArchivedPrintJob, ArchivedPhotoSession, ArchivedPaymentReceipt,
+)
+
+# ===========================================================================
+# نقل الطلبات والجلسات المغلقة القديمة (مع إيصالاتها) إلى جداول الأرشيف
+# ===========================================================================
+ARCHIVE_MODELS = {
+    PrintJob: ArchivedPrintJob,
+    PhotoSession: ArchivedPhotoSession,
+    PaymentReceipt: ArchivedPaymentReceipt,
+}
+# (علاقة الإيصال بهذا النموذج، العلاقة الأخرى)
+RECEIPT_LINKS = {
+    PrintJob: ('printing', 'photography_session'),
+    PhotoSession: ('photography_session', 'printing'),
+}
+
+
+def missing_archive_columns(model):
+    """
+    Columns of `model` that its archive table does not have (they would be lost).
+    """
+    archived = {field.name for field in ARCHIVE_MODELS[model]._meta.concrete_fields}
+    return sorted(field.name for field in model._meta.concrete_fields if field.name not in archived)
+
+
+def closed_queryset(model, cutoff):
+    """
+    Rows of `model` (PrintJob / PhotoSession) that can be archived: closed
+    (ARCHIVE_CLOSED_STATUSES), fully paid and unchanged since `cutoff`. Rows with an
+    outstanding amount stay live so client balances never change, and so do rows that
+    share a receipt with a record of the other table and sessions with uploaded photos.
+    """
+    _, other = RECEIPT_LINKS[model]
+    queryset = (
+        model.objects
+        .filter(status__in=getattr(settings, 'ARCHIVE_CLOSED_STATUSES', ('delivered', 'cancelled')), updated_at__lt=cutoff)
+        .filter(paid_amount__gte=F('total_amount'))
+        .exclude(**{f'payment_receipts__{other}__isnull': False})
+    )
+    if model is PhotoSession:
+        # حذف الجلسة يحذف صورها المرفوعة (SessionPhoto) وملفاتها، فالجلسات التي لها صور تبقى
+        queryset = queryset.filter(photos__isnull=True)
+    return queryset
+
+
+def _archived_copy(instance, archived_at):
+    archive_model = ARCHIVE_MODELS[type(instance)]
+    values = {
+        field.attname: getattr(instance, field.attname)
+        for field in archive_model._meta.concrete_fields if field.name != 'archived_at'
+    }
+    return archive_model(archived_at=archived_at, **values)
+
+
+def archive_batch(model, cutoff, batch_size):
+    """
+    Move up to `batch_size` archivable rows of `model` and their receipts to the archive
+    tables in one transaction. Returns (rows, receipts) moved; (0, 0) when nothing is left.
+
+    The originals are deleted with the ORM, so the usual post_delete signals run: cached
+    responses are invalidated, SSE clients are notified and DeletionLog tells delta-sync
+    clients that the rows left the live lists.
+    """
+    link, _ = RECEIPT_LINKS[model]
+    archived_at = timezone.now()
+    with transaction.atomic():
+        items = list(closed_queryset(model, cutoff).order_by('pk')[:batch_size])
+        if not items:
+            return 0, 0
+        ids = [item.pk for item in items]
+        receipts = list(PaymentReceipt.objects.filter(**{f'{link}_id__in': ids}))
+
+        ARCHIVE_MODELS[model].objects.bulk_create([_archived_copy(item, archived_at) for item in items])
+        ArchivedPaymentReceipt.objects.bulk_create([_archived_copy(receipt, archived_at) for receipt in receipts])
+        PaymentReceipt.objects.filter(pk__in=[receipt.pk for receipt in receipts]).delete()
+        model.objects.filter(pk__in=ids).delete()
+    return len(items), len(receipts)
@@ -0,0 +1,300 @@
+# stapi/print/async_views.py
+
+import functools
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, F, Q, Sum
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework.exceptions import AuthenticationFailed
+
+from . import client_search, rendering
+from .authentication import aauthenticate_token, authenticate_key, issue_stream_ticket, stream_ticket_user
+from .db_routers import ahas_recent_write, use_replica
+from .events import change_hub, stream_changes
+from .models import PaymentReceipt, PhotoSession, PrintJob, REMAINING_AMOUNT
+
+# ===========================================================================
+# واجهات قراءة غير متزامنة (ASGI) لنقاط النهاية الأكثر استخداماً
+# ===========================================================================
+# DRF لا يدعم العروض غير المتزامنة، لذلك هذه عروض Django عادية (async def)
+# تستخدم نفس المصادقة بالتوكن ونفس توجيه القراءة إلى النسخة المتماثلة.
+
+CLOSED_STATUSES = ('delivered', 'cancelled', 'completed')
+EDITING_IN_PROGRESS = ('in_shooting', 'raw_material_uploaded', 'in_editing', 'ready_for_review', 'ready_for_printing')
+ALERT_ORDER = {'error': 1, 'warning': 2, 'info': 3}
+
+
+def _json(data, status=200):
+    return JsonResponse(
+        data, status=status, safe=False, encoder=DjangoJSONEncoder,
+        json_dumps_params={'ensure_ascii': False},
+    )
+
+
+def async_token_required(view):
+    """
+    Authenticate an async view with 'Authorization: Token <key>' and run its reads on
+    the replica, unless the user wrote recently (same rules as ReplicaRoutingMixin).
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await aauthenticate_token(request)
+        if user is None:
+            return _json({'detail': 'بيانات الاعتماد غير صالحة أو مفقودة.'}, status=401)
+        request.user = user
+        if await ahas_recent_write(user.pk):
+            return await view(request, *args, **kwargs)
+        with use_replica():
+            return await view(request, *args, **kwargs)
+    return wrapper
+
+
+def _with_display(row, field, choices):
+    row[f'{field}_display'] = dict(choices).get(row[field], row[field])
+    return row
+
+# ===========================================================================
+# البحث السريع عن العملاء
+# ===========================================================================
+@require_GET
+@async_token_required
+async def client_lookup(request):
+    term = request.GET.get('q', '').strip()
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 20)), 50))
+    except ValueError:
+        limit = 20
+    if not term:
+        return _json({'results': []})
+    # نفس البحث بالبادئة المرتب في /api/clients/autocomplete/ (print/client_search.py)
+    return _json({'results': await sync_to_async(client_search.autocomplete)(term, limit)})
+
+# ===========================================================================
+# تفاصيل طلب الطباعة وجلسة التصوير مع إيصالات الدفع
+# ===========================================================================
+RECEIPT_FIELDS = ('id', 'receipt_number', 'receipt_type', 'total_amount', 'paid_amount', 'payment_method', 'date_issued')
+
+
+async def _receipts(**lookup):
+    queryset = PaymentReceipt.objects.filter(**lookup).order_by('-date_issued').values(*RECEIPT_FIELDS)
+    return [receipt async for receipt in queryset]
+
+
+@require_GET
+@async_token_required
+async def printjob_detail(request, pk):
+    job = await (
+        PrintJob.objects.filter(pk=pk)
+        .annotate(remaining_amount=REMAINING_AMOUNT)
+        .values(
+            'id', 'receipt_number', 'client_id', 'client__name', 'client__phone', 'print_type', 'size',
+            'total_amount', 'paid_amount', 'remaining_amount', 'delivery_date', 'status', 'notes',
+            'issued_by__username', 'created_at', 'updated_at',
+        )
+        .afirst()
+    )
+    if job is None:
+        return _json({'detail': 'غير موجود.'}, status=404)
+    _with_display(job, 'status', PrintJob.STATUS_CHOICES)
+    _with_display(job, 'print_type', PrintJob.PRINT_TYPE_CHOICES)
+    job['payment_receipts'] = await _receipts(printing_id=pk)
+    return _json(job)
+
+
+@require_GET
+@async_token_required
+async def photosession_detail(request, pk):
+    session = await (
+        PhotoSession.objects.filter(pk=pk)
+        .annotate(remaining_amount=REMAINING_AMOUNT)
+        .values(
+            'id', 'receipt_number', 'client_id', 'client__name', 'client__phone', 'package_id', 'package__name',
+            'photographer_id', 'photographer__name', 'session_date', 'session_time', 'location', 'event_type',
+            'total_amount', 'paid_amount', 'remaining_amount', 'status', 'editing_status', 'final_delivery_date',
+            'final_gallery_link', 'notes', 'issued_by__username', 'created_at', 'updated_at',
+        )
+        .afirst()
+    )
+    if session is None:
+        return _json({'detail': 'غير موجود.'}, status=404)
+    _with_display(session, 'status', PhotoSession.STATUS_CHOICES)
+    _with_display(session, 'editing_status', PhotoSession.EDITING_STATUS_CHOICES)
+    session['payment_receipts'] = await _receipts(photography_session_id=pk)
+    return _json(session)
+
+# ===========================================================================
+# التنبيهات (نفس قواعد واجهة Alerts.js لكن محسوبة على الخادم)
+# ===========================================================================
+@require_GET
+@async_token_required
+async def alerts(request):
+    today = timezone.localdate()
+    soon = today + timedelta(days=getattr(settings, 'ALERT_UPCOMING_DAYS', 7))
+    results = []
+
+    jobs = (
+        PrintJob.objects.exclude(status__in=CLOSED_STATUSES)
+        .filter(Q(delivery_date__lte=soon) | Q(status='in_progress'))
+        .values('id', 'receipt_number', 'delivery_date', 'status')
+    )
+    async for job in jobs:
+        number = job['receipt_number'] or job['id']
+        if job['delivery_date'] < today:
+            results.append({'id': f"print-overdue-{job['id']}", 'type': 'error', 'item_type': 'print_job', 'item_id': job['id'],
+                            'message': f"طلب طباعة رقم {number} متأخر! تاريخ التسليم كان {job['delivery_date']}."})
+        elif job['delivery_date'] <= soon:
+            results.append({'id': f"print-upcoming-{job['id']}", 'type': 'warning', 'item_type': 'print_job', 'item_id': job['id'],
+                            'message': f"طلب طباعة رقم {number} يستحق التسليم قريبًا: {job['delivery_date']}."})
+        else:
+            results.append({'id': f"print-in_progress-{job['id']}", 'type': 'info', 'item_type': 'print_job', 'item_id': job['id'],
+                            'message': f"طلب طباعة رقم {number} قيد التنفيذ."})
+
+    editing_labels = dict(PhotoSession.EDITING_STATUS_CHOICES)
+    sessions = (
+        PhotoSession.objects.exclude(status__in=CLOSED_STATUSES)
+        .filter(Q(final_delivery_date__lte=soon) | Q(editing_status__in=EDITING_IN_PROGRESS) | Q(total_amount__gt=F('paid_amount')))
+        .annotate(remaining_amount=REMAINING_AMOUNT)
+        .values('id', 'receipt_number', 'final_delivery_date', 'editing_status', 'remaining_amount')
+    )
+    async for session in sessions:
+        number = session['receipt_number'] or session['id']
+        delivery_date = session['final_delivery_date']
+        if delivery_date and delivery_date < today:
+            results.append({'id': f"photo-overdue-{session['id']}", 'type': 'error', 'item_type': 'photo_session', 'item_id': session['id'],
+                            'message': f"جلسة تصوير رقم {number} متأخرة! تاريخ التسليم النهائي كان {delivery_date}."})
+        elif delivery_date and delivery_date <= soon:
+            results.append({'id': f"photo-upcoming-{session['id']}", 'type': 'warning', 'item_type': 'photo_session', 'item_id': session['id'],
+                            'message': f"جلسة تصوير رقم {number} تستحق التسليم قريبًا: {delivery_date}."})
+        elif session['editing_status'] in EDITING_IN_PROGRESS:
+            label = editing_labels.get(session['editing_status'], session['editing_status'])
+            results.append({'id': f"photo-editing-{session['id']}", 'type': 'info', 'item_type': 'photo_session', 'item_id': session['id'],
+                            'message': f"جلسة تصوير رقم {number} قيد المعالجة ({label})."})
+        if session['remaining_amount'] and session['remaining_amount'] > 0:
+            results.append({'id': f"photo-unpaid-{session['id']}", 'type': 'warning', 'item_type': 'photo_session', 'item_id': session['id'],
+                            'message': f"جلسة تصوير رقم {number} لديها مبلغ متبقي: {session['remaining_amount']:.2f} SAR."})
+
+    results.sort(key=lambda alert: ALERT_ORDER[alert['type']])
+    return _json({'count': len(results), 'results': results})
+
+# ===========================================================================
+# التقارير (ملخص الحالات والمبالغ)
+# ===========================================================================
+async def _status_summary(queryset, field, choices):
+    labels = dict(choices)
+    rows = queryset.values(field).annotate(count=Count('id')).order_by()
+    return {labels.get(row[field], row[field]): row['count'] async for row in rows}
+
+
+async def _amount_totals(queryset):
+    totals = await queryset.aaggregate(total=Sum('total_amount'), paid=Sum('paid_amount'), count=Count('id'))
+    total = totals['total'] or 0
+    paid = totals['paid'] or 0
+    return totals['count'], {'total': total, 'paid': paid, 'remaining': total - paid}
+
+
+@require_GET
+@async_token_required
+async def reports(request):
+    jobs_count, jobs_amounts = await _amount_totals(PrintJob.objects.all())
+    sessions_count, sessions_amounts = await _amount_totals(PhotoSession.objects.all())
+    return _json({
+        'print_jobs': {
+            'total': jobs_count,
+            'status_summary': await _status_summary(PrintJob.objects.all(), 'status', PrintJob.STATUS_CHOICES),
+            'total_amounts': jobs_amounts,
+        },
+        'photo_sessions': {
+            'total': sessions_count,
+            'status_summary': await _status_summary(PhotoSession.objects.all(), 'status', PhotoSession.STATUS_CHOICES),
+            'editing_status_summary': await _status_summary(
+                PhotoSession.objects.all(), 'editing_status', PhotoSession.EDITING_STATUS_CHOICES
+            ),
+            'total_amounts': sessions_amounts,
+        },
+        'overall': {
+            'total_items': jobs_count + sessions_count,
+            'total_amounts': {key: jobs_amounts[key] + sessions_amounts[key] for key in jobs_amounts},
+        },
+    })
+
+# ===========================================================================
+# إيصال الدفع PDF (WeasyPrint في مجموعة خيوط محدودة)
+# ===========================================================================
+PAYMENT_RECEIPT_TEMPLATE = 'print/printing_receipt_template.html'
+
+
+def _payment_receipt_html(pk):
+    receipt = get_object_or_404(
+        PaymentReceipt.objects.select_related('printing', 'photography_session'), pk=pk
+    )
+    return receipt.receipt_number, render_to_string(
+        PAYMENT_RECEIPT_TEMPLATE, rendering.payment_receipt_context(receipt)
+    )
+
+
+@require_GET
+@async_token_required
+async def payment_receipt_pdf(request, pk):
+    try:
+        receipt_number, html_string = await sync_to_async(_payment_receipt_html)(pk)
+    except Http404:
+        return _json({'detail': 'غير موجود.'}, status=404)
+    try:
+        pdf_file = await rendering.ahtml_to_pdf(html_string, request.build_absolute_uri('/'), PAYMENT_RECEIPT_TEMPLATE)
+    except rendering.RenderQueueFull:
+        response = _json({'detail': 'خدمة توليد ملفات PDF مشغولة حالياً، حاول مرة أخرى.'}, status=503)
+        response['Retry-After'] = '5'
+        return response
+    return rendering.pdf_response(pdf_file, f"payment_receipt_{receipt_number}.pdf")
+
+# ===========================================================================
+# بث التغييرات (Server-Sent Events) بدلاً من الاستطلاع الدوري
+# ===========================================================================
+# تحت WSGI يقرأ Django الاستجابة المتدفقة غير المتزامنة كاملة قبل إرسال أي شيء، والبث لا ينتهي:
+# البث متاح فقط عبر ASGI (stapi/asgi.py)، وإلا 501 وتستمر الواجهة في الاستطلاع الدوري
+def _asgi_required():
+    return _json({'detail': 'بث التغييرات يتطلب تشغيل الخادم عبر ASGI (انظر stapi/asgi.py).'}, status=501)
+
+
+@csrf_exempt
+@require_POST
+async def change_feed_ticket(request):
+    """
+    Exchange the 'Authorization: Token' header for a short-lived ticket to open
+    /api/events/?ticket=... with EventSource, so the token never appears in URLs or logs.
+    """
+    if not isinstance(request, ASGIRequest):
+        return _asgi_required()
+    auth = request.headers.get('Authorization', '').split()
+    if len(auth) != 2 or auth[0].lower() != 'token':
+        return _json({'detail': 'بيانات الاعتماد غير صالحة أو مفقودة.'}, status=401)
+    try:
+        _, token = await sync_to_async(authenticate_key)(auth[1])
+    except AuthenticationFailed:
+        return _json({'detail': 'بيانات الاعتماد غير صالحة أو مفقودة.'}, status=401)
+    return _json({'ticket': issue_stream_ticket(token), 'expires_in': getattr(settings, 'SSE_TICKET_MAX_AGE', 60)})
+
+
+@require_GET
+async def change_feed(request):
+    if not isinstance(request, ASGIRequest):
+        return _asgi_required()
+    # EventSource في المتصفح لا يرسل ترويسات مخصصة، لذلك يُقبل تذكرة قصيرة العمر في ?ticket=
+    user = await sync_to_async(stream_ticket_user)(request.GET.get('ticket', ''))
+    if user is None:
+        return _json({'detail': 'بيانات الاعتماد غير صالحة أو مفقودة.'}, status=401)
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    subscription, resumed = change_hub.subscribe(last_event_id)
+    response = StreamingHttpResponse(stream_changes(subscription, resumed), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
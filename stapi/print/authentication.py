@@ -0,0 +1,192 @@
+# stapi/print/authentication.py
+
+import copy
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.cache import caches
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .permissions import get_user_role
+
+# ===========================================================================
+# نسخة صلاحيات كل مستخدم في الذاكرة المشتركة (Django cache)
+# ===========================================================================
+# تتغير عند تسجيل الخروج أو حذف التوكن أو تعطيل المستخدم أو تغيير دوره، فتُرفض
+# المدخلات المخزنة في كل العمليات التي تقرأ نفس الذاكرة (Redis / Memcached / DB cache)
+def _auth_cache():
+    return caches[getattr(settings, 'AUTH_TOKEN_CACHE_ALIAS', 'default')]
+
+
+def _version_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def user_auth_version(user_id):
+    cache = _auth_cache()
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        cache.add(_version_key(user_id), uuid.uuid4().hex, None)
+        version = cache.get(_version_key(user_id))
+    return version
+
+
+def invalidate_user(user_id):
+    """
+    Reject the cached tokens of `user_id` in this process and, through the shared
+    version, in every other process.
+    """
+    _auth_cache().set(_version_key(user_id), uuid.uuid4().hex, None)
+    token_cache.delete_user(user_id)
+
+# ===========================================================================
+# ذاكرة تخزين مؤقت محدودة (TTL + LRU) للتوكنات داخل العملية
+# ===========================================================================
+class TokenCache:
+    """
+    Bounded in-process map of token key -> (token, user), each entry expiring after `ttl`
+    seconds. The least recently used entry is dropped once `max_size` is reached.
+    An entry is only served while the user's shared auth version is unchanged.
+    """
+
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            token, user, version, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        if user_auth_version(user.pk) != version:
+            self.delete(key)
+            return None
+        return token, user
+
+    def set(self, key, token, user):
+        version = user_auth_version(user.pk)
+        with self._lock:
+            self._entries[key] = (token, user, version, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_user(self, user_id):
+        with self._lock:
+            for key in [k for k, (_, user, _, _) in self._entries.items() if user.pk == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenCache(
+    max_size=getattr(settings, 'AUTH_TOKEN_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'AUTH_TOKEN_CACHE_TTL', 5),
+)
+
+# ===========================================================================
+# مصادقة بالتوكن مع التخزين المؤقت للمستخدم ودوره
+# ===========================================================================
+def authenticate_key(key):
+    """
+    (user, token) for a valid token key, resolved with a single query and then served
+    from `token_cache`; raises AuthenticationFailed otherwise. Shared by
+    CachedTokenAuthentication and the async views.
+    """
+    cached = token_cache.get(key)
+    if cached is None:
+        try:
+            token = Token.objects.select_related('user__profile').get(key=key)
+        except Token.DoesNotExist:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        # حساب الدور مرة واحدة وتخزينه مع المستخدم
+        get_user_role(token.user)
+        token_cache.set(key, token, token.user)
+        cached = (token, token.user)
+
+    token, user = cached
+    # نسخة لكل طلب حتى لا تتشارك الطلبات المتزامنة نفس الكائن
+    return copy.copy(user), token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Drop-in replacement for TokenAuthentication that resolves token -> (user, role)
+    through authenticate_key().
+    Entries are invalidated by the signals in print/signals.py (logout, token delete,
+    role change, user deactivation) in all processes sharing AUTH_TOKEN_CACHE_ALIAS,
+    and expire after AUTH_TOKEN_CACHE_TTL anyway.
+    """
+
+    def authenticate_credentials(self, key):
+        return authenticate_key(key)
+
+
+async def aauthenticate_token(request):
+    """
+    Async counterpart of CachedTokenAuthentication for native async views.
+    Returns the user for a valid 'Authorization: Token <key>' header, or None.
+    """
+    auth = request.headers.get('Authorization', '').split()
+    if len(auth) != 2 or auth[0].lower() != 'token':
+        return None
+    try:
+        user, _ = await sync_to_async(authenticate_key)(auth[1])
+    except exceptions.AuthenticationFailed:
+        return None
+    return user
+
+# ===========================================================================
+# تذاكر قصيرة العمر لـ EventSource (لا يرسل ترويسات): التوكن نفسه لا يظهر في الرابط
+# ===========================================================================
+STREAM_TICKET_SALT = 'print.events.ticket'
+
+
+def _token_fingerprint(key):
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def issue_stream_ticket(token):
+    """
+    Signed ticket naming the user and the token it was issued for, accepted by
+    stream_ticket_user() for SSE_TICKET_MAX_AGE seconds.
+    """
+    return signing.dumps({'user': token.user_id, 'token': _token_fingerprint(token.key)}, salt=STREAM_TICKET_SALT)
+
+
+def stream_ticket_user(ticket):
+    """
+    The active user of a valid, unexpired ticket whose token still exists, or None.
+    """
+    try:
+        payload = signing.loads(ticket, salt=STREAM_TICKET_SALT, max_age=getattr(settings, 'SSE_TICKET_MAX_AGE', 60))
+    except signing.BadSignature:
+        return None
+    for token in Token.objects.select_related('user__profile').filter(user_id=payload['user'], user__is_active=True):
+        if _token_fingerprint(token.key) == payload['token']:
+            get_user_role(token.user)
+            return token.user
+    return None
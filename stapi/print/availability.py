@@ -0,0 +1,107 @@
+# stapi/print/availability.py
+
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+
+from .models import PhotoSession
+
+# ===========================================================================
+# أوقات انشغال المصورين: تعارض المواعيد والفترات المتاحة
+# كل جلسة فترة [البداية، النهاية) وتُقرأ الجلسات مرتبة من الفهرس
+# (photographer, session_date, session_time) ثم تُدمج في مرور واحد
+# ===========================================================================
+# جلسات بهذه الحالات لا تشغل وقت المصور
+INACTIVE_STATUSES = ('cancelled',)
+
+
+def working_hours():
+    start, end = getattr(settings, 'PHOTO_WORKING_HOURS', ('09:00', '21:00'))
+    return time.fromisoformat(start), time.fromisoformat(end)
+
+
+def session_interval(session_date, session_time, duration_minutes):
+    """
+    (start, end) of a booking. A session without a time blocks the whole working day.
+    """
+    day_start, day_end = working_hours()
+    if session_time is None:
+        return datetime.combine(session_date, day_start), datetime.combine(session_date, day_end)
+    start = datetime.combine(session_date, session_time)
+    minutes = duration_minutes or getattr(settings, 'PHOTO_SESSION_DEFAULT_MINUTES', 120)
+    return start, start + timedelta(minutes=minutes)
+
+
+def booked_intervals(photographer_ids, date_from, date_to, exclude_pk=None):
+    """
+    {photographer_id: [(start, end, session_id), ...] sorted by start} for the sessions
+    between date_from and date_to, read with one range scan of the photographer index.
+    The day before date_from is included for sessions running past midnight.
+    """
+    queryset = PhotoSession.objects.filter(
+        photographer_id__in=photographer_ids,
+        session_date__range=(date_from - timedelta(days=1), date_to),
+    ).exclude(status__in=INACTIVE_STATUSES)
+    if exclude_pk is not None:
+        queryset = queryset.exclude(pk=exclude_pk)
+
+    booked = {photographer_id: [] for photographer_id in photographer_ids}
+    rows = queryset.order_by('photographer_id', 'session_date', 'session_time').values_list(
+        'pk', 'photographer_id', 'session_date', 'session_time', 'duration_minutes',
+    )
+    for pk, photographer_id, session_date, session_time, duration_minutes in rows:
+        booked[photographer_id].append((*session_interval(session_date, session_time, duration_minutes), pk))
+    for intervals in booked.values():
+        # مرتبة تقريباً من قاعدة البيانات (الجلسات بدون وقت فقط قد تكون في غير مكانها)
+        intervals.sort()
+    return booked
+
+
+def merge(intervals):
+    """
+    Union of (start, end, ...) intervals sorted by start, as a list of [start, end].
+    """
+    merged = []
+    for start, end, *_ in intervals:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def free_slots(busy, date_from, date_to, min_minutes):
+    """
+    Working-hour gaps of at least `min_minutes` between the merged `busy` intervals,
+    for every day from date_from to date_to. Each busy interval is visited once per
+    day it touches.
+    """
+    day_start, day_end = working_hours()
+    min_length = timedelta(minutes=min_minutes)
+    slots = []
+    first = 0
+    day = date_from
+    while day <= date_to:
+        cursor, closing = datetime.combine(day, day_start), datetime.combine(day, day_end)
+        while first < len(busy) and busy[first][1] <= cursor:
+            first += 1
+        position = first
+        while position < len(busy) and busy[position][0] < closing:
+            start, end = busy[position]
+            if start - cursor >= min_length:
+                slots.append((cursor, start))
+            cursor = max(cursor, end)
+            position += 1
+        if closing - cursor >= min_length:
+            slots.append((cursor, closing))
+        day += timedelta(days=1)
+    return slots
+
+
+def find_conflicts(photographer_id, session_date, session_time, duration_minutes, exclude_pk=None):
+    """
+    Ids of the photographer's sessions overlapping the given booking.
+    """
+    start, end = session_interval(session_date, session_time, duration_minutes)
+    booked = booked_intervals([photographer_id], session_date, end.date(), exclude_pk)[photographer_id]
+    return [pk for other_start, other_end, pk in booked if other_start < end and start < other_end]
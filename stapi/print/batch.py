@@ -0,0 +1,135 @@
+# stapi/print/batch.py
+
+import base64
+import io
+import json
+from contextlib import nullcontext
+from urllib.parse import unquote_to_bytes, urlsplit
+
+from asgiref.sync import iscoroutinefunction
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import transaction
+from django.urls import Resolver404, resolve
+from django.utils.encoding import iri_to_uri
+
+from . import caching
+from .db_routers import get_replica_alias, has_recent_write
+
+# ===========================================================================
+# تنفيذ عدة طلبات API داخلياً في طلب HTTP واحد (/api/batch/)
+# ===========================================================================
+READ_METHODS = ('GET', 'HEAD')
+# ترويسات الطلب الأصلي التي لا تخص الطلبات الفرعية
+DROPPED_META = ('CONTENT_TYPE', 'CONTENT_LENGTH', 'HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE', 'HTTP_IF_MATCH')
+RESPONSE_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Location', 'Content-Disposition')
+
+
+def build_sub_request(request, method, path, body=None):
+    """
+    WSGIRequest for one sub-request, sharing the outer request's headers and already
+    authenticated user (DRF honours _force_auth_user, so the token is not checked again).
+    """
+    url = urlsplit(iri_to_uri(path))
+    payload = b'' if body is None else json.dumps(body).encode()
+    environ = {key: value for key, value in request.META.items() if key not in DROPPED_META}
+    environ.update({
+        'REQUEST_METHOD': method,
+        # نفس ترميز WSGI: البايتات بعد فك الترميز كنص latin-1
+        'PATH_INFO': unquote_to_bytes(url.path).decode('iso-8859-1'),
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(payload)),
+        'wsgi.input': io.BytesIO(payload),
+        'wsgi.url_scheme': request.scheme,
+    })
+    sub_request = WSGIRequest(environ)
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+    return sub_request
+
+
+def _error(status_code, detail):
+    return {'status': status_code, 'headers': {}, 'body': {'detail': detail}}
+
+
+def serialize_response(response):
+    entry = {
+        'status': response.status_code,
+        'headers': {header: response[header] for header in RESPONSE_HEADERS if header in response},
+    }
+    content = response.content
+    if not content:
+        entry['body'] = None
+    elif response.get('Content-Type', '').startswith('application/json'):
+        entry['body'] = json.loads(content)
+    else:
+        # ملفات PDF وغيرها
+        entry['body'] = base64.b64encode(content).decode()
+        entry['body_encoding'] = 'base64'
+    return entry
+
+
+def allowed_in_batch(match):
+    """
+    Sub-requests are judged by the view they resolve to, not by their (encodable) path:
+    async views and views marked allowed_in_batch = False (the batch view itself) are refused.
+    """
+    if iscoroutinefunction(match.func):
+        return False
+    view_class = getattr(match.func, 'view_class', None) or getattr(match.func, 'cls', None)
+    return getattr(view_class, 'allowed_in_batch', True)
+
+
+def dispatch_sub_request(request, method, path, body=None):
+    sub_request = build_sub_request(request, method, path, body)
+    if not sub_request.path_info.startswith('/api/'):
+        return _error(400, f'المسار غير مسموح به داخل الدفعة: {path}')
+    try:
+        match = resolve(sub_request.path_info)
+    except Resolver404:
+        return _error(404, 'غير موجود.')
+    if not allowed_in_batch(match):
+        return _error(400, f'المسار غير مسموح به داخل الدفعة: {path}')
+    sub_request.resolver_match = match
+    response = match.func(sub_request, *match.args, **match.kwargs)
+    if hasattr(response, 'render') and callable(response.render):
+        response.render()
+    # لا نستدعي response.close(): ترسل إشارة request_finished التي تغلق اتصالات قاعدة البيانات
+    if response.streaming:
+        # التصدير المتدفق لا يناسب الدفعة (لم يُقرأ منه شيء بعد)، يُطلب مباشرة
+        return _error(400, f'الاستجابات المتدفقة غير مدعومة داخل الدفعة: {path}')
+    return serialize_response(response)
+
+
+def run_batch(request, sub_requests, atomic=False):
+    """
+    Run `sub_requests` ({'method', 'path', 'body', 'id'}) in order and return their
+    responses. With `atomic`, read-only batches share one read transaction (a consistent
+    snapshot), and batches with writes run in one write transaction that is rolled back
+    at the first failing sub-request; the remaining ones are answered with 424.
+    """
+    has_writes = any(item['method'] not in READ_METHODS for item in sub_requests)
+    if not atomic:
+        context = nullcontext()
+    elif has_writes:
+        context = transaction.atomic(using='default')
+    else:
+        read_alias = 'default' if has_recent_write(request.user.pk) else (get_replica_alias() or 'default')
+        context = transaction.atomic(using=read_alias)
+
+    responses = []
+    failed = False
+    # داخل معاملة كتابة قد يتم التراجع عنها لا نخزن أي استجابة في الذاكرة المؤقتة
+    with context, (caching.suspended() if atomic and has_writes else nullcontext()):
+        for item in sub_requests:
+            if failed:
+                entry = _error(424, 'لم يتم التنفيذ بسبب فشل طلب سابق في نفس الدفعة.')
+            else:
+                entry = dispatch_sub_request(request, item['method'], item['path'], item.get('body'))
+                if atomic and has_writes and entry['status'] >= 400:
+                    transaction.set_rollback(True, using='default')
+                    failed = True
+            if item.get('id') is not None:
+                entry = {'id': item['id'], **entry}
+            responses.append(entry)
+    return responses
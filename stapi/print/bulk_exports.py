@@ -0,0 +1,242 @@
+# stapi/print/bulk_exports.py
+
+import io
+import logging
+import uuid
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib import messages
+from django.db import connection, transaction
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html
+
+from . import exports, rendering
+from .api_views import PaymentReceiptViewSet, PrintJobViewSet, PhotoSessionViewSet
+from .models import BulkExport, PaymentReceipt, PrintJob, PhotoSession
+
+logger = logging.getLogger(__name__)
+
+# ===========================================================================
+# إجراءات لوحة الإدارة الجماعية: ZIP لمستندات PDF أو CSV للسجلات المحددة
+# التحديدات الصغيرة تُرسل مباشرة بشكل متدفق، والكبيرة تُجهز في الخلفية كملف للتنزيل
+# ===========================================================================
+# (القالب، دالة السياق، اسم الملف، شرط التوليد أو None)
+PDF_DOCUMENTS = {
+    PaymentReceipt: (
+        'print/printing_receipt_template.html', rendering.payment_receipt_context,
+        'payment_receipt_{number}.pdf', None,
+    ),
+    # الفاتورة النهائية تصدر فقط بعد دفع المبلغ بالكامل (مثل generate-final-invoice)
+    PrintJob: (
+        'print/print_invoice_template.html', rendering.print_job_invoice_context,
+        'final_invoice_printjob_{number}.pdf', lambda print_job: print_job.remaining_amount <= 0,
+    ),
+    PhotoSession: (
+        'print/photo_booking_receipt_template.html', rendering.photo_booking_context,
+        'booking_receipt_photosession_{number}.pdf', None,
+    ),
+}
+PDF_SELECT_RELATED = {
+    PaymentReceipt: ('printing__client', 'photography_session__client', 'issued_by'),
+    PrintJob: ('client',),
+    PhotoSession: ('client', 'package', 'photographer'),
+}
+# نفس أعمدة التصدير في الـ API (?export_format=csv)
+CSV_EXPORTS = {
+    PaymentReceipt: PaymentReceiptViewSet,
+    PrintJob: PrintJobViewSet,
+    PhotoSession: PhotoSessionViewSet,
+}
+# عدد السجلات المقروءة في كل استعلام عند التصدير في الخلفية
+BACKGROUND_CHUNK_SIZE = 500
+
+_background_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'ADMIN_BULK_EXPORT_WORKERS', 1), thread_name_prefix='bulk-export'
+)
+
+
+def export_root():
+    return Path(getattr(settings, 'BULK_EXPORT_ROOT', settings.BASE_DIR / 'exports'))
+
+
+def absolute_path(relative_path):
+    return export_root() / relative_path
+
+
+def delete_file(export):
+    if export.file_path:
+        absolute_path(export.file_path).unlink(missing_ok=True)
+
+
+def pdf_files(model, objects, base_url):
+    """
+    Yield (file name, PDF bytes) for `objects`, in order. Templates are rendered in this
+    thread (they read the database); the HTML -> PDF conversions run on
+    ADMIN_BULK_PDF_WORKERS threads, with up to twice that many documents in flight.
+    Documents that cannot be issued yet are listed in skipped.txt at the end.
+    """
+    template_name, build_context, name_format, can_issue = PDF_DOCUMENTS[model]
+    workers = getattr(settings, 'ADMIN_BULK_PDF_WORKERS', 4)
+    skipped = []
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bulk-pdf') as pool:
+        for obj in objects:
+            file_name = name_format.format(number=obj.receipt_number or obj.pk)
+            if can_issue is not None and not can_issue(obj):
+                skipped.append(file_name)
+                continue
+            html_string = render_to_string(template_name, build_context(obj))
+            pending.append((file_name, pool.submit(rendering.html_to_pdf, html_string, base_url, template_name)))
+            if len(pending) >= workers * 2:
+                file_name, future = pending.popleft()
+                yield file_name, future.result()
+        while pending:
+            file_name, future = pending.popleft()
+            yield file_name, future.result()
+    if skipped:
+        note = 'لم يتم توليد هذه المستندات لأن المبلغ لم يُدفع بالكامل:\n' + '\n'.join(skipped)
+        yield 'skipped.txt', note.encode()
+
+
+class _ZipBuffer(io.RawIOBase):
+    """
+    Unseekable sink for zipfile: keeps what was written until pop() hands it out.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(files):
+    """
+    Yield a ZIP archive of (name, bytes) pairs piece by piece, one file at a time.
+    PDFs are already compressed, so entries are stored as they are.
+    """
+    buffer = _ZipBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for name, content in files:
+            archive.writestr(name, content)
+            yield buffer.pop()
+    yield buffer.pop()
+
+
+def csv_rows(model, querysets):
+    viewset = CSV_EXPORTS[model]
+    return chain.from_iterable(
+        exports.iter_rows(queryset.annotate(**viewset.export_annotations), viewset.export_fields)
+        for queryset in querysets
+    )
+
+
+def _attachment(content, content_type, filename):
+    response = exports.StreamingResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+# ===========================================================================
+# التصدير في الخلفية إلى ملف (التحديدات الكبيرة)
+# ===========================================================================
+def _chunked_querysets(model, pks):
+    for start in range(0, len(pks), BACKGROUND_CHUNK_SIZE):
+        yield model._default_manager.filter(pk__in=pks[start:start + BACKGROUND_CHUNK_SIZE]).order_by('pk')
+
+
+def start_background_export(kind, queryset, base_url, user):
+    """
+    Record a BulkExport and build its file on the background thread once committed.
+    Only the ids are read here; rows are loaded BACKGROUND_CHUNK_SIZE at a time.
+    """
+    model = queryset.model
+    pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+    export = BulkExport.objects.create(
+        kind=kind, model_name=model._meta.model_name, row_count=len(pks), created_by=user,
+    )
+    transaction.on_commit(lambda: _background_executor.submit(run_export, export.pk, kind, model, pks, base_url))
+    return export
+
+
+def run_export(export_id, kind, model, pks, base_url):
+    relative_path = f"{uuid.uuid4().hex}.{'zip' if kind == 'pdf_zip' else 'csv'}"
+    path = absolute_path(relative_path)
+    try:
+        # recover_bulk_exports ربما أنهى التصدير (فشل) قبل أن يصل دوره في المجموعة
+        if not BulkExport.objects.filter(pk=export_id, status='pending').update(status='running'):
+            return
+        if kind == 'pdf_zip':
+            objects = chain.from_iterable(
+                queryset.select_related(*PDF_SELECT_RELATED[model]) for queryset in _chunked_querysets(model, pks)
+            )
+            content = stream_zip(pdf_files(model, objects, base_url))
+        else:
+            viewset = CSV_EXPORTS[model]
+            content = (
+                piece.encode() for piece in exports.stream_csv(csv_rows(model, _chunked_querysets(model, pks)), viewset.export_fields)
+            )
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as handle:
+            for piece in content:
+                handle.write(piece)
+        # تحديث مشروط: تصدير عُلِّم فاشلاً أثناء العمل (أو حُذف) لا يُعاد إلى done
+        finished = BulkExport.objects.filter(pk=export_id, status='running').update(
+            status='done', file_path=relative_path, finished_at=timezone.now(),
+        )
+        if not finished:
+            logger.warning('Bulk export %s was no longer running, its file was discarded', export_id)
+            path.unlink(missing_ok=True)
+    except Exception as exc:
+        logger.exception('Bulk export %s failed', export_id)
+        path.unlink(missing_ok=True)
+        BulkExport.objects.filter(pk=export_id, status='running').update(
+            status='failed', error=repr(exc)[:255], finished_at=timezone.now(),
+        )
+    finally:
+        # خيط خلفي وليس طلباً: نغلق اتصاله بقاعدة البيانات
+        connection.close()
+
+# ===========================================================================
+# نقطة الدخول من إجراءات لوحة الإدارة (print/admin.py)
+# ===========================================================================
+def run_admin_action(modeladmin, request, queryset, kind):
+    model = queryset.model
+    if kind == 'pdf_zip':
+        inline_limit = getattr(settings, 'ADMIN_BULK_PDF_INLINE_LIMIT', 25)
+    else:
+        inline_limit = getattr(settings, 'ADMIN_BULK_CSV_INLINE_LIMIT', 5000)
+    base_url = request.build_absolute_uri('/')
+    count = queryset.count()
+
+    if count > inline_limit:
+        start_background_export(kind, queryset, base_url, request.user)
+        modeladmin.message_user(request, format_html(
+            'يتم تجهيز {} سجل في الخلفية، وسيظهر رابط التنزيل في <a href="{}">ملفات التصدير</a> عند الانتهاء.',
+            count, reverse('admin:print_bulkexport_changelist'),
+        ), messages.INFO)
+        return None
+
+    filename = f'{model._meta.model_name}_{timezone.localtime():%Y%m%d_%H%M%S}'
+    if kind == 'pdf_zip':
+        objects = queryset.select_related(*PDF_SELECT_RELATED[model]).iterator(chunk_size=BACKGROUND_CHUNK_SIZE)
+        return _attachment(stream_zip(pdf_files(model, objects, base_url)), 'application/zip', f'{filename}.zip')
+    return exports.export_response(
+        queryset.annotate(**CSV_EXPORTS[model].export_annotations), CSV_EXPORTS[model].export_fields, 'csv', filename,
+    )
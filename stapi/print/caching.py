@@ -0,0 +1,214 @@
+# stapi/print/caching.py
+
+import contextvars
+import hashlib
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import metrics
+from .models import (
+    Client, PrintJob, PhotoSession, PaymentReceipt, PhotographyPackage, Photographer,
+    ArchivedPrintJob, ArchivedPhotoSession, ArchivedPaymentReceipt,
+)
+from .permissions import get_user_role
+
+# ===========================================================================
+# ذاكرة مؤقتة لاستجابات القراءة مع إبطال دقيق عبر الوسوم (Tags)
+# ===========================================================================
+# كل استجابة مخزنة تحفظ نسخ (versions) الوسوم التي تعتمد عليها، وعند أي تعديل
+# يتم تغيير نسخة الوسوم المتأثرة فقط. لا نحتاج إلى حذف مفاتيح بنمط معين، لذلك
+# تعمل الطريقة مع locmem و file-based و database cache بنفس الشكل.
+
+KEY_PREFIX = 'resp-cache'
+
+# النماذج التي تتأثر قوائمها عند تعديل كل نموذج (القوائم تعرض بيانات متداخلة)
+COLLECTION_DEPENDENTS = {
+    Client: (Client, PrintJob, PhotoSession),
+    PrintJob: (PrintJob, Client, PhotoSession, PaymentReceipt),
+    PhotoSession: (PhotoSession, Client, PrintJob, PaymentReceipt),
+    PaymentReceipt: (PaymentReceipt, PrintJob, Client),
+    PhotographyPackage: (PhotoSession,),
+    Photographer: (PhotoSession,),
+}
+
+
+def collection_tag(model):
+    return f'{model._meta.model_name}:list'
+
+
+# تعطيل الذاكرة مؤقتاً (مثلاً داخل معاملة قد يتم التراجع عنها في /api/batch/)
+_suspended = contextvars.ContextVar('response_cache_suspended', default=False)
+
+
+@contextmanager
+def suspended():
+    """
+    Neither read nor store cached responses inside this block.
+    """
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+
+
+def is_suspended():
+    return _suspended.get()
+
+
+def get_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _client_id_of(instance):
+    if isinstance(instance, (PrintJob, PhotoSession, ArchivedPrintJob, ArchivedPhotoSession)):
+        return instance.client_id
+    if isinstance(instance, (PaymentReceipt, ArchivedPaymentReceipt)):
+        for field in ('printing', 'photography_session'):
+            related_id = getattr(instance, f'{field}_id')
+            if not related_id:
+                continue
+            descriptor = getattr(type(instance), field)
+            if descriptor.is_cached(instance):
+                return getattr(instance, field).client_id
+            model = descriptor.field.related_model
+            return model.objects.filter(pk=related_id).values_list('client_id', flat=True).first()
+    return None
+
+
+def object_tags(instance):
+    """
+    Tags of the object itself and of every object nested in its representation
+    (a print job shows its client, a receipt shows its job or session, ...).
+    A cached detail response is valid as long as none of these tags changed.
+    """
+    tags = {f'{instance._meta.model_name}:{instance.pk}'}
+    if isinstance(instance, PhotoSession):
+        tags.update({f'photographypackage:{instance.package_id}', f'photographer:{instance.photographer_id}'})
+    if isinstance(instance, PaymentReceipt):
+        if instance.printing_id:
+            tags.add(f'printjob:{instance.printing_id}')
+        if instance.photography_session_id:
+            tags.add(f'photosession:{instance.photography_session_id}')
+    client_id = _client_id_of(instance)
+    if client_id:
+        tags.add(f'client:{client_id}')
+    return tags
+
+
+def lookup_tags(model, **lookup):
+    """
+    object_tags() of the row matching `lookup`, loading only its foreign keys, so that the
+    tag versions can be read before the object itself (empty when there is no such row).
+    """
+    foreign_keys = [field.name for field in model._meta.concrete_fields if field.is_relation]
+    stub = model._default_manager.filter(**lookup).only('pk', *foreign_keys).first()
+    return object_tags(stub) if stub is not None else set()
+
+
+def invalidation_tags(instance):
+    """
+    Tags to bump when `instance` is saved or deleted: the object, its dependents
+    (a receipt invalidates its job/session and their client, a job its client's
+    totals) and every list that renders any of them.
+    """
+    tags = object_tags(instance)
+    tags.update(collection_tag(model) for model in COLLECTION_DEPENDENTS.get(type(instance), ()))
+    return tags
+
+
+def _tag_key(tag):
+    return f'{KEY_PREFIX}:tag:{tag}'
+
+
+def bump_tags(tags):
+    # قيمة عشوائية بدلاً من incr حتى لا تعود نسخة وسم محذوف (evicted) إلى قيمة قديمة
+    get_cache().set_many({_tag_key(tag): uuid.uuid4().hex for tag in tags}, None)
+
+
+def get_tag_versions(tags):
+    cache = get_cache()
+    keys = {_tag_key(tag): tag for tag in tags}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        cache.add(key, uuid.uuid4().hex, None)
+        found[key] = cache.get(key)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def response_cache_key(view, request, alias=None):
+    """
+    One entry per viewset, action, query string, renderer, role and database alias the
+    data was read from (a replica entry may predate writes already on the primary).
+    """
+    user = request.user
+    role = 'staff' if user.is_staff else (get_user_role(user) or 'none')
+    query = sorted(request.query_params.lists())
+    raw = f'{request.path}|{query}|{request.accepted_renderer.format}|{role}|{alias or "primary"}'
+    digest = hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+    return f'{KEY_PREFIX}:{view.queryset.model._meta.model_name}:{view.action}:{digest}'
+
+
+def get_cached_response(key):
+    entry = get_cache().get(key)
+    if entry is None:
+        return None
+    if get_tag_versions(entry['tags']) != entry['tags']:
+        return None
+    return entry
+
+
+def set_cached_response(key, tag_versions, data, headers, timeout=None):
+    """
+    `tag_versions` must be read (get_tag_versions) before the data was loaded, so a
+    write that lands in between leaves the entry already invalid instead of stale.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+    entry = {'tags': tag_versions, 'data': data, 'headers': headers}
+    get_cache().set(key, entry, timeout)
+
+# ===========================================================================
+# عدادات الإصابة / الإخفاق (Hit / Miss)
+# ===========================================================================
+def _counter_key(kind, model):
+    return f'{KEY_PREFIX}:{kind}:{model._meta.model_name}'
+
+
+def record_lookup(model, hit):
+    metrics.inc('stapi_response_cache_requests_total', model=model._meta.model_name, result='hit' if hit else 'miss')
+    cache = get_cache()
+    key = _counter_key('hits' if hit else 'misses', model)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # تم حذف العداد بين add و incr
+        cache.set(key, 1, None)
+
+
+CACHED_MODELS = (Client, PrintJob, PhotoSession, PaymentReceipt)
+
+
+def get_stats(models=CACHED_MODELS):
+    cache = get_cache()
+    stats = {}
+    for model in models:
+        hits = cache.get(_counter_key('hits', model), 0)
+        misses = cache.get(_counter_key('misses', model), 0)
+        total = hits + misses
+        stats[model._meta.model_name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else None,
+        }
+    return stats
+
+
+def reset_stats(models=CACHED_MODELS):
+    get_cache().delete_many(
+        [_counter_key(kind, model) for model in models for kind in ('hits', 'misses')]
+    )
@@ -0,0 +1,161 @@
+# stapi/print/calendars.py
+
+import hashlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+
+from .availability import INACTIVE_STATUSES
+from .exports import StreamingResponse
+from .models import CalendarFeed, PhotoSession
+
+# ===========================================================================
+# تقويمات iCalendar (.ics) لجلسات التصوير: /calendar/<token>.ics
+# تطبيقات التقويم تعيد الطلب كل بضع دقائق: استعلام تجميعي واحد يكفي للرد بـ 304
+# ===========================================================================
+FEED_FIELDS = (
+    'pk', 'receipt_number', 'session_date', 'session_time', 'duration_minutes', 'location',
+    'event_type', 'notes', 'updated_at', 'client__name', 'client__phone', 'photographer__name', 'package__name',
+)
+EVENT_TYPES = dict(PhotoSession.EVENT_TYPE_CHOICES)
+# عدد الأحداث المرسلة في كل جزء من الاستجابة
+EVENTS_PER_CHUNK = 100
+
+
+def feed_window():
+    today = timezone.localdate()
+    return (
+        today - timedelta(days=getattr(settings, 'CALENDAR_FEED_PAST_DAYS', 30)),
+        today + timedelta(days=getattr(settings, 'CALENDAR_FEED_FUTURE_DAYS', 365)),
+    )
+
+
+def feed_queryset(feed, date_from, date_to):
+    """
+    Sessions of the feed in the window; a range scan of the (photographer, session_date,
+    session_time) index for a photographer feed, of (session_date, session_time) for the studio.
+    """
+    queryset = PhotoSession.objects.filter(session_date__range=(date_from, date_to)).exclude(status__in=INACTIVE_STATUSES)
+    if feed.photographer_id is not None:
+        queryset = queryset.filter(photographer_id=feed.photographer_id)
+    return queryset
+
+
+def feed_etag(feed, queryset, date_from):
+    """
+    Changes when a session in the window is added, edited, removed or moved, when a
+    client, photographer or package shown in it is renamed, and every day (the window moves).
+    """
+    probe = queryset.order_by().aggregate(
+        count=Count('pk'), last=Max('updated_at'), clients=Max('client__updated_at'),
+        photographers=Max('photographer__updated_at'), packages=Max('package__updated_at'),
+    )
+    fingerprint = '|'.join([feed.token, feed.name, date_from.isoformat()] + [str(probe[key]) for key in sorted(probe)])
+    return '"%s"' % hashlib.md5(fingerprint.encode(), usedforsecurity=False).hexdigest()
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _line(text):
+    """
+    One content line, folded at 75 octets (RFC 5545) without splitting a UTF-8 character.
+    """
+    if len(text.encode()) <= 75:
+        return text + '\r\n'
+    parts, current, size = [], '', 0
+    for char in text:
+        width = len(char.encode())
+        if size + width > 75:
+            parts.append(current)
+            current, size = ' ', 1
+        current += char
+        size += width
+    parts.append(current)
+    return '\r\n'.join(parts) + '\r\n'
+
+
+def _utc(moment):
+    return moment.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def event_lines(row, local_zone):
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:photosession-{row['pk']}@{getattr(settings, 'CALENDAR_FEED_UID_DOMAIN', 'stapi')}",
+        f"DTSTAMP:{_utc(row['updated_at'])}",
+        f"LAST-MODIFIED:{_utc(row['updated_at'])}",
+    ]
+    if row['session_time'] is None:
+        # جلسة بدون وقت: حدث طوال اليوم
+        lines += [
+            f"DTSTART;VALUE=DATE:{row['session_date']:%Y%m%d}",
+            f"DTEND;VALUE=DATE:{row['session_date'] + timedelta(days=1):%Y%m%d}",
+        ]
+    else:
+        start = datetime.combine(row['session_date'], row['session_time'], tzinfo=local_zone)
+        minutes = row['duration_minutes'] or getattr(settings, 'PHOTO_SESSION_DEFAULT_MINUTES', 120)
+        lines += [f'DTSTART:{_utc(start)}', f'DTEND:{_utc(start + timedelta(minutes=minutes))}']
+
+    title = EVENT_TYPES.get(row['event_type']) or 'جلسة تصوير'
+    lines.append(f"SUMMARY:{_escape(title)} - {_escape(row['client__name'])}")
+    if row['location']:
+        lines.append(f"LOCATION:{_escape(row['location'])}")
+    details = [
+        f"رقم الإيصال: {row['receipt_number']}",
+        f"العميل: {row['client__name']} ({row['client__phone'] or '-'})",
+        f"المصور: {row['photographer__name'] or '-'}",
+        f"الباقة: {row['package__name'] or '-'}",
+    ]
+    if row['notes']:
+        details.append(row['notes'])
+    lines += [f"DESCRIPTION:{_escape(chr(10).join(details))}", 'STATUS:CONFIRMED', 'END:VEVENT']
+    return ''.join(_line(line) for line in lines)
+
+
+def stream_calendar(feed, queryset):
+    """
+    Yield the calendar in chunks of EVENTS_PER_CHUNK events while the rows are read
+    with a server-side iterator, so memory does not grow with the number of sessions.
+    """
+    local_zone = ZoneInfo(settings.TIME_ZONE)
+    yield ''.join(_line(line) for line in (
+        'BEGIN:VCALENDAR', 'VERSION:2.0', 'PRODID:-//stapi//photo sessions//AR', 'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH', f'X-WR-CALNAME:{_escape(feed.name)}', f'X-WR-TIMEZONE:{settings.TIME_ZONE}',
+    ))
+    events = []
+    rows = queryset.order_by('session_date', 'session_time', 'pk').values(*FEED_FIELDS)
+    for row in rows.iterator(chunk_size=getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)):
+        events.append(event_lines(row, local_zone))
+        if len(events) >= EVENTS_PER_CHUNK:
+            yield ''.join(events)
+            events = []
+    yield ''.join(events) + _line('END:VCALENDAR')
+
+
+@require_safe
+def calendar_feed(request, token):
+    feed = CalendarFeed.objects.filter(token=token, is_active=True).only('pk', 'name', 'token', 'photographer_id').first()
+    if feed is None:
+        raise Http404
+    date_from, date_to = feed_window()
+    queryset = feed_queryset(feed, date_from, date_to)
+    etag = feed_etag(feed, queryset, date_from)
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = StreamingResponse(stream_calendar(feed, queryset), content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = f'inline; filename="calendar-{feed.pk}.ics"'
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, max_age=getattr(settings, 'CALENDAR_FEED_MAX_AGE', 300))
+    return response
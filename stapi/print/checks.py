@@ -0,0 +1,34 @@
+# stapi/print/checks.py
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.checks import Tags, Warning, register
+
+from .db_routers import get_replica_alias
+
+# ===========================================================================
+# فحوصات الإعدادات (manage.py check)
+# ===========================================================================
+PROCESS_LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache')
+
+
+@register(Tags.caches)
+def replica_sticky_cache_check(app_configs, **kwargs):
+    """
+    With a replica configured, the read-your-writes marker set by mark_recent_write must
+    live in a cache every worker process can see; a locmem cache only pins the worker
+    that handled the write, and the others keep reading stale rows from the replica.
+    """
+    if get_replica_alias() is None:
+        return []
+    alias = getattr(settings, 'REPLICA_STICKY_CACHE_ALIAS', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if alias in settings.CACHES and backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        f"CACHES['{alias}'] (REPLICA_STICKY_CACHE_ALIAS) is not shared between processes, so "
+        "users may not see their own writes when another worker reads from the replica.",
+        hint='Point REPLICA_STICKY_CACHE_ALIAS at a FileBasedCache, DatabaseCache or Redis cache, '
+             'or run a single worker process.',
+        id='print.W001',
+    )]
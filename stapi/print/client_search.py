@@ -0,0 +1,77 @@
+# stapi/print/client_search.py
+
+from django.conf import settings
+from django.db.models import Q
+
+from .models import Client, ClientNameSuffix
+from .normalization import digits_only, normalize_name
+
+# ===========================================================================
+# البحث عن العملاء بالبادئة (الإكمال التلقائي عند الكاونتر)
+# كل مرحلة نطاق على فهرس normalized_name أو phone_digits أو لواحق الاسم مرتب بترتيب الفهرس،
+# فتتوقف قاعدة البيانات بعد أول `limit` صف مهما كان عدد العملاء
+# ===========================================================================
+RESULT_FIELDS = ('id', 'name', 'phone', 'email')
+
+
+def prefix_q(field, prefix):
+    """
+    `field` starts with `prefix`, as a range (prefix <= field < next prefix) that every
+    backend answers from the index; LIKE 'x%' skips it on SQLite (case-insensitive LIKE).
+    """
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return Q(**{f'{field}__gte': prefix, f'{field}__lt': upper})
+
+
+def is_phone_term(term):
+    return any(char.isdigit() for char in term) and all(char.isdigit() or char in '+-() ' for char in term)
+
+
+def search_q(term):
+    """
+    Filter for the admin search and autocomplete_fields: name or a word of the name
+    starting with the term, or phone starting with its digits.
+    """
+    if is_phone_term(term):
+        return prefix_q('phone_digits', digits_only(term))
+    name = normalize_name(term)
+    if not name:
+        return Q(pk__in=[])
+    words = ClientNameSuffix.objects.filter(prefix_q('suffix', name)).values('client_id')
+    return prefix_q('normalized_name', name) | Q(pk__in=words)
+
+
+def _stages(term):
+    """
+    Querysets in ranking order: exact name, name prefix, then name containing a word
+    starting with the term (e.g. the family name). A term made of digits is looked
+    up by phone prefix.
+    """
+    if is_phone_term(term):
+        return [Client.objects.filter(prefix_q('phone_digits', digits_only(term))).order_by('phone_digits', 'pk')]
+    name = normalize_name(term)
+    return [
+        Client.objects.filter(normalized_name=name).order_by('pk'),
+        Client.objects.filter(prefix_q('normalized_name', name)).order_by('normalized_name', 'pk'),
+        Client.objects.filter(prefix_q('name_suffixes__suffix', name)).order_by('name_suffixes__suffix', 'name_suffixes__client_id'),
+    ]
+
+
+def autocomplete(term, limit=None):
+    """
+    Up to `limit` clients ({id, name, phone, email}) matching `term`, best matches
+    first. Stops querying as soon as the limit is reached.
+    """
+    limit = limit or getattr(settings, 'CLIENT_AUTOCOMPLETE_LIMIT', 10)
+    results, seen = [], set()
+    if not normalize_name(term):
+        return results
+    for queryset in _stages(term):
+        # الصفوف المكررة من مراحل سابقة تُستبعد هنا بدلاً من NOT IN في SQL
+        for row in queryset.values(*RESULT_FIELDS)[:limit + len(seen)]:
+            if row['id'] not in seen:
+                seen.add(row['id'])
+                results.append(row)
+                if len(results) == limit:
+                    return results
+    return results
@@ -0,0 +1,111 @@
+# stapi/print/db_routers.py
+
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+# ===========================================================================
+# موجّه قاعدة البيانات (قراءة من النسخة المتماثلة / كتابة على الأساسية)
+# ===========================================================================
+# الاسم المستعار لقاعدة القراءة في هذا الطلب (None = القاعدة الافتراضية)
+_read_alias = contextvars.ContextVar('print_read_alias', default=None)
+
+STICKY_CACHE_KEY = 'db-router:sticky:{user_id}'
+
+
+def sticky_cache():
+    """
+    Cache holding the read-your-writes markers. It must be shared by every worker
+    process (a user's next request may reach another one), see checks.py.
+    """
+    return caches[getattr(settings, 'REPLICA_STICKY_CACHE_ALIAS', 'default')]
+
+
+def get_replica_alias():
+    """
+    Return the configured replica alias, or None when no replica is defined
+    in DATABASES (in which case everything stays on 'default').
+    """
+    alias = getattr(settings, 'REPLICA_DATABASE_ALIAS', 'replica')
+    if alias and alias in connections.databases:
+        return alias
+    return None
+
+
+@contextmanager
+def use_replica():
+    """
+    Route the reads done inside this block to the replica (if configured).
+    Writes are never affected.
+    """
+    token = _read_alias.set(get_replica_alias())
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """
+    Force the reads done inside this block back to the primary database.
+    """
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+def mark_recent_write(user_id):
+    """
+    Pin the user's reads to the primary for REPLICA_STICKY_SECONDS after a write,
+    so they always see their own changes even if the replica is lagging.
+    """
+    if user_id is None:
+        return
+    timeout = getattr(settings, 'REPLICA_STICKY_SECONDS', 15)
+    sticky_cache().set(STICKY_CACHE_KEY.format(user_id=user_id), True, timeout)
+
+
+def has_recent_write(user_id):
+    if user_id is None:
+        return False
+    return bool(sticky_cache().get(STICKY_CACHE_KEY.format(user_id=user_id)))
+
+
+class PrimaryReplicaRouter:
+    """
+    Send reads to the alias selected for the current request (see ReplicaRoutingMixin)
+    and every write to 'default'. Works the same for SQLite files and server databases,
+    since it only picks aliases and never looks at the engine.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # الكائنات المرتبطة تُقرأ من نفس القاعدة التي جاء منها الكائن الأصلي
+            return instance._state.db
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # القاعدتان تحتويان على نفس البيانات
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # النسخة المتماثلة تأخذ المخطط من القاعدة الأساسية (نسخ احتياطي أو تكرار الخادم)
+        if db == get_replica_alias():
+            return False
+        return None
+
+
+async def ahas_recent_write(user_id):
+    if user_id is None:
+        return False
+    return bool(await sticky_cache().aget(STICKY_CACHE_KEY.format(user_id=user_id)))
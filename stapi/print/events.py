@@ -0,0 +1,309 @@
+# stapi/print/events.py
+
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# ===========================================================================
+# موزع أحداث التغيير (Server-Sent Events) عبر سجل في الذاكرة المشتركة
+# ===========================================================================
+def change_event(instance, action):
+    """
+    Compact description of a committed change: model, id, action, status and updated_at.
+    """
+    payload = {'model': instance._meta.model_name, 'id': instance.pk, 'action': action}
+    for field in ('status', 'editing_status'):
+        if hasattr(instance, field):
+            payload[field] = getattr(instance, field)
+    updated_at = getattr(instance, 'updated_at', None)
+    if updated_at is not None:
+        payload['updated_at'] = updated_at
+    return payload
+
+
+class Subscription:
+    """
+    Bounded buffer of events for one SSE connection. When the client reads slower
+    than events arrive and the buffer fills up, the pending events are dropped and
+    `overflowed` is set, so the stream can tell the client to reload instead.
+    """
+
+    def __init__(self, hub, buffer_size, loop):
+        self.hub = hub
+        self.buffer_size = buffer_size
+        self.overflowed = False
+        self._loop = loop
+        self._events = deque()
+        self._lock = threading.Lock()
+        self._wakeup = asyncio.Event()
+
+    def push(self, event):
+        # تُستدعى من خيط النقل، لذلك يتم التنبيه عبر حلقة الأحداث الخاصة بالاتصال
+        with self._lock:
+            if self.overflowed:
+                return
+            if len(self._events) >= self.buffer_size:
+                self._events.clear()
+                self.overflowed = True
+            else:
+                self._events.append(event)
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            # حلقة الأحداث أُغلقت: الاتصال انتهى
+            self.close()
+
+    def mark_lost(self):
+        # أحداث لم تعد متاحة: العميل يجب أن يعيد تحميل بياناته (reset)
+        with self._lock:
+            self._events.clear()
+            self.overflowed = True
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            self.close()
+
+    async def next_batch(self, timeout):
+        """
+        Wait up to `timeout` seconds and return (events, overflowed), clearing both.
+        """
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+            overflowed, self.overflowed = self.overflowed, False
+        return events, overflowed
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class ChangeHub:
+    """
+    Broadcast committed model changes to the SSE connections. publish() appends the event
+    to a log in the shared cache (SSE_CACHE_ALIAS), so changes saved by any process (the
+    WSGI workers) reach the ASGI process serving /api/events/: while that process has
+    subscribers, a relay thread reads new events every SSE_POLL_INTERVAL seconds.
+    The last SSE_HISTORY_SIZE events stay in the log so a reconnecting client can resume
+    from its Last-Event-ID. Event ids are '<stream>-<sequence>'; the stream part changes
+    when the log is lost (cache cleared or evicted), so older ids force a reload.
+    """
+    STREAM_KEY = 'sse:stream'
+    SEQUENCE_KEY = 'sse:{stream}:sequence'
+    EVENT_KEY = 'sse:{stream}:{sequence}'
+
+    def __init__(self, history_size=1000, buffer_size=100, poll_interval=1.0):
+        self.history_size = history_size
+        self.buffer_size = buffer_size
+        self.poll_interval = poll_interval
+        self._subscribers = set()
+        # RLock: push() قد يستدعي unsubscribe() إذا أُغلقت حلقة أحداث الاتصال
+        self._lock = threading.RLock()
+        self._relay = None
+        # آخر حدث سلّمه خيط النقل للمشتركين في هذه العملية
+        self._stream_id = None
+        self._delivered = 0
+        self._waiting_for = None
+
+    def _cache(self):
+        return caches[getattr(settings, 'SSE_CACHE_ALIAS', 'default')]
+
+    def _current(self, cache):
+        """
+        (stream id, last published sequence) of the shared log.
+        """
+        cache.add(self.STREAM_KEY, uuid.uuid4().hex[:8], None)
+        stream_id = cache.get(self.STREAM_KEY)
+        return stream_id, cache.get(self.SEQUENCE_KEY.format(stream=stream_id), 0)
+
+    def publish(self, payload):
+        cache = self._cache()
+        stream_id, _ = self._current(cache)
+        sequence_key = self.SEQUENCE_KEY.format(stream=stream_id)
+        cache.add(sequence_key, 0, None)
+        try:
+            sequence = cache.incr(sequence_key)
+        except ValueError:
+            # العداد حُذف من الذاكرة: سجل جديد، والمعرفات القديمة تؤدي إلى reset
+            stream_id = uuid.uuid4().hex[:8]
+            cache.set(self.STREAM_KEY, stream_id, None)
+            sequence = 1
+            cache.set(self.SEQUENCE_KEY.format(stream=stream_id), sequence, None)
+        cache.set(
+            self.EVENT_KEY.format(stream=stream_id, sequence=sequence), payload,
+            getattr(settings, 'SSE_HISTORY_SECONDS', 3600),
+        )
+
+    def _read(self, cache, stream_id, first, last):
+        """
+        Events first..last of the log as (sequence, event id, payload); None for the
+        sequences that are not (or no longer) in the cache.
+        """
+        keys = {self.EVENT_KEY.format(stream=stream_id, sequence=sequence): sequence for sequence in range(first, last + 1)}
+        found = cache.get_many(keys)
+        return [
+            (sequence, f'{stream_id}-{sequence}', found[key]) if key in found else (sequence, None, None)
+            for key, sequence in keys.items()
+        ]
+
+    def _relay_new_events(self, cache):
+        stream_id, last = self._current(cache)
+        with self._lock:
+            delivered, delivered_stream = self._delivered, self._stream_id
+        if stream_id != delivered_stream or last - delivered > self.history_size:
+            # السجل تغير أو فاتنا أكثر مما يحفظه: على كل مشترك إعادة التحميل
+            events, lost = [], True
+            delivered = last
+        elif last > delivered:
+            events, lost = self._read(cache, stream_id, delivered + 1, last), False
+        else:
+            return
+        with self._lock:
+            self._stream_id = stream_id
+            subscribers = list(self._subscribers)
+            if lost:
+                for subscription in subscribers:
+                    subscription.mark_lost()
+            for sequence, event_id, payload in events:
+                if event_id is None:
+                    # publish() يزيد العداد قبل حفظ الحدث: ننتظر دورة واحدة ثم نعتبره مفقوداً
+                    if self._waiting_for != sequence:
+                        self._waiting_for = sequence
+                        break
+                    for subscription in subscribers:
+                        subscription.mark_lost()
+                else:
+                    for subscription in subscribers:
+                        subscription.push((sequence, event_id, payload))
+                delivered = sequence
+                self._waiting_for = None
+            self._delivered = delivered
+
+    def _run_relay(self):
+        try:
+            while True:
+                with self._lock:
+                    if not self._subscribers:
+                        self._relay = None
+                        return
+                try:
+                    self._relay_new_events(self._cache())
+                except Exception:
+                    logger.exception('SSE relay failed to read the change log')
+                time.sleep(self.poll_interval)
+        finally:
+            # DatabaseCache يفتح اتصالاً في هذا الخيط
+            connections.close_all()
+
+    def _missed_since(self, cache, last_event_id):
+        """
+        Events after `last_event_id` already relayed to this process, or None when they
+        are no longer available. Called with the lock held.
+        """
+        stream_id, _, sequence = last_event_id.partition('-')
+        if stream_id != self._stream_id or not sequence.isdigit():
+            return None
+        sequence = int(sequence)
+        if sequence > self._delivered:
+            # أحدث مما سلّمه خيط النقل: الباقي سيصل عبره
+            return []
+        if self._delivered - sequence > self.history_size:
+            return None
+        missed = self._read(cache, stream_id, sequence + 1, self._delivered)
+        if any(event_id is None for _, event_id, _ in missed):
+            return None
+        return missed
+
+    def subscribe(self, last_event_id=None):
+        """
+        Register a connection. Returns (subscription, resumed): `resumed` is False when
+        `last_event_id` could not be replayed and the client has to reload its data.
+        """
+        subscription = Subscription(self, self.buffer_size, asyncio.get_running_loop())
+        cache = self._cache()
+        resumed = True
+        with self._lock:
+            if self._relay is None:
+                # أول مشترك: النقل يبدأ من آخر حدث منشور
+                self._stream_id, self._delivered = self._current(cache)
+                self._waiting_for = None
+                self._relay = threading.Thread(target=self._run_relay, name='sse-relay', daemon=True)
+                start_relay = True
+            else:
+                start_relay = False
+            if last_event_id:
+                missed = self._missed_since(cache, last_event_id)
+                # أكثر مما يتسع له المخزن: لا نرسل جزءاً منها، العميل يعيد التحميل
+                if missed is None or len(missed) > self.buffer_size:
+                    resumed = False
+                else:
+                    for event in missed:
+                        subscription.push(event)
+            self._subscribers.add(subscription)
+        if start_relay:
+            self._relay.start()
+        return subscription, resumed
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+
+change_hub = ChangeHub(
+    history_size=getattr(settings, 'SSE_HISTORY_SIZE', 1000),
+    buffer_size=getattr(settings, 'SSE_CLIENT_BUFFER_SIZE', 100),
+    poll_interval=getattr(settings, 'SSE_POLL_INTERVAL', 1.0),
+)
+
+# ===========================================================================
+# تنسيق رسائل SSE
+# ===========================================================================
+def format_sse(data, event=None, event_id=None):
+    lines = []
+    if event_id:
+        lines.append(f'id: {event_id}')
+    if event:
+        lines.append(f'event: {event}')
+    lines.append('data: ' + json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False))
+    return '\n'.join(lines) + '\n\n'
+
+
+async def stream_changes(subscription, resumed):
+    """
+    Body of the SSE response: 'change' events, a 'reset' event when the client must
+    reload (lost history or overflowed buffer) and a comment line as heartbeat.
+    """
+    heartbeat = getattr(settings, 'SSE_HEARTBEAT_SECONDS', 15)
+    try:
+        yield f"retry: {getattr(settings, 'SSE_RETRY_MS', 5000)}\n\n"
+        if not resumed:
+            yield format_sse({'reason': 'history_unavailable'}, event='reset')
+        while True:
+            events, overflowed = await subscription.next_batch(heartbeat)
+            if overflowed:
+                yield format_sse({'reason': 'buffer_overflow'}, event='reset')
+            for _, event_id, payload in events:
+                yield format_sse(payload, event='change', event_id=event_id)
+            if not events and not overflowed:
+                yield ': ping\n\n'
+    finally:
+        subscription.close()
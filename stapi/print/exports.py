@@ -0,0 +1,144 @@
+# stapi/print/exports.py
+
+import csv
+import datetime
+import json
+import re
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+# ===========================================================================
+# تصدير البيانات بشكل متدفق (CSV / NDJSON) بذاكرة ثابتة
+# ===========================================================================
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+# ===========================================================================
+# استجابات متدفقة تبقى بذاكرة ثابتة تحت WSGI وASGI
+# ===========================================================================
+def _next_parts(iterator, size):
+    parts, total = [], 0
+    for part in iterator:
+        parts.append(part)
+        total += len(part)
+        if total >= size:
+            break
+    return parts
+
+
+class _PulledStreamMixin:
+    """
+    Under ASGI Django reads a sync iterator into a list before sending anything.
+    Pull it instead a few parts at a time on the request's sync thread, where the
+    view opened its cursor/file, so exports and downloads keep a flat memory profile.
+    """
+
+    async def __aiter__(self):
+        if self.is_async:
+            async for part in super().__aiter__():
+                yield part
+            return
+        iterator = iter(self.streaming_content)
+        pull = sync_to_async(_next_parts)
+        size = getattr(settings, 'STREAM_PULL_BYTES', 64 * 1024)
+        while parts := await pull(iterator, size):
+            for part in parts:
+                yield part
+
+
+class StreamingResponse(_PulledStreamMixin, StreamingHttpResponse):
+    pass
+
+
+class StreamingFileResponse(_PulledStreamMixin, FileResponse):
+    pass
+
+
+class _Echo:
+    """
+    File-like object for csv.writer that returns each line instead of storing it.
+    """
+
+    def write(self, value):
+        return value
+
+
+def _export_value(value):
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.isoformat()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def iter_rows(queryset, fields):
+    """
+    Iterate over `queryset` as dicts of `fields` (values() projection, no model instances),
+    fetching `EXPORT_CHUNK_SIZE` rows at a time from the database.
+    """
+    chunk_size = getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+    for row in queryset.values(*fields).iterator(chunk_size=chunk_size):
+        yield {field: _export_value(row[field]) for field in fields}
+
+
+def _batched(lines, size=500):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+# خلايا تبدأ بهذه الرموز ينفذها Excel كمعادلات (CSV injection)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+_NUMBER = re.compile(r'^[+-]?\d+(\.\d+)?$')
+
+
+def _csv_cell(value):
+    """
+    Text that would be read as a formula is prefixed with ' (the numbers themselves,
+    e.g. a negative amount, are left as they are).
+    """
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) and not _NUMBER.match(value):
+        return "'" + value
+    return value
+
+
+def stream_csv(rows, fields):
+    writer = csv.writer(_Echo())
+    # BOM حتى يعرض Excel النصوص العربية بشكل صحيح
+    yield '\ufeff' + writer.writerow(fields)
+    yield from _batched(writer.writerow([_csv_cell(row[field]) for field in fields]) for row in rows)
+
+
+def stream_ndjson(rows):
+    yield from _batched(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+
+
+def export_response(queryset, fields, export_format, filename):
+    """
+    Streaming response that starts sending the file as soon as the first rows are read.
+    `fields` may contain lookups (e.g. 'client__name') and annotation names.
+    """
+    rows = iter_rows(queryset, fields)
+    if export_format == 'ndjson':
+        content = stream_ndjson(rows)
+    else:
+        content = stream_csv(rows, fields)
+    response = StreamingResponse(content, content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
@@ -0,0 +1,105 @@
+# stapi/print/ledger.py
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Abs, Coalesce
+from django.utils import timezone
+
+from . import caching
+from .events import change_event, change_hub
+from .models import PrintJob, PhotoSession, PaymentReceipt
+
+# ===========================================================================
+# مطابقة paid_amount في الطلبات والجلسات مع مجموع إيصالات الدفع
+# ===========================================================================
+LEDGER_MODELS = {
+    'printjob': (PrintJob, 'printing'),
+    'photosession': (PhotoSession, 'photography_session'),
+}
+# SQLite يجمع الأعمدة العشرية كأرقام عائمة: فرق أقل من نصف هللة ليس اختلافاً
+TOLERANCE = Decimal('0.005')
+AMOUNT = DecimalField(max_digits=12, decimal_places=2)
+
+
+def mismatches_queryset(model_name):
+    """
+    One grouped query over the whole table (LEFT JOIN receipts, GROUP BY row, HAVING
+    difference): the rows whose paid_amount differs from the sum of their receipts.
+    """
+    model, _ = LEDGER_MODELS[model_name]
+    return (
+        model.objects.order_by()
+        .values('pk', 'receipt_number', 'client_id', 'status', 'total_amount', 'paid_amount')
+        .annotate(receipts_total=Coalesce(Sum('payment_receipts__paid_amount'), Value(Decimal('0.00')), output_field=AMOUNT))
+        .annotate(difference=Abs(F('paid_amount') - F('receipts_total'), output_field=AMOUNT))
+        .filter(difference__gt=TOLERANCE)
+        .order_by('pk')
+    )
+
+
+def _receipts_total(model_name):
+    _, link = LEDGER_MODELS[model_name]
+    total = (
+        PaymentReceipt.objects.filter(**{link: OuterRef('pk')}).order_by().values(link)
+        .annotate(total=Sum('paid_amount')).values('total')
+    )
+    return Coalesce(Subquery(total), Value(Decimal('0.00')), output_field=AMOUNT)
+
+
+def report(model_name, limit=100):
+    """
+    {'model', 'mismatches' (count), 'difference_total', 'rows' (first `limit`)}.
+    """
+    rows = []
+    count = 0
+    difference_total = Decimal('0.00')
+    for row in mismatches_queryset(model_name).iterator():
+        count += 1
+        signed = Decimal(str(row['paid_amount'])) - Decimal(str(row['receipts_total']))
+        difference_total += signed
+        if len(rows) < limit:
+            rows.append({
+                'id': row['pk'],
+                'receipt_number': row['receipt_number'],
+                'client_id': row['client_id'],
+                'status': row['status'],
+                'total_amount': row['total_amount'],
+                'paid_amount': row['paid_amount'],
+                'receipts_total': Decimal(str(row['receipts_total'])).quantize(Decimal('0.01')),
+                'difference': signed.quantize(Decimal('0.01')),
+            })
+    return {
+        'model': model_name,
+        'mismatches': count,
+        'difference_total': difference_total.quantize(Decimal('0.01')),
+        'rows': rows,
+    }
+
+
+def repair(model_name):
+    """
+    Set paid_amount to the sum of the receipts for every mismatched row in a single
+    UPDATE ... WHERE id IN (grouped query). Statuses are left as they are; cache tags
+    and change events are sent on commit for the repaired rows. Returns the number of
+    rows updated.
+    """
+    model, _ = LEDGER_MODELS[model_name]
+    with transaction.atomic():
+        mismatched = mismatches_queryset(model_name)
+        affected = list(mismatched.values_list('pk', 'client_id'))
+        updated = model.objects.filter(pk__in=mismatched.values('pk')).update(
+            # update() لا يحدّث auto_now: نحدّثه يدوياً للمزامنة التزايدية و ETag
+            paid_amount=_receipts_total(model_name), updated_at=timezone.now(),
+        )
+        # ولا يرسل أحداث التغيير (SSE): تُبنى من الصفوف بعد التحديث وتُنشر بعد الحفظ كما في signals
+        changes = [change_event(instance, 'saved') for instance in model.objects.filter(pk__in=[pk for pk, _ in affected])]
+    if updated:
+        # update() لا يرسل إشارات post_save: إبطال القوائم وتفاصيل العملاء المتأثرين
+        tags = {caching.collection_tag(dependent) for dependent in caching.COLLECTION_DEPENDENTS[model]}
+        for pk, client_id in affected:
+            tags.update({f'{model._meta.model_name}:{pk}', f'client:{client_id}'})
+        transaction.on_commit(lambda: caching.bump_tags(tags))
+        transaction.on_commit(lambda: [change_hub.publish(payload) for payload in changes])
+    return updated
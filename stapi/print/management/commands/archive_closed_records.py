@@ -0,0 +1,61 @@
+# stapi/print/management/commands/archive_closed_records.py
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from print import archiving
+from print.models import PrintJob, PhotoSession, PaymentReceipt
+
+
+class Command(BaseCommand):
+    help = (
+        'Move delivered/cancelled print jobs and photo sessions unchanged for ARCHIVE_AFTER_DAYS, '
+        'with their receipts, to the archive tables in batched transactions (run nightly from cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=getattr(settings, 'ARCHIVE_AFTER_DAYS', 365),
+            help='Archive closed records not updated in the last N days.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=getattr(settings, 'ARCHIVE_BATCH_SIZE', 500),
+            help='Records moved per transaction.',
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.1,
+            help='Seconds to wait between batches, so that API writes are not blocked for long.',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only count the records that would be archived.')
+
+    def handle(self, *args, **options):
+        for model in (PrintJob, PhotoSession, PaymentReceipt):
+            missing = archiving.missing_archive_columns(model)
+            if missing:
+                raise CommandError(
+                    f"جدول الأرشيف لـ {model.__name__} لا يحتوي على الحقول: {', '.join(missing)}"
+                )
+
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        for model in (PrintJob, PhotoSession):
+            if options['dry_run']:
+                count = archiving.closed_queryset(model, cutoff).count()
+                self.stdout.write(f'{model.__name__}: {count} records would be archived.')
+                continue
+
+            rows = receipts = 0
+            while True:
+                moved, moved_receipts = archiving.archive_batch(model, cutoff, options['batch_size'])
+                if not moved:
+                    break
+                rows += moved
+                receipts += moved_receipts
+                self.stdout.write(f'{model.__name__}: {rows} archived...')
+                time.sleep(options['pause'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{model.__name__}: archived {rows} records and {receipts} receipts older than {cutoff:%Y-%m-%d}.'
+            ))
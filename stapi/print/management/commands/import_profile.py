@@ -0,0 +1,97 @@
+# stapi/print/management/commands/import_profile.py
+
+import json
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# ===========================================================================
+# قياس زمن الاستيراد عند بدء التشغيل (python -X importtime) مجمعاً حسب الحزمة
+# ===========================================================================
+# ما يتم تشغيله في عملية Python جديدة لكل هدف
+TARGETS = {
+    'setup': 'import django; django.setup()',
+    'urls': 'import django; django.setup(); from django.urls import get_resolver; get_resolver().url_patterns',
+    'wsgi': 'import stapi.wsgi',
+}
+# مكتبات يجب ألا تُحمّل عند بدء التشغيل (تُحمّل عند أول طلب PDF)
+HEAVY_MODULES = ('weasyprint', 'qrcode', 'PIL', 'cairocffi', 'cffi', 'fontTools', 'pydyf', 'tinycss2', 'cssselect2')
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def parse_importtime(output):
+    """
+    [(module, self_us, cumulative_us, depth)] from the stderr of `python -X importtime`.
+    """
+    entries = []
+    for line in output.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return entries
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure startup import cost in a fresh interpreter (python -X importtime) and report it '
+        'by package and by module, flagging heavy rendering libraries loaded at startup.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', choices=sorted(TARGETS), default='urls',
+            help="What to import: 'setup' (django.setup), 'urls' (setup + URLconf, default) or 'wsgi'.",
+        )
+        parser.add_argument('--top', type=int, default=20, help='Number of packages/modules to list.')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON.')
+
+    def handle(self, *args, **options):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', TARGETS[options['target']]],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f'فشل الاستيراد:\n{result.stderr[-2000:]}')
+        entries = parse_importtime(result.stderr)
+
+        packages = {}
+        for module, self_us, _, _ in entries:
+            package = module.split('.')[0]
+            packages[package] = packages.get(package, 0) + self_us
+        total_us = sum(self_us for _, self_us, _, _ in entries)
+        heavy = sorted({module.split('.')[0] for module, *_ in entries} & set(HEAVY_MODULES))
+        report = {
+            'target': options['target'],
+            'total_ms': round(total_us / 1000, 1),
+            'modules_imported': len(entries),
+            'heavy_modules_loaded': heavy,
+            'packages': [
+                {'package': package, 'self_ms': round(us / 1000, 1)}
+                for package, us in sorted(packages.items(), key=lambda item: -item[1])[:options['top']]
+            ],
+            'modules': [
+                {'module': module, 'self_ms': round(self_us / 1000, 1), 'cumulative_ms': round(cumulative_us / 1000, 1)}
+                for module, self_us, cumulative_us, _ in sorted(entries, key=lambda entry: -entry[2])[:options['top']]
+            ],
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(f"Import time for '{report['target']}': {report['total_ms']} ms ({report['modules_imported']} modules)")
+        self.stdout.write('\nBy package (self time):')
+        for row in report['packages']:
+            self.stdout.write(f"  {row['self_ms']:>9.1f} ms  {row['package']}")
+        self.stdout.write('\nSlowest modules (cumulative time):')
+        for row in report['modules']:
+            self.stdout.write(f"  {row['cumulative_ms']:>9.1f} ms  {row['module']}")
+        if heavy:
+            self.stdout.write(self.style.WARNING(f"\nHeavy rendering libraries loaded at startup: {', '.join(heavy)}"))
+        else:
+            self.stdout.write(self.style.SUCCESS('\nNo heavy rendering library is loaded at startup.'))
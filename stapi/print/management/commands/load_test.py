@@ -0,0 +1,226 @@
+# stapi/print/management/commands/load_test.py
+
+import json
+import math
+import random
+import threading
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client as TestClient
+from rest_framework.authtoken.models import Token
+
+from print.models import REMAINING_AMOUNT, Client, PrintJob, PaymentReceipt
+
+# ===========================================================================
+# سيناريوهات العمل الفعلية (قائمة، بحث، فتح عميل، إضافة دفعة، طباعة إيصال)
+# كل خطوة: (اسم نقطة النهاية في التقرير، الطريقة، المسار، البيانات)
+# ===========================================================================
+def list_scenario(rng, data):
+    page = min(int(rng.expovariate(1 / 2)) + 1, data['printjob_pages'])
+    yield 'GET /api/printjobs/?page={n}', 'GET', f'/api/printjobs/?page={page}', None
+
+
+def search_scenario(rng, data):
+    term = rng.choice(data['search_terms'])
+    yield 'GET /api/clients/?search={term}', 'GET', f'/api/clients/?search={quote(term)}', None
+
+
+def open_client_scenario(rng, data):
+    client_id = rng.choice(data['client_ids'])
+    yield 'GET /api/clients/{id}/', 'GET', f'/api/clients/{client_id}/', None
+    yield 'GET /api/clients/{id}/dashboard/', 'GET', f'/api/clients/{client_id}/dashboard/', None
+
+
+def add_payment_scenario(rng, data):
+    job_id = rng.choice(data['payable_job_ids'])
+    yield (
+        'POST /api/printjobs/{id}/add-payment/', 'POST', f'/api/printjobs/{job_id}/add-payment/',
+        {'amount': '1.00', 'payment_method': rng.choice(('cash', 'card')), 'notes': 'load test'},
+    )
+
+
+def render_receipt_scenario(rng, data):
+    receipt_id = rng.choice(data['receipt_ids'])
+    yield (
+        'GET /api/receipts/{id}/generate-pdf-receipt/', 'GET',
+        f'/api/receipts/{receipt_id}/generate-pdf-receipt/', None,
+    )
+
+
+SCENARIOS = {
+    'list': list_scenario,
+    'search': search_scenario,
+    'open_client': open_client_scenario,
+    'add_payment': add_payment_scenario,
+    'render_receipt': render_receipt_scenario,
+}
+DEFAULT_MIX = 'list=35,search=25,open_client=25,add_payment=10,render_receipt=5'
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise CommandError(f'سيناريو غير معروف: {name} (المتاح: {", ".join(SCENARIOS)})')
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise CommandError(f'وزن غير صالح للسيناريو {name}: {weight}')
+    if not any(mix.values()):
+        raise CommandError('يجب أن يكون وزن سيناريو واحد على الأقل أكبر من صفر.')
+    return mix
+
+
+def percentile(sorted_values, pct):
+    # nearest-rank
+    if not sorted_values:
+        return None
+    return sorted_values[max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay scripted scenarios (list, search, open client, add payment, render receipt) '
+        'concurrently against the API in-process and report RPS and p50/p95/p99 latency per '
+        'endpoint as JSON. Writes data (add_payment): run it against a seeded copy of the '
+        'database (see seed_load_data), never production. Threads share the GIL, so compare '
+        'results between runs on the same machine rather than reading them as server capacity.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=8, help='Number of concurrent workers (threads).')
+        parser.add_argument('--duration', type=float, default=30, help='Run for N seconds.')
+        parser.add_argument('--requests', type=int, default=None, help='Stop after N requests in total.')
+        parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Scenario weights (default: {DEFAULT_MIX}).')
+        parser.add_argument('--username', default=None, help='Run as this user (default: the first manager).')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed for scenario choices.')
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options['mix'])
+        user = self._user(options['username'])
+        token = Token.objects.get_or_create(user=user)[0].key
+        data = self._sample_data(mix)
+
+        self.deadline = time.monotonic() + options['duration']
+        self.budget = options['requests']
+        self.sent = 0
+        self.lock = threading.Lock()
+        self.results = {}
+        seed_rng = random.Random(options['seed'])
+        workers = [
+            threading.Thread(target=self._worker, args=(token, random.Random(seed_rng.random()), mix, data))
+            for _ in range(options['concurrency'])
+        ]
+        started = time.monotonic()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.monotonic() - started
+        self.stdout.write(json.dumps(self._report(elapsed, options['concurrency'], mix), indent=2, ensure_ascii=False))
+
+    def _user(self, username):
+        if username:
+            user = User.objects.filter(username=username, is_active=True).first()
+            if user is None:
+                raise CommandError(f'المستخدم غير موجود أو غير نشط: {username}')
+            return user
+        user = (
+            User.objects.filter(is_active=True, profile__role='manager').order_by('pk').first()
+            or User.objects.filter(is_active=True).order_by('pk').first()
+        )
+        if user is None:
+            raise CommandError('لا يوجد أي مستخدم نشط لتشغيل الاختبار.')
+        return user
+
+    def _sample_data(self, mix):
+        page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE') or 10
+        data = {
+            'printjob_pages': max(math.ceil(PrintJob.objects.count() / page_size), 1),
+            'client_ids': list(Client.objects.values_list('pk', flat=True)),
+            'payable_job_ids': list(
+                PrintJob.objects.annotate(remaining=REMAINING_AMOUNT).filter(remaining__gte=100)
+                .exclude(status='cancelled').values_list('pk', flat=True)[:5000]
+            ),
+            'receipt_ids': list(PaymentReceipt.objects.values_list('pk', flat=True)[:5000]),
+        }
+        # كلمات البحث: أجزاء من أسماء عملاء حقيقيين
+        names = Client.objects.order_by('?').values_list('name', flat=True)[:200]
+        data['search_terms'] = [word for name in names for word in name.split()[:2]]
+        required = {
+            'search': 'search_terms', 'open_client': 'client_ids',
+            'add_payment': 'payable_job_ids', 'render_receipt': 'receipt_ids',
+        }
+        for scenario, key in required.items():
+            if mix.get(scenario) and not data[key]:
+                raise CommandError(f'لا توجد بيانات كافية لسيناريو {scenario}، شغّل seed_load_data أولاً.')
+        return data
+
+    def _take(self):
+        with self.lock:
+            if time.monotonic() >= self.deadline or (self.budget is not None and self.sent >= self.budget):
+                return False
+            self.sent += 1
+            return True
+
+    def _worker(self, token, rng, mix, data):
+        client = TestClient(raise_request_exception=False, HTTP_AUTHORIZATION=f'Token {token}')
+        names, weights = zip(*mix.items())
+        results = {}
+        try:
+            while True:
+                scenario = SCENARIOS[rng.choices(names, weights)[0]]
+                for label, method, path, body in scenario(rng, data):
+                    if not self._take():
+                        return
+                    started = time.perf_counter()
+                    response = client.generic(
+                        method, path, json.dumps(body) if body is not None else '', content_type='application/json',
+                    )
+                    latency = time.perf_counter() - started
+                    entry = results.setdefault(label, {'latencies': [], 'errors': 0, 'statuses': {}})
+                    entry['latencies'].append(latency)
+                    entry['statuses'][response.status_code] = entry['statuses'].get(response.status_code, 0) + 1
+                    if response.status_code >= 400:
+                        entry['errors'] += 1
+        finally:
+            with self.lock:
+                for label, entry in results.items():
+                    merged = self.results.setdefault(label, {'latencies': [], 'errors': 0, 'statuses': {}})
+                    merged['latencies'] += entry['latencies']
+                    merged['errors'] += entry['errors']
+                    for status_code, count in entry['statuses'].items():
+                        merged['statuses'][status_code] = merged['statuses'].get(status_code, 0) + count
+            connections.close_all()
+
+    def _report(self, elapsed, concurrency, mix):
+        endpoints = {}
+        total = 0
+        for label, entry in sorted(self.results.items()):
+            latencies = sorted(entry['latencies'])
+            total += len(latencies)
+            endpoints[label] = {
+                'requests': len(latencies),
+                'errors': entry['errors'],
+                'statuses': {str(code): count for code, count in sorted(entry['statuses'].items())},
+                'rps': round(len(latencies) / elapsed, 2),
+                'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+                'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+                'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+                'max_ms': round(latencies[-1] * 1000, 2),
+            }
+        return {
+            'duration_s': round(elapsed, 2),
+            'concurrency': concurrency,
+            'mix': mix,
+            'requests': total,
+            'rps': round(total / elapsed, 2) if elapsed else None,
+            'endpoints': endpoints,
+        }
@@ -0,0 +1,52 @@
+# stapi/print/management/commands/process_session_photos.py
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from print import photos, thumbnails
+from print.models import SessionPhoto
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate thumbnails and previews for uploaded session photos still marked as processing '
+        '(e.g. the server restarted before the pool finished), and optionally retry failed ones.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int, default=10,
+            help='Only photos waiting for at least N minutes, so running servers are not raced.',
+        )
+        parser.add_argument('--retry-failed', action='store_true', help='Also process photos whose processing failed.')
+        parser.add_argument('--workers', type=int, default=None, help='Processes to use (default: PHOTO_PROCESS_WORKERS).')
+
+    def handle(self, *args, **options):
+        statuses = ['processing', 'failed'] if options['retry_failed'] else ['processing']
+        pending = list(SessionPhoto.objects.filter(
+            status__in=statuses, updated_at__lt=timezone.now() - timedelta(minutes=options['older_than']),
+        ).only('pk', 'file_path').order_by('pk'))
+        if not pending:
+            self.stdout.write('No photos to process.')
+            return
+
+        failed = 0
+        with photos.new_executor(options['workers']) as executor:
+            futures = [
+                (photo.pk, executor.submit(
+                    thumbnails.make_derivatives, str(photos.absolute_path(photo.file_path)), photos.derivative_jobs(photo),
+                ))
+                for photo in pending
+            ]
+            for done, (photo_id, future) in enumerate(futures, start=1):
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    result = exc
+                    failed += 1
+                photos.record_result(photo_id, result)
+                if done % 100 == 0:
+                    self.stdout.write(f'{done}/{len(futures)} processed...')
+        self.stdout.write(self.style.SUCCESS(f'Processed {len(pending)} photos ({failed} failed).'))
@@ -0,0 +1,24 @@
+# stapi/print/management/commands/prune_deletion_log.py
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from print.models import DeletionLog
+
+
+class Command(BaseCommand):
+    help = 'Delete DeletionLog entries older than DELETION_LOG_RETENTION_DAYS (run daily from cron).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=getattr(settings, 'DELETION_LOG_RETENTION_DAYS', 30),
+            help='Keep the entries of the last N days.',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted, _ = DeletionLog.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} deletion log entries older than {cutoff:%Y-%m-%d %H:%M}.'))
@@ -0,0 +1,28 @@
+# stapi/print/management/commands/reconcile_ledger.py
+
+import json
+
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+
+from print import ledger
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare paid_amount of every print job / photo session with the sum of its payment "
+        "receipts and print the mismatches as JSON. With --repair, set paid_amount to the "
+        "receipts total in one bulk update per table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(ledger.LEDGER_MODELS), help='Only this table (default: both).')
+        parser.add_argument('--limit', type=int, default=100, help='Mismatched rows listed per table.')
+        parser.add_argument('--repair', action='store_true', help='Fix the mismatched rows after reporting them.')
+
+    def handle(self, *args, **options):
+        model_names = [options['model']] if options['model'] else list(ledger.LEDGER_MODELS)
+        result = {'reports': [ledger.report(name, options['limit']) for name in model_names]}
+        if options['repair']:
+            result['repaired'] = {name: ledger.repair(name) for name in model_names}
+        self.stdout.write(json.dumps(result, indent=2, cls=DjangoJSONEncoder, ensure_ascii=False))
@@ -0,0 +1,45 @@
+# stapi/print/management/commands/recover_bulk_exports.py
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from print import bulk_exports
+from print.models import BulkExport
+
+INTERRUPTED_ERROR = 'توقف الخادم قبل انتهاء التصدير، أعد تنفيذ الإجراء من لوحة الإدارة.'
+
+
+class Command(BaseCommand):
+    help = (
+        'Mark background bulk exports still pending or running as failed (the server restarted '
+        'before the in-process pool finished them) and delete the partial files they left behind. '
+        'Run after each deploy/restart, or from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int, default=60,
+            help='Only exports requested at least N minutes ago, so running servers are not raced.',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['older_than'])
+        # التحديدات غير محفوظة (المعرفات تُمرر للخيط فقط)، فلا يمكن إعادة التشغيل تلقائياً
+        failed = BulkExport.objects.filter(status__in=['pending', 'running'], created_at__lt=cutoff).update(
+            status='failed', error=INTERRUPTED_ERROR, finished_at=timezone.now(),
+        )
+
+        # الملف يُسجل في BulkExport فقط عند اكتماله: أي ملف آخر قديم هو بقايا تصدير انقطع
+        removed = 0
+        root = bulk_exports.export_root()
+        if root.is_dir():
+            known = set(BulkExport.objects.exclude(file_path='').values_list('file_path', flat=True))
+            oldest = time.time() - options['older_than'] * 60
+            for path in root.iterdir():
+                if path.is_file() and path.name not in known and path.stat().st_mtime < oldest:
+                    path.unlink(missing_ok=True)
+                    removed += 1
+        self.stdout.write(self.style.SUCCESS(f'Marked {failed} interrupted exports as failed, removed {removed} partial files.'))
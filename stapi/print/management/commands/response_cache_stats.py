@@ -0,0 +1,20 @@
+# stapi/print/management/commands/response_cache_stats.py
+
+import json
+
+from django.core.management.base import BaseCommand
+
+from print import caching
+
+
+class Command(BaseCommand):
+    help = 'Print hit/miss counters of the read-endpoint response cache as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the counters after printing them.')
+
+    def handle(self, *args, **options):
+        stats = caching.get_stats()
+        self.stdout.write(json.dumps(stats, indent=2))
+        if options['reset']:
+            caching.reset_stats()
@@ -0,0 +1,200 @@
+# stapi/print/management/commands/seed_load_data.py
+
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from print import caching
+from print.models import Client, ClientNameSuffix, PrintJob, PhotoSession, PaymentReceipt, PhotographyPackage, Photographer
+
+# ===========================================================================
+# بيانات وهمية بتوزيعات قريبة من الإنتاج لاختبارات الحمل (load_test)
+# ===========================================================================
+FIRST_NAMES = (
+    'محمد', 'أحمد', 'علي', 'عمر', 'خالد', 'يوسف', 'إبراهيم', 'عبدالله', 'حسن', 'مصطفى',
+    'فاطمة', 'عائشة', 'مريم', 'سارة', 'نور', 'هدى', 'ليلى', 'زينب', 'آمنة', 'سلمى',
+)
+FAMILY_NAMES = (
+    'الأحمد', 'العلي', 'الحسن', 'المصري', 'الشامي', 'القحطاني', 'العتيبي', 'الزهراني',
+    'الخطيب', 'النجار', 'الحداد', 'الصالح', 'الفارس', 'السيد', 'عبدالرحمن', 'حمدان',
+)
+CITIES = ('الرياض', 'جدة', 'الدمام', 'مكة', 'المدينة', 'القاهرة', 'عمّان', 'دبي')
+
+# (القيمة، الوزن): توزيع الحالات كما في بيانات المحل الفعلية تقريباً (أغلب الطلبات قديمة ومسلّمة)
+PRINT_JOB_STATUSES = (
+    ('delivered', 45), ('completed', 15), ('partially_paid', 10), ('in_progress', 10),
+    ('pending', 10), ('ready_for_delivery', 5), ('cancelled', 5),
+)
+PHOTO_SESSION_STATUSES = (
+    ('delivered', 40), ('completed', 15), ('scheduled', 15), ('partially_paid', 10),
+    ('processing', 8), ('ready_for_delivery', 5), ('in_progress', 4), ('cancelled', 3),
+)
+PAYMENT_METHODS = (('cash', 60), ('card', 20), ('bank_transfer', 12), ('mobile_money', 8))
+FULLY_PAID_STATUSES = ('delivered', 'completed', 'ready_for_delivery')
+
+
+def weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed N clients with print jobs, photo sessions and payment receipts using realistic '
+        'distributions (status mix, receipts per job, Arabic names) for load testing.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=1000, help='Number of clients to create.')
+        parser.add_argument('--jobs-per-client', type=float, default=3, help='Average print jobs per client.')
+        parser.add_argument('--sessions-per-client', type=float, default=1, help='Average photo sessions per client.')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed (same seed = same data).')
+        parser.add_argument('--batch-size', type=int, default=500, help='Clients inserted per transaction.')
+
+    def handle(self, *args, **options):
+        if options['clients'] <= 0:
+            raise CommandError('عدد العملاء يجب أن يكون أكبر من صفر.')
+        self.rng = random.Random(options['seed'])
+        self.today = timezone.localdate()
+        # bulk_create لا يستدعي save() فنولد أرقام الإيصالات هنا (بادئة ثابتة لكل تشغيل)
+        self.stamp = timezone.now().strftime('%Y%m%d%H%M%S')
+        self.serial = 0
+        self.issuers = list(User.objects.filter(is_active=True).values_list('pk', flat=True)) or [None]
+        self.packages = self._ensure_packages()
+        self.photographers = list(Photographer.objects.filter(is_active=True).values_list('pk', flat=True))
+        self.phones = set(Client.objects.exclude(phone=None).values_list('phone', flat=True))
+
+        totals = {'clients': 0, 'print_jobs': 0, 'photo_sessions': 0, 'receipts': 0}
+        remaining = options['clients']
+        while remaining:
+            size = min(remaining, options['batch_size'])
+            with transaction.atomic():
+                counts = self._seed_batch(size, options['jobs_per_client'], options['sessions_per_client'])
+            for key, value in counts.items():
+                totals[key] += value
+            remaining -= size
+            self.stdout.write(f"{totals['clients']}/{options['clients']} clients...")
+        # bulk_create لا يرسل إشارات post_save: إبطال القوائم المخزنة في الذاكرة المؤقتة يدوياً
+        caching.bump_tags({caching.collection_tag(model) for model in (Client, PrintJob, PhotoSession, PaymentReceipt)})
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {totals['clients']} clients, {totals['print_jobs']} print jobs, "
+            f"{totals['photo_sessions']} photo sessions and {totals['receipts']} receipts."
+        ))
+
+    def _ensure_packages(self):
+        packages = list(PhotographyPackage.objects.filter(is_active=True).values_list('pk', 'price'))
+        if not packages:
+            for name, price, digital, printed in (
+                ('باقة أساسية', 500, 20, 5), ('باقة متوسطة', 1200, 50, 20), ('باقة الزفاف', 3500, 200, 60),
+            ):
+                package = PhotographyPackage.objects.create(
+                    name=name, price=price, num_photos_digital=digital, num_photos_printed=printed,
+                )
+                packages.append((package.pk, package.price))
+        return packages
+
+    def _next_number(self, prefix):
+        self.serial += 1
+        return f'{prefix}-{self.stamp}-L{self.serial}'
+
+    def _phone(self):
+        while True:
+            phone = f'05{self.rng.randrange(10 ** 8):08d}'
+            if phone not in self.phones:
+                self.phones.add(phone)
+                return phone
+
+    def _count(self, average):
+        # أغلب العملاء لديهم طلبات قليلة وقلة منهم لديهم عشرات الطلبات
+        return int(self.rng.expovariate(1 / average)) if average > 0 else 0
+
+    def _paid(self, status, total):
+        if status in FULLY_PAID_STATUSES:
+            return total
+        if status == 'partially_paid':
+            return (total * Decimal(self.rng.randint(10, 90)) / 100).quantize(Decimal('0.01'))
+        if status == 'cancelled':
+            return Decimal('0.00')
+        # عربون في نصف الطلبات الجديدة تقريباً
+        return (total * Decimal('0.3')).quantize(Decimal('0.01')) if self.rng.random() < 0.5 else Decimal('0.00')
+
+    def _receipts(self, item, receipt_type, field, prefix):
+        # الدفعات: 1 إلى 3 إيصالات تقسم المبلغ المدفوع
+        if item.paid_amount <= 0:
+            return []
+        parts = self.rng.choices((1, 2, 3), (60, 30, 10))[0]
+        amounts = []
+        left = item.paid_amount
+        for _ in range(parts - 1):
+            amount = (left * Decimal(self.rng.randint(30, 70)) / 100).quantize(Decimal('0.01'))
+            if amount <= 0:
+                break
+            amounts.append(amount)
+            left -= amount
+        amounts.append(left)
+        return [
+            PaymentReceipt(
+                receipt_number=self._next_number(prefix), receipt_type=receipt_type, **{field: item},
+                total_amount=item.total_amount, paid_amount=amount,
+                payment_method=weighted(self.rng, PAYMENT_METHODS), issued_by_id=item.issued_by_id,
+            )
+            for amount in amounts
+        ]
+
+    def _seed_batch(self, size, jobs_per_client, sessions_per_client):
+        rng = self.rng
+        clients = [
+            Client(
+                name=f'{rng.choice(FIRST_NAMES)} {rng.choice(FIRST_NAMES)} {rng.choice(FAMILY_NAMES)}',
+                phone=self._phone(),
+                email=f'client{rng.randrange(10 ** 9)}@example.com' if rng.random() < 0.4 else None,
+                address=rng.choice(CITIES) if rng.random() < 0.6 else None,
+            )
+            for _ in range(size)
+        ]
+        for client in clients:
+            # bulk_create لا يستدعي save(): الاسم الموحد وأرقام الهاتف للبحث
+            client.set_search_fields()
+        clients = Client.objects.bulk_create(clients)
+        ClientNameSuffix.objects.bulk_create([suffix for client in clients for suffix in client.new_name_suffixes()])
+
+        jobs, sessions = [], []
+        for client in clients:
+            for _ in range(self._count(jobs_per_client)):
+                status = weighted(rng, PRINT_JOB_STATUSES)
+                total = Decimal(rng.choice((25, 50, 75, 120, 200, 350, 600, 1500)))
+                jobs.append(PrintJob(
+                    receipt_number=self._next_number('PRN'), client=client,
+                    print_type=rng.choice(PrintJob.PRINT_TYPE_CHOICES)[0],
+                    size=rng.choice(PrintJob.SIZE_CHOICES)[0],
+                    total_amount=total, paid_amount=self._paid(status, total), status=status,
+                    delivery_date=self.today + timedelta(days=rng.randint(-180, 30)),
+                    issued_by_id=rng.choice(self.issuers),
+                ))
+            for _ in range(self._count(sessions_per_client)):
+                status = weighted(rng, PHOTO_SESSION_STATUSES)
+                package_id, price = rng.choice(self.packages)
+                session_date = self.today + timedelta(days=rng.randint(-180, 45))
+                sessions.append(PhotoSession(
+                    receipt_number=self._next_number('PHO'), client=client, package_id=package_id,
+                    photographer_id=rng.choice(self.photographers) if self.photographers else None,
+                    session_date=session_date, event_type=rng.choice(PhotoSession.EVENT_TYPE_CHOICES)[0],
+                    final_delivery_date=session_date + timedelta(days=rng.randint(7, 30)),
+                    total_amount=price, paid_amount=self._paid(status, price), status=status,
+                    issued_by_id=rng.choice(self.issuers),
+                ))
+        jobs = PrintJob.objects.bulk_create(jobs)
+        sessions = PhotoSession.objects.bulk_create(sessions)
+
+        receipts = []
+        for job in jobs:
+            receipts += self._receipts(job, 'printing', 'printing', 'RCPT-PRN')
+        for session in sessions:
+            receipts += self._receipts(session, 'photography', 'photography_session', 'RCPT-PHO')
+        PaymentReceipt.objects.bulk_create(receipts)
+        return {'clients': len(clients), 'print_jobs': len(jobs), 'photo_sessions': len(sessions), 'receipts': len(receipts)}
@@ -0,0 +1,64 @@
+# stapi/print/management/commands/sync_replica.py
+
+import sqlite3
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from print.db_routers import get_replica_alias
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy the 'default' SQLite database into the replica file using SQLite's online "
+        "backup API. Use --interval to keep the replica current."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help='Repeat the sync every N seconds (0 = sync once and exit).',
+        )
+        parser.add_argument(
+            '--pages', type=int, default=-1,
+            help='Pages copied per backup step (-1 = the whole database in one step).',
+        )
+
+    def handle(self, *args, **options):
+        replica_alias = get_replica_alias()
+        if replica_alias is None:
+            raise CommandError("لا توجد قاعدة بيانات متماثلة (replica) معرفة في DATABASES.")
+
+        source = connections.databases['default']
+        target = connections.databases[replica_alias]
+        for alias, db in (('default', source), (replica_alias, target)):
+            if db['ENGINE'] != 'django.db.backends.sqlite3':
+                raise CommandError(
+                    f"'{alias}' is not a SQLite database; replication of server databases "
+                    "is handled by the database server itself."
+                )
+        if str(source['NAME']) == str(target['NAME']):
+            raise CommandError("القاعدة الأساسية والمتماثلة تشيران إلى نفس الملف.")
+
+        while True:
+            started = time.monotonic()
+            self._backup(str(source['NAME']), str(target['NAME']), options['pages'])
+            elapsed = time.monotonic() - started
+            self.stdout.write(self.style.SUCCESS(
+                f"Replica '{replica_alias}' synced in {elapsed:.2f}s."
+            ))
+            if not options['interval']:
+                break
+            time.sleep(max(options['interval'] - elapsed, 0))
+
+    def _backup(self, source_path, target_path, pages):
+        # قراءة فقط من المصدر حتى لا نمنع عمليات الكتابة الجارية على القاعدة الأساسية
+        source = sqlite3.connect(f'{Path(source_path).resolve().as_uri()}?mode=ro', uri=True)
+        target = sqlite3.connect(target_path)
+        try:
+            source.backup(target, pages=pages)
+        finally:
+            target.close()
+            source.close()
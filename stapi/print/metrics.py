@@ -0,0 +1,266 @@
+# stapi/print/metrics.py
+
+import hmac
+import ipaddress
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+
+# ===========================================================================
+# مقاييس بصيغة Prometheus (عدادات ومدرجات تكرارية) مشتركة بين العمليات
+# ===========================================================================
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+PDF_SIZE_BUCKETS = (10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 5_000_000)
+
+# الاسم: (النوع، الوصف، حدود المدرج)
+METRICS = {
+    'stapi_http_requests_total': ('counter', 'HTTP requests by route, method and status.', None),
+    'stapi_http_request_duration_seconds': ('histogram', 'HTTP request latency by route.', LATENCY_BUCKETS),
+    'stapi_db_queries_per_request': ('histogram', 'Database queries per HTTP request by route.', QUERY_COUNT_BUCKETS),
+    'stapi_pdf_render_duration_seconds': ('histogram', 'WeasyPrint render time by template.', LATENCY_BUCKETS),
+    'stapi_pdf_size_bytes': ('histogram', 'Rendered PDF size by template.', PDF_SIZE_BUCKETS),
+    'stapi_response_cache_requests_total': ('counter', 'Response cache lookups by model and result.', None),
+    'stapi_payments_posted_total': ('counter', 'Payment receipts posted by type and method.', None),
+    'stapi_payments_amount_total': ('counter', 'Sum of posted payment amounts by type and method.', None),
+}
+
+
+class MetricsRegistry:
+    """
+    Per-process metric values, updated under one short lock. When METRICS_DIR is set,
+    each process periodically writes its values to <METRICS_DIR>/<pid>.json (atomic
+    replace) and /metrics sums the files of every worker, so no lock is shared between
+    processes. Files of stopped workers are kept so counters never go backwards.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._flushed_at = 0.0
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        index = bisect_left(buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * (len(buckets) + 1) + [0.0]
+            entry[index] += 1
+            entry[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                [name, list(labels), list(value) if isinstance(value, list) else value]
+                for (name, labels), value in self._values.items()
+            ]
+
+    def flush(self, force=False):
+        directory = getattr(settings, 'METRICS_DIR', None)
+        if not directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._flushed_at < getattr(settings, 'METRICS_FLUSH_INTERVAL', 5):
+            return
+        self._flushed_at = now
+        path = Path(directory) / f'{os.getpid()}.json'
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(self.snapshot()))
+        os.replace(tmp_path, path)
+
+    def collect(self):
+        """
+        Merged values of every process: {(name, labels): value}.
+        """
+        directory = getattr(settings, 'METRICS_DIR', None)
+        snapshots = []
+        if directory:
+            self.flush(force=True)
+            for path in Path(directory).glob('*.json'):
+                try:
+                    snapshots.append(json.loads(path.read_text()))
+                except (OSError, ValueError):
+                    continue
+        else:
+            snapshots.append(self.snapshot())
+
+        merged = {}
+        for snapshot in snapshots:
+            for name, labels, value in snapshot:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                if isinstance(value, list):
+                    current = merged.get(key)
+                    merged[key] = value if current is None else [a + b for a, b in zip(current, value)]
+                else:
+                    merged[key] = merged.get(key, 0) + value
+        return merged
+
+
+registry = MetricsRegistry()
+
+
+def inc(name, value=1, **labels):
+    if getattr(settings, 'METRICS_ENABLED', True):
+        registry.inc(name, labels, value)
+
+
+def observe(name, value, **labels):
+    if getattr(settings, 'METRICS_ENABLED', True):
+        registry.observe(name, labels, value)
+
+# ===========================================================================
+# صيغة العرض النصية لـ Prometheus
+# ===========================================================================
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_exposition(merged):
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        series = sorted((labels, value) for (metric, labels), value in merged.items() if metric == name)
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in series:
+            if kind == 'counter':
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], value[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels + (("le", bound),))} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(value[-1])}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+
+    # نسبة النجاح في الذاكرة المؤقتة لكل نموذج (محسوبة من العدادات)
+    lookups = {}
+    for (metric, labels), value in merged.items():
+        if metric == 'stapi_response_cache_requests_total':
+            label_map = dict(labels)
+            hits, total = lookups.get(label_map['model'], (0, 0))
+            lookups[label_map['model']] = (hits + (value if label_map['result'] == 'hit' else 0), total + value)
+    lines.append('# HELP stapi_response_cache_hit_ratio Response cache hit ratio by model.')
+    lines.append('# TYPE stapi_response_cache_hit_ratio gauge')
+    for model, (hits, total) in sorted(lookups.items()):
+        lines.append(f'stapi_response_cache_hit_ratio{_labels((("model", model),))} {hits / total if total else 0.0}')
+    return '\n'.join(lines) + '\n'
+
+
+def _allowed_ip(request):
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(network, strict=False) for network in getattr(settings, 'METRICS_ALLOWED_IPS', ()))
+
+
+def metrics_view(request):
+    """
+    GET /metrics in Prometheus text format, only for a scraper sending
+    'Authorization: Bearer <METRICS_TOKEN>' or connecting from METRICS_ALLOWED_IPS.
+    With neither setting configured the endpoint is closed.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    authorized = bool(token) and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not authorized and not _allowed_ip(request):
+        return HttpResponse(status=401 if token else 403)
+    return HttpResponse(
+        render_exposition(registry.collect()), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+# ===========================================================================
+# Middleware لعدّ الطلبات وزمنها وعدد الاستعلامات لكل مسار
+# ===========================================================================
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _count_queries(stack, counter):
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(counter))
+
+
+class MetricsMiddleware:
+    """
+    Counts requests, latency and queries per route. Works in both the WSGI and the
+    ASGI stack, so async views (the SSE change feed) are not pushed onto a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        counter = _QueryCounter()
+        with ExitStack() as stack:
+            _count_queries(stack, counter)
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - started, counter.count)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        counter = _QueryCounter()
+        # الاتصالات خاصة بكل خيط: العروض المتزامنة وORM غير المتزامن ينفذان استعلاماتهما
+        # في الخيط المتزامن للطلب وليس في خيط حلقة الأحداث، فيُركّب العدّاد هناك
+        stack = ExitStack()
+        await sync_to_async(_count_queries)(stack, counter)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.record(request, response, time.perf_counter() - started, counter.count)
+        return response
+
+    @staticmethod
+    def record(request, response, duration, queries):
+        match = getattr(request, 'resolver_match', None)
+        # اسم المسار (مثل client-detail) وليس الرابط نفسه، حتى يبقى عدد السلاسل محدوداً
+        route = (match.view_name or match.route) if match else 'unmatched'
+        if route == 'metrics':
+            return
+        registry.inc('stapi_http_requests_total', {'route': route, 'method': request.method, 'status': response.status_code})
+        registry.observe('stapi_http_request_duration_seconds', {'route': route, 'method': request.method}, duration)
+        registry.observe('stapi_db_queries_per_request', {'route': route}, queries)
+        registry.flush()
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('print', '0003_photosession_agreement_notes_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='client',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='تاريخ آخر تحديث'),
+        ),
+        migrations.AlterField(
+            model_name='paymentreceipt',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='تاريخ آخر تحديث'),
+        ),
+        migrations.AlterField(
+            model_name='photographer',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='تاريخ آخر تحديث'),
+        ),
+        migrations.AlterField(
+            model_name='photographypackage',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='تاريخ آخر تحديث'),
+        ),
+        migrations.AlterField(
+            model_name='photosession',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='تاريخ آخر تحديث'),
+        ),
+        migrations.AlterField(
+            model_name='printjob',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='تاريخ آخر تحديث'),
+        ),
+        migrations.CreateModel(
+            name='DeletionLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(max_length=50, verbose_name='النموذج')),
+                ('object_id', models.PositiveIntegerField(verbose_name='معرف السجل المحذوف')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الحذف')),
+            ],
+            options={
+                'verbose_name': 'سجل حذف',
+                'verbose_name_plural': 'سجل المحذوفات',
+                'ordering': ['-deleted_at'],
+                'indexes': [models.Index(fields=['model_name', 'deleted_at'], name='print_deletionlog_model_idx')],
+            },
+        ),
+    ]
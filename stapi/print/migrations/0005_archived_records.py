@@ -0,0 +1,102 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('print', '0004_deletionlog_updated_at_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedPhotoSession',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='المعرف الأصلي')),
+                ('receipt_number', models.CharField(blank=True, max_length=50, null=True, unique=True, verbose_name='رقم إيصال الجلسة')),
+                ('session_date', models.DateField(verbose_name='تاريخ الجلسة')),
+                ('session_time', models.TimeField(blank=True, null=True, verbose_name='وقت الجلسة')),
+                ('location', models.CharField(blank=True, max_length=255, null=True, verbose_name='الموقع')),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='المبلغ الإجمالي')),
+                ('paid_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=10, verbose_name='المبلغ المدفوع')),
+                ('status', models.CharField(choices=[('scheduled', 'مجدولة'), ('in_progress', 'قيد التنفيذ'), ('completed', 'مكتملة'), ('delivered', 'تم التسليم'), ('cancelled', 'ملغاة'), ('processing', 'قيد المعالجة'), ('ready_for_delivery', 'جاهزة للتسليم'), ('partially_paid', 'مدفوعة جزئياً')], max_length=20, verbose_name='الحالة')),
+                ('notes', models.TextField(blank=True, null=True, verbose_name='ملاحظات')),
+                ('event_type', models.CharField(blank=True, choices=[('wedding', 'زفاف'), ('portrait', 'بورتريه'), ('product', 'منتجات'), ('event', 'فعالية'), ('other', 'أخرى')], max_length=50, null=True, verbose_name='نوع الحدث/التصوير')),
+                ('final_delivery_date', models.DateField(blank=True, null=True, verbose_name='تاريخ التسليم النهائي')),
+                ('num_digital_photos_delivered', models.IntegerField(blank=True, default=0, null=True, verbose_name='عدد الصور الرقمية المسلمة')),
+                ('num_printed_photos_delivered', models.IntegerField(blank=True, default=0, null=True, verbose_name='عدد الصور المطبوعة المسلمة')),
+                ('photo_serial_number', models.CharField(blank=True, max_length=100, null=True, verbose_name='رقم مسلسل الصورة')),
+                ('final_gallery_link', models.URLField(blank=True, max_length=255, null=True, verbose_name='رابط المعرض النهائي')),
+                ('editing_status', models.CharField(choices=[('not_started', 'لم تبدأ'), ('in_shooting', 'قيد التصوير'), ('in_editing', 'قيد التعديل'), ('in_printing', 'قيد الطباعة'), ('completed', 'تم الانتهاء')], default='not_started', max_length=20, verbose_name='حالة التعديل/المعالجة')),
+                ('agreement_notes', models.TextField(blank=True, null=True, verbose_name='ملاحظات الاتفاقية')),
+                ('digital_photos_delivered', models.BooleanField(default=False, verbose_name='تم تسليم الصور الرقمية')),
+                ('printed_photos_delivered', models.BooleanField(default=False, verbose_name='تم تسليم الصور المطبوعة')),
+                ('album_delivered', models.BooleanField(default=False, verbose_name='تم تسليم الألبوم')),
+                ('frame_delivered', models.BooleanField(default=False, verbose_name='تم تسليم الإطار')),
+                ('created_at', models.DateTimeField(verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(db_index=True, verbose_name='تاريخ آخر تحديث')),
+                ('archived_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='تاريخ الأرشفة')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_photo_sessions', to='print.client', verbose_name='العميل')),
+                ('issued_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='صدر عن')),
+                ('package', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='print.photographypackage', verbose_name='الباقة')),
+                ('photographer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='print.photographer', verbose_name='المصور المعين')),
+            ],
+            options={
+                'verbose_name': 'جلسة تصوير مؤرشفة',
+                'verbose_name_plural': 'جلسات التصوير المؤرشفة',
+                'ordering': ['-session_date', '-session_time'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedPrintJob',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='المعرف الأصلي')),
+                ('receipt_number', models.CharField(blank=True, max_length=50, null=True, unique=True, verbose_name='رقم الإيصال')),
+                ('print_type', models.CharField(choices=[('digital', 'طباعة رقمية'), ('offset', 'طباعة أوفست'), ('large_format', 'طباعة كبيرة الحجم'), ('screen_printing', 'طباعة سلك سكرين'), ('other', 'أخرى')], max_length=50, verbose_name='نوع الطباعة')),
+                ('size', models.CharField(choices=[('A4', 'A4'), ('A3', 'A3'), ('A2', 'A2'), ('A1', 'A1'), ('custom', 'مقاس خاص')], max_length=50, verbose_name='المقاس')),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='المبلغ الإجمالي')),
+                ('paid_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=10, verbose_name='المبلغ المدفوع')),
+                ('delivery_date', models.DateField(verbose_name='تاريخ التسليم المتوقع')),
+                ('status', models.CharField(choices=[('pending', 'قيد الانتظار'), ('in_progress', 'قيد التنفيذ'), ('completed', 'مكتملة'), ('ready_for_delivery', 'جاهزة للتسليم'), ('delivered', 'تم التسليم'), ('cancelled', 'ملغاة'), ('partially_paid', 'مدفوعة جزئياً')], max_length=20, verbose_name='الحالة')),
+                ('notes', models.TextField(blank=True, null=True, verbose_name='ملاحظات')),
+                ('created_at', models.DateTimeField(verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(db_index=True, verbose_name='تاريخ آخر تحديث')),
+                ('archived_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='تاريخ الأرشفة')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_print_jobs', to='print.client', verbose_name='العميل')),
+                ('issued_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='صدر عن')),
+            ],
+            options={
+                'verbose_name': 'طلب طباعة مؤرشف',
+                'verbose_name_plural': 'طلبات الطباعة المؤرشفة',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedPaymentReceipt',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='المعرف الأصلي')),
+                ('receipt_number', models.CharField(blank=True, max_length=50, null=True, unique=True, verbose_name='رقم الإيصال')),
+                ('receipt_type', models.CharField(choices=[('printing', 'طباعة'), ('photography', 'تصوير')], max_length=20, verbose_name='نوع الإيصال')),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='المبلغ الكلي للدفعة')),
+                ('paid_amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='المبلغ المدفوع فعلياً')),
+                ('payment_method', models.CharField(choices=[('cash', 'نقداً'), ('bank_transfer', 'تحويل بنكي'), ('mobile_money', 'دفع إلكتروني'), ('card', 'بطاقة ائتمان/خصم'), ('other', 'أخرى')], max_length=50, verbose_name='طريقة الدفع')),
+                ('notes', models.TextField(blank=True, null=True, verbose_name='ملاحظات')),
+                ('date_issued', models.DateTimeField(verbose_name='تاريخ الإصدار')),
+                ('updated_at', models.DateTimeField(db_index=True, verbose_name='تاريخ آخر تحديث')),
+                ('archived_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='تاريخ الأرشفة')),
+                ('issued_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='صدر عن')),
+                ('photography_session', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='payment_receipts', to='print.archivedphotosession', verbose_name='جلسة التصوير')),
+                ('printing', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='payment_receipts', to='print.archivedprintjob', verbose_name='طلب الطباعة')),
+            ],
+            options={
+                'verbose_name': 'إيصال دفع مؤرشف',
+                'verbose_name_plural': 'إيصالات الدفع المؤرشفة',
+                'ordering': ['-date_issued'],
+            },
+        ),
+    ]
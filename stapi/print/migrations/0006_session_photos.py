@@ -0,0 +1,40 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('print', '0005_archived_records'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionPhoto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_name', models.CharField(max_length=255, verbose_name='اسم الملف الأصلي')),
+                ('file_path', models.CharField(max_length=255, unique=True, verbose_name='مسار الملف')),
+                ('size', models.PositiveBigIntegerField(verbose_name='حجم الملف (بايت)')),
+                ('received_bytes', models.PositiveBigIntegerField(default=0, verbose_name='البايتات المستلمة')),
+                ('status', models.CharField(choices=[('uploading', 'قيد الرفع'), ('processing', 'قيد المعالجة'), ('ready', 'جاهزة'), ('failed', 'فشلت المعالجة')], default='uploading', max_length=20, verbose_name='الحالة')),
+                ('width', models.PositiveIntegerField(blank=True, null=True, verbose_name='العرض')),
+                ('height', models.PositiveIntegerField(blank=True, null=True, verbose_name='الارتفاع')),
+                ('error', models.CharField(blank=True, default='', max_length=255, verbose_name='خطأ المعالجة')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ آخر تحديث')),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='photos', to='print.photosession', verbose_name='جلسة التصوير')),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='رفع بواسطة')),
+            ],
+            options={
+                'verbose_name': 'صورة جلسة',
+                'verbose_name_plural': 'صور الجلسات',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['session', 'status'], name='print_sessionphoto_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('print', '0006_session_photos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedphotosession',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='مدة الجلسة (دقائق)'),
+        ),
+        migrations.AddField(
+            model_name='photosession',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='مدة الجلسة (دقائق)'),
+        ),
+        migrations.AddIndex(
+            model_name='photosession',
+            index=models.Index(fields=['photographer', 'session_date', 'session_time'], name='print_session_photog_date_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:03
+
+import django.db.models.deletion
+import print.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('print', '0007_session_duration_photographer_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarFeed',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='اسم التقويم')),
+                ('token', models.CharField(default=print.models.new_feed_token, editable=False, max_length=64, unique=True, verbose_name='رمز الرابط')),
+                ('is_active', models.BooleanField(default=True, verbose_name='نشط')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+            ],
+            options={
+                'verbose_name': 'تقويم',
+                'verbose_name_plural': 'التقويمات',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='photosession',
+            index=models.Index(fields=['session_date', 'session_time'], name='print_session_date_time_idx'),
+        ),
+        migrations.AddField(
+            model_name='calendarfeed',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='أنشئ بواسطة'),
+        ),
+        migrations.AddField(
+            model_name='calendarfeed',
+            name='photographer',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='calendar_feeds', to='print.photographer', verbose_name='المصور'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('print', '0008_calendar_feeds'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BulkExport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('pdf_zip', 'ملف ZIP لمستندات PDF'), ('csv', 'ملف CSV')], max_length=20, verbose_name='النوع')),
+                ('model_name', models.CharField(max_length=50, verbose_name='النموذج')),
+                ('row_count', models.PositiveIntegerField(verbose_name='عدد السجلات')),
+                ('status', models.CharField(choices=[('pending', 'في الانتظار'), ('running', 'قيد التنفيذ'), ('done', 'جاهز للتنزيل'), ('failed', 'فشل')], default='pending', max_length=20, verbose_name='الحالة')),
+                ('file_path', models.CharField(blank=True, default='', max_length=255, verbose_name='مسار الملف')),
+                ('error', models.CharField(blank=True, default='', max_length=255, verbose_name='الخطأ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الطلب')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الانتهاء')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='طلب بواسطة')),
+            ],
+            options={
+                'verbose_name': 'ملف تصدير',
+                'verbose_name_plural': 'ملفات التصدير',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
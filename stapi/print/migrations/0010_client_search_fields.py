@@ -0,0 +1,67 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from print.normalization import digits_only, name_suffixes, normalize_name
+
+BACKFILL_BATCH_SIZE = 2000
+
+
+def fill_search_fields(apps, schema_editor):
+    # العملاء الحاليون: save() لا يُستدعى في الترحيل فنحسب الحقول هنا على دفعات حسب المعرف
+    # (executemany بدلاً من bulk_update الذي يبني تعبير CASE WHEN لكل صف)
+    Client = apps.get_model('print', 'Client')
+    ClientNameSuffix = apps.get_model('print', 'ClientNameSuffix')
+    connection = schema_editor.connection
+    rows = Client.objects.using(connection.alias).order_by('pk').values_list('pk', 'name', 'phone')
+    quote = connection.ops.quote_name
+    update_sql = 'UPDATE {} SET {} = %s, {} = %s WHERE {} = %s'.format(
+        quote(Client._meta.db_table), quote('normalized_name'), quote('phone_digits'), quote('id'),
+    )
+    last_pk = 0
+    while True:
+        batch = list(rows.filter(pk__gt=last_pk)[:BACKFILL_BATCH_SIZE])
+        if not batch:
+            break
+        updates, suffixes = [], []
+        for pk, name, phone in batch:
+            normalized = normalize_name(name)
+            updates.append((normalized, digits_only(phone), pk))
+            suffixes += [ClientNameSuffix(client_id=pk, suffix=suffix) for suffix in name_suffixes(normalized)]
+        with connection.cursor() as cursor:
+            cursor.executemany(update_sql, updates)
+        ClientNameSuffix.objects.using(connection.alias).bulk_create(suffixes)
+        last_pk = batch[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('print', '0009_bulk_exports'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='normalized_name',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255, verbose_name='الاسم الموحد للبحث'),
+        ),
+        migrations.AddField(
+            model_name='client',
+            name='phone_digits',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=20, verbose_name='أرقام الهاتف'),
+        ),
+        migrations.CreateModel(
+            name='ClientNameSuffix',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('suffix', models.CharField(max_length=255)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='name_suffixes', to='print.client')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['suffix', 'client'], name='print_client_suffix_idx')],
+            },
+        ),
+        migrations.RunPython(fill_search_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,375 @@
+# stapi/print/mixins.py
+
+import hashlib
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from . import caching, exports
+from .db_routers import _read_alias, get_replica_alias, has_recent_write, mark_recent_write
+from .models import DeletionLog
+
+# ===========================================================================
+# Mixin لتوجيه طلبات القراءة إلى النسخة المتماثلة (Replica)
+# ===========================================================================
+class ReplicaRoutingMixin:
+    """
+    Route the reads of safe requests (list, retrieve, receipts, generate-* PDFs...)
+    to the replica, unless the user wrote something in the last few seconds.
+    Actions listed in `primary_read_actions`, and requests carrying one of the query
+    parameters in `primary_read_params` (set by other mixins), always read from the primary.
+    """
+    primary_read_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method not in SAFE_METHODS:
+            return
+        # يُحفظ على الطلب: ResponseCacheMixin لا يقرأ الذاكرة المشتركة لمن كتب للتو
+        request.recent_write = has_recent_write(getattr(request.user, 'pk', None))
+        if (
+            getattr(self, 'action', None) not in self.primary_read_actions
+            and not any(param in request.query_params for param in getattr(self, 'primary_read_params', ()))
+            and not request.recent_write
+        ):
+            self._read_alias_token = _read_alias.set(get_replica_alias())
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_read_alias_token', None)
+        if token is not None:
+            _read_alias.reset(token)
+            self._read_alias_token = None
+        elif request.method not in SAFE_METHODS and response.status_code < 400:
+            mark_recent_write(getattr(request.user, 'pk', None))
+        return super().finalize_response(request, response, *args, **kwargs)
+
+# ===========================================================================
+# Mixin لطلبات GET الشرطية (ETag / Last-Modified)
+# ===========================================================================
+class ConditionalGetMixin:
+    """
+    Add ETag and Last-Modified to list/retrieve and answer If-None-Match /
+    If-Modified-Since with 304 before anything is serialized.
+
+    Lists are fingerprinted with one MAX(updated_at)/COUNT probe on the filtered
+    queryset, details with the object's updated_at. `etag_dependencies` lists the
+    models rendered inside this resource's serializer (e.g. the print jobs behind
+    a client's remaining amount); each adds one global MAX/COUNT probe.
+    """
+    etag_dependencies = ()
+
+    def _probe(self, queryset):
+        result = queryset.order_by().aggregate(last=Max('updated_at'), count=Count('pk'))
+        return result['last'], result['count']
+
+    def _conditional_headers(self, request, probes):
+        timestamps = [last for last, _ in probes if last is not None]
+        last_modified = int(max(timestamps).timestamp()) if timestamps else None
+        fingerprint = '|'.join(
+            [self.__class__.__name__, request.get_full_path(), request.accepted_renderer.format]
+            + [f'{last.isoformat() if last else ""}:{count}' for last, count in probes]
+        )
+        etag = '"%s"' % hashlib.md5(fingerprint.encode(), usedforsecurity=False).hexdigest()
+        return etag, last_modified
+
+    def _dependency_probes(self):
+        return [self._probe(model._default_manager.all()) for model in self.etag_dependencies]
+
+    def _conditional_response(self, request, probes, build_response):
+        etag, last_modified = self._conditional_headers(request, probes)
+        response = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = build_response()
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            # يجب على المتصفح إعادة التحقق في كل مرة (سيحصل على 304 إذا لم يتغير شيء)
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        probes = [self._probe(queryset)] + self._dependency_probes()
+        return self._conditional_response(
+            request, probes, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        probes = [(instance.updated_at, 1)] + self._dependency_probes()
+        return self._conditional_response(
+            request, probes, lambda: Response(self.get_serializer(instance).data)
+        )
+
+# ===========================================================================
+# Mixin لتخزين استجابات القراءة مؤقتاً (Response Cache)
+# ===========================================================================
+class ResponseCacheMixin:
+    """
+    Serve list/retrieve from Django's cache, keyed per viewset, query string, role and
+    read database. Entries are invalidated by the post_save/post_delete signals in
+    print/signals.py through the tags computed in print/caching.py. A cached ETag or
+    Last-Modified is answered with 304 without touching the database. Users who wrote in the last
+    REPLICA_STICKY_SECONDS bypass the cache, so they always read their own writes.
+    """
+    cached_actions = ('list', 'retrieve')
+
+    def get_object(self):
+        if self.action in self.cached_actions:
+            # نسخ الوسوم تُقرأ قبل تحميل الكائن: تعديل يصل بينهما يبطل المدخل بدلاً من تخزين بيانات قديمة
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            tags = caching.lookup_tags(self.queryset.model, **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            self._response_cache_versions = caching.get_tag_versions(tags) if tags else None
+        return super().get_object()
+
+    def _cached(self, request, build_response):
+        if caching.is_suspended() or getattr(request, 'recent_write', False):
+            return build_response()
+        key = caching.response_cache_key(self, request, _read_alias.get())
+        entry = caching.get_cached_response(key)
+        caching.record_lookup(self.queryset.model, entry is not None)
+        if entry is not None:
+            headers = entry['headers']
+            response = get_conditional_response(
+                request._request, etag=headers.get('ETag'), last_modified=parse_http_date_safe(headers.get('Last-Modified', '')),
+            )
+            if response is None:
+                response = Response(entry['data'])
+            for header, value in headers.items():
+                response[header] = value
+            return response
+
+        if self.action == 'list':
+            self._response_cache_versions = caching.get_tag_versions({caching.collection_tag(self.queryset.model)})
+        response = build_response()
+        versions = getattr(self, '_response_cache_versions', None)
+        if response.status_code == 200 and isinstance(response, Response) and versions:
+            headers = {
+                header: response[header]
+                for header in ('ETag', 'Last-Modified', 'Cache-Control') if header in response
+            }
+            timeout = None
+            if _read_alias.get() is not None:
+                # البيانات قد تكون متأخرة قليلاً على النسخة المتماثلة، فلا نحتفظ بها طويلاً
+                timeout = getattr(settings, 'REPLICA_STICKY_SECONDS', 15)
+            caching.set_cached_response(key, versions, response.data, headers, timeout)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(request, lambda: super(ResponseCacheMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(request, lambda: super(ResponseCacheMixin, self).retrieve(request, *args, **kwargs))
+
+# ===========================================================================
+# Mixin لتصدير المجموعة كاملة (CSV / NDJSON) مع احترام الفلاتر الحالية
+# ===========================================================================
+class ExportMixin:
+    """
+    GET <collection>/export/?export_format=csv|ndjson streams every row that matches the
+    same filters, search and ordering as the list endpoint, without pagination.
+    """
+    export_fields = ()
+    export_annotations = {}
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in exports.EXPORT_FORMATS:
+            return Response(
+                {'detail': f"صيغة التصدير غير مدعومة: {export_format} (المتاح: csv, ndjson)."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        queryset = self.filter_queryset(self.get_queryset()).annotate(**self.export_annotations)
+        # تثبيت قاعدة القراءة الآن، لأن البيانات تُقرأ بعد انتهاء الـ view أثناء الإرسال
+        queryset = queryset.using(queryset.db)
+        filename = f"{self.queryset.model._meta.model_name}s-{timezone.localdate():%Y%m%d}"
+        return exports.export_response(queryset, list(self.export_fields), export_format, filename)
+
+# ===========================================================================
+# Mixin للمزامنة التزايدية (?updated_since=) مع قائمة المحذوفات
+# ===========================================================================
+def parse_sync_timestamp(value):
+    """
+    Parse an ISO 8601 datetime (or date) from the query string into an aware datetime.
+    Returns None when the value is invalid.
+    """
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                return None
+            parsed = datetime.combine(day, time.min)
+    except ValueError:
+        return None
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+class DeltaSyncMixin:
+    """
+    list?updated_since=<ISO timestamp> returns only the rows changed since then (same
+    filters as the list, not paginated) plus the ids deleted since then, taken from
+    DeletionLog:
+
+        {"sync_timestamp": ..., "results": [...], "deleted": [ids]}
+
+    Clients apply `deleted` first, then upsert `results`, and send `sync_timestamp`
+    back next time. The timestamp is moved back by DELTA_SYNC_OVERLAP_SECONDS so rows
+    committed while the request was running are returned again rather than missed.
+
+    Delta requests always read from the primary (a lagging replica would make the
+    client skip the rows written during the lag for good), and take no filters: a row
+    that stops matching a filter (e.g. ?status=) has no tombstone in DeletionLog.
+    """
+    primary_read_params = ('updated_since',)
+    delta_sync_params = ('updated_since', 'format')
+
+    def list(self, request, *args, **kwargs):
+        value = request.query_params.get('updated_since')
+        if value is None:
+            return super().list(request, *args, **kwargs)
+        unsupported = sorted(set(request.query_params) - set(self.delta_sync_params))
+        if unsupported:
+            return Response(
+                {'detail': 'لا يمكن استخدام updated_since مع معاملات تصفية (السجلات التي تخرج من التصفية '
+                           f"لا تظهر في قائمة المحذوفات): {', '.join(unsupported)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        since = parse_sync_timestamp(value)
+        if since is None:
+            return Response(
+                {'detail': 'قيمة updated_since غير صالحة (المطلوب تاريخ ووقت بصيغة ISO 8601).'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        now = timezone.now()
+        retention = timedelta(days=getattr(settings, 'DELETION_LOG_RETENTION_DAYS', 30))
+        if since < now - retention:
+            # سجل المحذوفات لا يغطي هذه الفترة: يجب على العميل إعادة تحميل القائمة كاملة
+            return Response(
+                {'detail': 'updated_since أقدم من فترة الاحتفاظ بسجل المحذوفات، أعد تحميل القائمة كاملة.',
+                 'full_sync_required': True},
+                status=status.HTTP_410_GONE,
+            )
+
+        sync_timestamp = now - timedelta(seconds=getattr(settings, 'DELTA_SYNC_OVERLAP_SECONDS', 5))
+        queryset = self.filter_queryset(self.get_queryset()).filter(updated_at__gte=since).order_by('updated_at', 'pk')
+        deleted = (
+            DeletionLog.objects.using(queryset.db)
+            .filter(model_name=self.queryset.model._meta.model_name, deleted_at__gte=since)
+            .order_by()
+            .values_list('object_id', flat=True)
+            .distinct()
+        )
+        return Response({
+            'sync_timestamp': sync_timestamp,
+            'results': self.get_serializer(queryset, many=True).data,
+            'deleted': sorted(deleted),
+        })
+
+# ===========================================================================
+# Mixin لقراءة السجلات المؤرشفة من نفس نقاط النهاية (?include_archived=)
+# ===========================================================================
+class QuerySetChain:
+    """
+    Read-only sequence over several querysets, one after the other, for Django's
+    Paginator: count() adds up their counts and a slice runs LIMIT/OFFSET queries only
+    on the querysets it covers.
+    """
+    ordered = True
+
+    def __init__(self, *querysets):
+        self.querysets = querysets
+        self._counts = None
+
+    def count(self):
+        if self._counts is None:
+            self._counts = [queryset.count() for queryset in self.querysets]
+        return sum(self._counts)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop if index.stop is not None else self.count()
+        self.count()
+        items = []
+        offset = 0
+        for queryset, count in zip(self.querysets, self._counts):
+            if start < offset + count and stop > offset:
+                items.extend(queryset[max(start - offset, 0):stop - offset])
+            offset += count
+        return items
+
+
+class ArchiveMixin:
+    """
+    Read access to archived rows (print/archiving.py) through the same endpoints.
+    On safe requests, ?include_archived=true lists the live rows followed by the archived
+    ones (same filters and search) and lets detail endpoints (retrieve, receipts, PDFs)
+    fall back to the archive; ?include_archived=only lists the archive alone. Archived
+    rows are never writable: unsafe requests ignore the flag.
+    """
+    archive_queryset = None
+
+    def include_archived(self):
+        if self.request.method not in SAFE_METHODS or self.archive_queryset is None:
+            return None
+        value = self.request.query_params.get('include_archived', '').lower()
+        if value == 'only':
+            return 'only'
+        return 'all' if value in ('1', 'true', 'yes') else None
+
+    def get_queryset(self):
+        if getattr(self, '_reading_archive', False):
+            return self.archive_queryset.all()
+        return super().get_queryset()
+
+    def get_archived_queryset(self):
+        # نفس get_queryset في الـ ViewSet (البحث) ونفس الفلاتر، لكن على جدول الأرشيف
+        self._reading_archive = True
+        try:
+            return self.filter_queryset(self.get_queryset())
+        finally:
+            self._reading_archive = False
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            if not self.include_archived():
+                raise
+        self._reading_archive = True
+        try:
+            return super().get_object()
+        finally:
+            self._reading_archive = False
+
+    def list(self, request, *args, **kwargs):
+        mode = self.include_archived()
+        if mode is None:
+            return super().list(request, *args, **kwargs)
+        if mode == 'only':
+            queryset = self.get_archived_queryset()
+        else:
+            # السجلات الحية أولاً (الأحدث) ثم المؤرشفة
+            queryset = QuerySetChain(self.filter_queryset(self.get_queryset()), self.get_archived_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(list(queryset[:]), many=True).data)
@@ -1,10 +1,20 @@
 # C:\Users\SAMAH\Downloads\api\stapi\print\models.py
 
-from django.db import models
+import os
+import secrets
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
 from decimal import Decimal # Import Decimal for financial calculations
 
+from .normalization import digits_only, name_suffixes, normalize_name
+
+# المبلغ المتبقي محسوباً في SQL (نفس الخاصية remaining_amount في PrintJob و PhotoSession)
+REMAINING_AMOUNT = models.ExpressionWrapper(
+    models.F('total_amount') - models.F('paid_amount'),
+    output_field=models.DecimalField(max_digits=10, decimal_places=2),
+)
+
 # ===========================================================================
 # نموذج الملف الشخصي للمستخدم (لربط الدور بالمستخدم)
 # ===========================================================================
@@ -28,7 +38,10 @@ class Client(models.Model):
     email = models.EmailField(max_length=255, blank=True, null=True, verbose_name='البريد الإلكتروني')
     address = models.TextField(blank=True, null=True, verbose_name='العنوان')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
-    updated_at = models.DateTimeField(auto_now=True, verbose_name='تاريخ آخر تحديث')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name='تاريخ آخر تحديث')
+    # نسخ موحدة من الاسم والهاتف للبحث بالبادئة عبر الفهرس (تُحدث تلقائياً عند الحفظ)
+    normalized_name = models.CharField(max_length=255, blank=True, default='', editable=False, db_index=True, verbose_name='الاسم الموحد للبحث')
+    phone_digits = models.CharField(max_length=20, blank=True, default='', editable=False, db_index=True, verbose_name='أرقام الهاتف')
 
     class Meta:
         verbose_name = 'العميل'
@@ -38,6 +51,53 @@ class Client(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # الاسم الموحد كما هو في قاعدة البيانات: اللواحق تُعاد كتابتها فقط إذا تغير
+        instance._stored_normalized_name = instance.__dict__.get('normalized_name')
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        if fields is None or 'normalized_name' in fields:
+            self._stored_normalized_name = self.normalized_name
+
+    def set_search_fields(self):
+        self.normalized_name = normalize_name(self.name)
+        self.phone_digits = digits_only(self.phone)
+
+    def save(self, *args, **kwargs):
+        self.set_search_fields()
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'name', 'phone'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'normalized_name', 'phone_digits'}
+        # None: غير معروف (كائن لم يُحمّل من قاعدة البيانات أو حُمّل بدون الحقل) فتُعاد الكتابة
+        name_changed = adding or getattr(self, '_stored_normalized_name', None) != self.normalized_name
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if name_changed and (update_fields is None or 'name' in update_fields):
+                if not adding:
+                    self.name_suffixes.all().delete()
+                ClientNameSuffix.objects.bulk_create(self.new_name_suffixes())
+                self._stored_normalized_name = self.normalized_name
+
+    def new_name_suffixes(self):
+        return [ClientNameSuffix(client=self, suffix=suffix) for suffix in name_suffixes(self.normalized_name)]
+
+
+class ClientNameSuffix(models.Model):
+    """
+    Search rows for the words inside a client's name, so that the family name is
+    found with the same indexed prefix lookup as the first name.
+    """
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='name_suffixes')
+    suffix = models.CharField(max_length=255)
+
+    class Meta:
+        indexes = [models.Index(fields=['suffix', 'client'], name='print_client_suffix_idx')]
+
 # ===========================================================================
 # نموذج طلب الطباعة
 # ===========================================================================
@@ -77,7 +137,7 @@ class PrintJob(models.Model):
     notes = models.TextField(blank=True, null=True, verbose_name='ملاحظات')
     issued_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='issued_print_jobs', verbose_name='صدر عن')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
-    updated_at = models.DateTimeField(auto_now=True, verbose_name='تاريخ آخر تحديث')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name='تاريخ آخر تحديث')
 
     class Meta:
         verbose_name = 'طلب طباعة'
@@ -117,7 +177,7 @@ class PhotographyPackage(models.Model):
     
     is_active = models.BooleanField(default=True, verbose_name='نشطة')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
-    updated_at = models.DateTimeField(auto_now=True, verbose_name='تاريخ آخر تحديث')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name='تاريخ آخر تحديث')
 
     class Meta:
         verbose_name = 'باقة تصوير'
@@ -137,7 +197,7 @@ class Photographer(models.Model):
     specialization = models.CharField(max_length=100, blank=True, null=True, verbose_name='التخصص')
     is_active = models.BooleanField(default=True, verbose_name='نشط')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
-    updated_at = models.DateTimeField(auto_now=True, verbose_name='تاريخ آخر تحديث')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name='تاريخ آخر تحديث')
 
     class Meta:
         verbose_name = 'المصور'
@@ -184,6 +244,8 @@ class PhotoSession(models.Model):
     photographer = models.ForeignKey(Photographer, on_delete=models.SET_NULL, null=True, blank=True, related_name='assigned_sessions', verbose_name='المصور المعين')
     session_date = models.DateField(verbose_name='تاريخ الجلسة')
     session_time = models.TimeField(blank=True, null=True, verbose_name='وقت الجلسة')
+    # بدونها تُعتبر مدة الجلسة PHOTO_SESSION_DEFAULT_MINUTES عند البحث عن تعارض المواعيد
+    duration_minutes = models.PositiveIntegerField(blank=True, null=True, verbose_name='مدة الجلسة (دقائق)')
     location = models.CharField(max_length=255, blank=True, null=True, verbose_name='الموقع')
     total_amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='المبلغ الإجمالي')
     paid_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, verbose_name='المبلغ المدفوع')
@@ -207,12 +269,18 @@ class PhotoSession(models.Model):
     frame_delivered = models.BooleanField(default=False, verbose_name='تم تسليم الإطار')
     issued_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='issued_photo_sessions', verbose_name='صدر عن')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
-    updated_at = models.DateTimeField(auto_now=True, verbose_name='تاريخ آخر تحديث')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name='تاريخ آخر تحديث')
 
     class Meta:
         verbose_name = 'جلسة تصوير'
         verbose_name_plural = 'جلسات التصوير'
         ordering = ['-session_date', '-session_time']
+        indexes = [
+            # جلسات المصور في نطاق تاريخ مرتبة حسب الوقت (التوفر وتعارض المواعيد وتقويم المصور)
+            models.Index(fields=['photographer', 'session_date', 'session_time'], name='print_session_photog_date_idx'),
+            # جلسات الاستوديو كلها في نطاق تاريخ (تقويم الاستوديو)
+            models.Index(fields=['session_date', 'session_time'], name='print_session_date_time_idx'),
+        ]
 
     def __str__(self):
         return f"جلسة تصوير #{self.receipt_number or self.id} - {self.client.name} - {self.session_date}"
@@ -260,7 +328,7 @@ class PaymentReceipt(models.Model):
     notes = models.TextField(blank=True, null=True, verbose_name='ملاحظات')
     issued_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='issued_receipts', verbose_name='صدر عن')
     date_issued = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإصدار')
-    updated_at = models.DateTimeField(auto_now=True, verbose_name='تاريخ آخر تحديث')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name='تاريخ آخر تحديث')
 
     class Meta:
         verbose_name = 'إيصال دفع'
@@ -312,6 +380,232 @@ class Alert(models.Model):
     def __str__(self):
         return f"تنبيه ({self.get_alert_type_display()}): {self.message[:50]}..."
 
+# ===========================================================================
+# سجل المحذوفات (للمزامنة التزايدية ?updated_since=)
+# ===========================================================================
+class DeletionLog(models.Model):
+    model_name = models.CharField(max_length=50, verbose_name='النموذج')
+    object_id = models.PositiveIntegerField(verbose_name='معرف السجل المحذوف')
+    deleted_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الحذف')
+
+    class Meta:
+        verbose_name = 'سجل حذف'
+        verbose_name_plural = 'سجل المحذوفات'
+        ordering = ['-deleted_at']
+        indexes = [models.Index(fields=['model_name', 'deleted_at'], name='print_deletionlog_model_idx')]
+
+    def __str__(self):
+        return f"{self.model_name} #{self.object_id} - {self.deleted_at}"
+
+# ===========================================================================
+# صور جلسات التصوير (رفع على أجزاء قابل للاستئناف + صور مصغرة، راجع print/photos.py)
+# ===========================================================================
+class SessionPhoto(models.Model):
+    STATUS_CHOICES = (
+        ('uploading', 'قيد الرفع'),
+        ('processing', 'قيد المعالجة'),
+        ('ready', 'جاهزة'),
+        ('failed', 'فشلت المعالجة'),
+    )
+
+    session = models.ForeignKey(PhotoSession, on_delete=models.CASCADE, related_name='photos', verbose_name='جلسة التصوير')
+    original_name = models.CharField(max_length=255, verbose_name='اسم الملف الأصلي')
+    # المسار نسبةً إلى PHOTO_STORAGE_ROOT (الصورة المصغرة والمعاينة بجانبه)
+    file_path = models.CharField(max_length=255, unique=True, verbose_name='مسار الملف')
+    size = models.PositiveBigIntegerField(verbose_name='حجم الملف (بايت)')
+    received_bytes = models.PositiveBigIntegerField(default=0, verbose_name='البايتات المستلمة')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='uploading', verbose_name='الحالة')
+    width = models.PositiveIntegerField(blank=True, null=True, verbose_name='العرض')
+    height = models.PositiveIntegerField(blank=True, null=True, verbose_name='الارتفاع')
+    error = models.CharField(max_length=255, blank=True, default='', verbose_name='خطأ المعالجة')
+    uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='رفع بواسطة')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='تاريخ آخر تحديث')
+
+    class Meta:
+        verbose_name = 'صورة جلسة'
+        verbose_name_plural = 'صور الجلسات'
+        ordering = ['id']
+        indexes = [models.Index(fields=['session', 'status'], name='print_sessionphoto_status_idx')]
+
+    def __str__(self):
+        return f"{self.original_name} - جلسة #{self.session_id}"
+
+    @property
+    def thumbnail_path(self):
+        return f"{os.path.splitext(self.file_path)[0]}.thumb.jpg"
+
+    @property
+    def preview_path(self):
+        return f"{os.path.splitext(self.file_path)[0]}.preview.jpg"
+
+# ===========================================================================
+# تقويمات iCalendar للمصورين والاستوديو (راجع print/calendars.py)
+# ===========================================================================
+def new_feed_token():
+    return secrets.token_urlsafe(32)
+
+
+class CalendarFeed(models.Model):
+    name = models.CharField(max_length=100, verbose_name='اسم التقويم')
+    # بدون مصور: تقويم الاستوديو بكل الجلسات
+    photographer = models.ForeignKey(Photographer, on_delete=models.CASCADE, null=True, blank=True, related_name='calendar_feeds', verbose_name='المصور')
+    # الرابط نفسه هو وسيلة المصادقة (تطبيقات التقويم لا ترسل ترويسات)
+    token = models.CharField(max_length=64, unique=True, default=new_feed_token, editable=False, verbose_name='رمز الرابط')
+    is_active = models.BooleanField(default=True, verbose_name='نشط')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='أنشئ بواسطة')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
+
+    class Meta:
+        verbose_name = 'تقويم'
+        verbose_name_plural = 'التقويمات'
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+# ===========================================================================
+# ملفات التصدير الجماعي من لوحة الإدارة (ZIP لمستندات PDF / CSV، راجع print/bulk_exports.py)
+# ===========================================================================
+class BulkExport(models.Model):
+    KIND_CHOICES = (
+        ('pdf_zip', 'ملف ZIP لمستندات PDF'),
+        ('csv', 'ملف CSV'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'في الانتظار'),
+        ('running', 'قيد التنفيذ'),
+        ('done', 'جاهز للتنزيل'),
+        ('failed', 'فشل'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name='النوع')
+    model_name = models.CharField(max_length=50, verbose_name='النموذج')
+    row_count = models.PositiveIntegerField(verbose_name='عدد السجلات')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name='الحالة')
+    # المسار نسبةً إلى BULK_EXPORT_ROOT
+    file_path = models.CharField(max_length=255, blank=True, default='', verbose_name='مسار الملف')
+    error = models.CharField(max_length=255, blank=True, default='', verbose_name='الخطأ')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='طلب بواسطة')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الطلب')
+    finished_at = models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الانتهاء')
+
+    class Meta:
+        verbose_name = 'ملف تصدير'
+        verbose_name_plural = 'ملفات التصدير'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_kind_display()} - {self.model_name} ({self.row_count})"
+
+# ===========================================================================
+# جداول الأرشيف: طلبات الطباعة وجلسات التصوير المغلقة القديمة وإيصالاتها
+# (print/archiving.py ينقلها إلى هنا مع الاحتفاظ بنفس المعرفات والقيم)
+# أي حقل جديد في PrintJob / PhotoSession / PaymentReceipt يجب إضافته هنا أيضاً
+# ===========================================================================
+class ArchivedPrintJob(models.Model):
+    id = models.BigIntegerField(primary_key=True, verbose_name='المعرف الأصلي')
+    receipt_number = models.CharField(max_length=50, unique=True, blank=True, null=True, verbose_name='رقم الإيصال')
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='archived_print_jobs', verbose_name='العميل')
+    print_type = models.CharField(max_length=50, choices=PrintJob.PRINT_TYPE_CHOICES, verbose_name='نوع الطباعة')
+    size = models.CharField(max_length=50, choices=PrintJob.SIZE_CHOICES, verbose_name='المقاس')
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='المبلغ الإجمالي')
+    paid_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, verbose_name='المبلغ المدفوع')
+    delivery_date = models.DateField(verbose_name='تاريخ التسليم المتوقع')
+    status = models.CharField(max_length=20, choices=PrintJob.STATUS_CHOICES, verbose_name='الحالة')
+    notes = models.TextField(blank=True, null=True, verbose_name='ملاحظات')
+    issued_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='صدر عن')
+    created_at = models.DateTimeField(verbose_name='تاريخ الإنشاء')
+    updated_at = models.DateTimeField(db_index=True, verbose_name='تاريخ آخر تحديث')
+    archived_at = models.DateTimeField(default=timezone.now, db_index=True, verbose_name='تاريخ الأرشفة')
+
+    is_archived = True
+
+    class Meta:
+        verbose_name = 'طلب طباعة مؤرشف'
+        verbose_name_plural = 'طلبات الطباعة المؤرشفة'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"طلب طباعة مؤرشف #{self.receipt_number or self.id} - {self.client.name}"
+
+    @property
+    def remaining_amount(self):
+        return self.total_amount - self.paid_amount
+
+
+class ArchivedPhotoSession(models.Model):
+    id = models.BigIntegerField(primary_key=True, verbose_name='المعرف الأصلي')
+    receipt_number = models.CharField(max_length=50, unique=True, blank=True, null=True, verbose_name='رقم إيصال الجلسة')
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='archived_photo_sessions', verbose_name='العميل')
+    package = models.ForeignKey(PhotographyPackage, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='الباقة')
+    photographer = models.ForeignKey(Photographer, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='المصور المعين')
+    session_date = models.DateField(verbose_name='تاريخ الجلسة')
+    session_time = models.TimeField(blank=True, null=True, verbose_name='وقت الجلسة')
+    duration_minutes = models.PositiveIntegerField(blank=True, null=True, verbose_name='مدة الجلسة (دقائق)')
+    location = models.CharField(max_length=255, blank=True, null=True, verbose_name='الموقع')
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='المبلغ الإجمالي')
+    paid_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0.00, verbose_name='المبلغ المدفوع')
+    status = models.CharField(max_length=20, choices=PhotoSession.STATUS_CHOICES, verbose_name='الحالة')
+    notes = models.TextField(blank=True, null=True, verbose_name='ملاحظات')
+    event_type = models.CharField(max_length=50, choices=PhotoSession.EVENT_TYPE_CHOICES, blank=True, null=True, verbose_name='نوع الحدث/التصوير')
+    final_delivery_date = models.DateField(blank=True, null=True, verbose_name='تاريخ التسليم النهائي')
+    num_digital_photos_delivered = models.IntegerField(default=0, blank=True, null=True, verbose_name='عدد الصور الرقمية المسلمة')
+    num_printed_photos_delivered = models.IntegerField(default=0, blank=True, null=True, verbose_name='عدد الصور المطبوعة المسلمة')
+    photo_serial_number = models.CharField(max_length=100, blank=True, null=True, verbose_name='رقم مسلسل الصورة')
+    final_gallery_link = models.URLField(max_length=255, blank=True, null=True, verbose_name='رابط المعرض النهائي')
+    editing_status = models.CharField(max_length=20, choices=PhotoSession.EDITING_STATUS_CHOICES, default='not_started', verbose_name='حالة التعديل/المعالجة')
+    agreement_notes = models.TextField(blank=True, null=True, verbose_name='ملاحظات الاتفاقية')
+    digital_photos_delivered = models.BooleanField(default=False, verbose_name='تم تسليم الصور الرقمية')
+    printed_photos_delivered = models.BooleanField(default=False, verbose_name='تم تسليم الصور المطبوعة')
+    album_delivered = models.BooleanField(default=False, verbose_name='تم تسليم الألبوم')
+    frame_delivered = models.BooleanField(default=False, verbose_name='تم تسليم الإطار')
+    issued_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='صدر عن')
+    created_at = models.DateTimeField(verbose_name='تاريخ الإنشاء')
+    updated_at = models.DateTimeField(db_index=True, verbose_name='تاريخ آخر تحديث')
+    archived_at = models.DateTimeField(default=timezone.now, db_index=True, verbose_name='تاريخ الأرشفة')
+
+    is_archived = True
+
+    class Meta:
+        verbose_name = 'جلسة تصوير مؤرشفة'
+        verbose_name_plural = 'جلسات التصوير المؤرشفة'
+        ordering = ['-session_date', '-session_time']
+
+    def __str__(self):
+        return f"جلسة تصوير مؤرشفة #{self.receipt_number or self.id} - {self.client.name} - {self.session_date}"
+
+    @property
+    def remaining_amount(self):
+        return self.total_amount - self.paid_amount
+
+
+class ArchivedPaymentReceipt(models.Model):
+    id = models.BigIntegerField(primary_key=True, verbose_name='المعرف الأصلي')
+    receipt_number = models.CharField(max_length=50, unique=True, blank=True, null=True, verbose_name='رقم الإيصال')
+    # نفس أسماء العلاقات العكسية في الجداول الأصلية (payment_receipts) حتى تعمل نفس الـ views والقوالب
+    printing = models.ForeignKey(ArchivedPrintJob, on_delete=models.CASCADE, null=True, blank=True, related_name='payment_receipts', verbose_name='طلب الطباعة')
+    photography_session = models.ForeignKey(ArchivedPhotoSession, on_delete=models.CASCADE, null=True, blank=True, related_name='payment_receipts', verbose_name='جلسة التصوير')
+    receipt_type = models.CharField(max_length=20, choices=PaymentReceipt.RECEIPT_TYPE_CHOICES, verbose_name='نوع الإيصال')
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='المبلغ الكلي للدفعة')
+    paid_amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='المبلغ المدفوع فعلياً')
+    payment_method = models.CharField(max_length=50, choices=PaymentReceipt.PAYMENT_METHOD_CHOICES, verbose_name='طريقة الدفع')
+    notes = models.TextField(blank=True, null=True, verbose_name='ملاحظات')
+    issued_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name='صدر عن')
+    date_issued = models.DateTimeField(verbose_name='تاريخ الإصدار')
+    updated_at = models.DateTimeField(db_index=True, verbose_name='تاريخ آخر تحديث')
+    archived_at = models.DateTimeField(default=timezone.now, db_index=True, verbose_name='تاريخ الأرشفة')
+
+    is_archived = True
+
+    class Meta:
+        verbose_name = 'إيصال دفع مؤرشف'
+        verbose_name_plural = 'إيصالات الدفع المؤرشفة'
+        ordering = ['-date_issued']
+
+    def __str__(self):
+        return f"إيصال مؤرشف #{self.receipt_number or self.id} - {self.paid_amount}"
+
 # ===========================================================================
 # نموذج الحجز (مثال - إذا كنت ستضيفه لاحقًا)
 # ===========================================================================
@@ -0,0 +1,49 @@
+# stapi/print/normalization.py
+
+import re
+import unicodedata
+
+# ===========================================================================
+# توحيد النصوص للبحث: أسماء العملاء وأرقام الهواتف
+# (بدون استيراد النماذج: تستخدمها models.py وملفات الترحيل)
+# ===========================================================================
+# التشكيل وعلامات القرآن والتطويل لا تؤثر على المطابقة
+_IGNORED = re.compile('[\u0610-\u061a\u0640\u064b-\u065f\u0670\u06d6-\u06ed]')
+_WHITESPACE = re.compile(r'\s+')
+_LETTERS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ة': 'ه',
+    'ى': 'ي', 'ی': 'ي', 'ئ': 'ي',
+    'ؤ': 'و',
+    'ک': 'ك',
+})
+
+
+def normalize_name(value):
+    """
+    Search form of a name: presentation forms folded (NFKC), diacritics and tatweel
+    removed, alef/teh marbuta/alef maksura variants unified, lower case, single spaces.
+    """
+    if not value:
+        return ''
+    text = unicodedata.normalize('NFKC', value)
+    text = _IGNORED.sub('', text).translate(_LETTERS).casefold()
+    return _WHITESPACE.sub(' ', text).strip()[:255]
+
+
+def digits_only(value):
+    """
+    Digits of a phone number, Arabic-Indic digits included, as ASCII: '+962 (79) ٥٥٥' -> '96279555'.
+    """
+    if not value:
+        return ''
+    return ''.join(str(unicodedata.digit(char)) for char in value if char.isdigit())
+
+
+def name_suffixes(normalized_name):
+    """
+    The parts of a normalized name starting at each word after the first:
+    'احمد سلمي حمدان' -> ['سلمي حمدان', 'حمدان'] (the whole name has its own column).
+    """
+    words = normalized_name.split(' ')
+    return list(dict.fromkeys(' '.join(words[start:]) for start in range(1, len(words))))
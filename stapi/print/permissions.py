@@ -0,0 +1,33 @@
+# stapi/print/permissions.py
+
+from rest_framework.permissions import BasePermission
+
+# ===========================================================================
+# دوال مساعدة لتحديد دور المستخدم (مرة واحدة لكل طلب)
+# ===========================================================================
+def get_user_role(user):
+    """
+    Return the user's Profile role ('manager' / 'employee') or None.
+    The result is memoized on the user instance, so repeated checks within a
+    request never hit the database again.
+    """
+    if not hasattr(user, '_print_role'):
+        profile = getattr(user, 'profile', None) if user.is_authenticated else None
+        user._print_role = profile.role if profile is not None else None
+    return user._print_role
+
+
+def is_manager(user):
+    return bool(user and user.is_authenticated and (user.is_staff or get_user_role(user) == 'manager'))
+
+# ===========================================================================
+# صلاحية المدير
+# ===========================================================================
+class IsManager(BasePermission):
+    """
+    Allow access only to staff users and users whose profile role is 'manager'.
+    """
+    message = 'ليس لديك صلاحية للقيام بهذا الإجراء.'
+
+    def has_permission(self, request, view):
+        return is_manager(request.user)
@@ -0,0 +1,235 @@
+# stapi/print/photos.py
+
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows (خادم التطوير، عملية واحدة)
+    fcntl = None
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import thumbnails
+from .models import SessionPhoto
+
+logger = logging.getLogger(__name__)
+
+# ===========================================================================
+# تخزين صور الجلسات على القرص: رفع على أجزاء قابل للاستئناف
+# ===========================================================================
+# حجم القطعة المقروءة من جسم الطلب في كل مرة: الذاكرة المستخدمة لا تعتمد على حجم الجزء
+COPY_BUFFER_SIZE = 1024 * 1024
+_CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+class UploadConflict(Exception):
+    """
+    The chunk does not start where the stored upload ends; `received_bytes` is the
+    offset the client must resume from.
+    """
+    def __init__(self, received_bytes):
+        super().__init__(received_bytes)
+        self.received_bytes = received_bytes
+
+
+def storage_root():
+    return Path(getattr(settings, 'PHOTO_STORAGE_ROOT', settings.BASE_DIR / 'photos'))
+
+
+def absolute_path(relative_path):
+    return storage_root() / relative_path
+
+
+def new_file_path(session_id, original_name):
+    extension = os.path.splitext(original_name)[1].lower()
+    return f'sessions/{session_id}/{uuid.uuid4().hex}{extension}'
+
+
+def parse_content_range(header):
+    """
+    (start, end, total) from "Content-Range: bytes <start>-<end>/<total>", or None.
+    """
+    match = _CONTENT_RANGE.match(header or '')
+    if not match:
+        return None
+    start, end, total = (int(value) for value in match.groups())
+    return (start, end, total) if start <= end < total else None
+
+
+_local_upload_lock = threading.Lock()
+
+
+@contextmanager
+def _upload_lock(partial):
+    """
+    Exclusive lock on one photo's partial file, shared by every worker process (flock
+    on <partial>.lock). Without fcntl a process-wide thread lock is used instead.
+    """
+    if fcntl is None:
+        with _local_upload_lock:
+            yield
+        return
+    with open(f'{partial}.lock', 'wb') as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def write_chunk(photo, start, length, stream):
+    """
+    Append `length` bytes read from `stream` to the partial file of `photo` at offset
+    `start`, which must equal photo.received_bytes. The body is first spooled to its own
+    file, then appended under a per-photo file lock; the database is only touched by a
+    short conditional UPDATE of received_bytes after the bytes are on disk, so the SQLite
+    write lock is never held during the copy. Returns the new received_bytes.
+    """
+    if start != photo.received_bytes:
+        raise UploadConflict(photo.received_bytes)
+    partial = absolute_path(f'{photo.file_path}.part')
+    partial.parent.mkdir(parents=True, exist_ok=True)
+    chunk = partial.with_name(f'{partial.name}.{uuid.uuid4().hex}')
+    try:
+        with open(chunk, 'wb') as handle:
+            remaining = length
+            while remaining:
+                data = stream.read(min(COPY_BUFFER_SIZE, remaining))
+                if not data:
+                    break
+                handle.write(data)
+                remaining -= len(data)
+        if remaining:
+            # انقطع الاتصال قبل اكتمال الجزء: العميل يستأنف من آخر إزاحة مؤكدة
+            raise UploadConflict(photo.received_bytes)
+
+        received = start + length
+        with _upload_lock(partial):
+            # الإزاحة تُقرأ من جديد تحت القفل: طلب متداخل ربما أكّد الجزء نفسه قبلنا
+            confirmed = SessionPhoto.objects.filter(pk=photo.pk, received_bytes=start, status='uploading').exists()
+            if not confirmed:
+                photo.refresh_from_db(fields=['received_bytes'])
+                raise UploadConflict(photo.received_bytes)
+            # بقايا جزء سابق لم يُؤكد تُحذف بالاقتطاع إلى آخر إزاحة مؤكدة
+            with open(partial, 'r+b' if partial.exists() else 'wb') as target, open(chunk, 'rb') as source:
+                target.truncate(start)
+                target.seek(start)
+                shutil.copyfileobj(source, target, COPY_BUFFER_SIZE)
+            with transaction.atomic():
+                updated = SessionPhoto.objects.filter(pk=photo.pk, received_bytes=start, status='uploading').update(
+                    received_bytes=received, updated_at=timezone.now(),
+                )
+                if not updated:
+                    # حُذفت الصورة أثناء النسخ
+                    photo.refresh_from_db(fields=['received_bytes'])
+                    raise UploadConflict(photo.received_bytes)
+                photo.received_bytes = received
+                if received == photo.size:
+                    complete_upload(photo)
+    finally:
+        chunk.unlink(missing_ok=True)
+    return received
+
+
+def complete_upload(photo):
+    """
+    Move the finished upload into place and queue its thumbnails once the row is saved.
+    """
+    os.replace(absolute_path(f'{photo.file_path}.part'), absolute_path(photo.file_path))
+    absolute_path(f'{photo.file_path}.part.lock').unlink(missing_ok=True)
+    photo.status = 'processing'
+    SessionPhoto.objects.filter(pk=photo.pk).update(status='processing', updated_at=timezone.now())
+    transaction.on_commit(lambda: submit(photo))
+
+
+def delete_files(photo):
+    for path in (f'{photo.file_path}.part', f'{photo.file_path}.part.lock', photo.file_path, photo.thumbnail_path, photo.preview_path):
+        try:
+            absolute_path(path).unlink()
+        except FileNotFoundError:
+            pass
+
+# ===========================================================================
+# الصور المصغرة والمعاينات في مجموعة عمليات خارج مسار الطلب
+# ===========================================================================
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def derivative_jobs(photo):
+    return [
+        (str(absolute_path(photo.thumbnail_path)), getattr(settings, 'PHOTO_THUMBNAIL_SIZE', 320)),
+        (str(absolute_path(photo.preview_path)), getattr(settings, 'PHOTO_PREVIEW_SIZE', 1600)),
+    ]
+
+
+def new_executor(max_workers=None):
+    # spawn بدلاً من fork: العملية الأم متعددة الخيوط (gunicorn threads / ASGI)
+    return ProcessPoolExecutor(
+        max_workers=max_workers or getattr(settings, 'PHOTO_PROCESS_WORKERS', 2),
+        mp_context=multiprocessing.get_context('spawn'),
+    )
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = new_executor()
+        return _executor
+
+
+def submit(photo):
+    """
+    Generate the derivatives of a stored photo on the process pool and record the
+    result on the row when done. The request that completed the upload does not wait.
+    """
+    global _executor
+    photo_id = photo.pk
+    args = (thumbnails.make_derivatives, str(absolute_path(photo.file_path)), derivative_jobs(photo))
+    try:
+        future = _get_executor().submit(*args)
+    except BrokenProcessPool:
+        # عملية فرعية انتهت بشكل غير متوقع (مثلاً نفاد الذاكرة): نبدأ مجموعة جديدة
+        with _executor_lock:
+            _executor = None
+        future = _get_executor().submit(*args)
+    future.add_done_callback(lambda done: _record_result(photo_id, done))
+
+
+def _record_result(photo_id, future):
+    try:
+        record_result(photo_id, future.result())
+    except Exception as exc:
+        record_result(photo_id, exc)
+    finally:
+        # هذا الخيط تابع لـ ProcessPoolExecutor وليس لطلب: نغلق اتصاله بقاعدة البيانات
+        connection.close()
+
+
+def record_result(photo_id, result):
+    """
+    Store (width, height) returned by make_derivatives, or the exception it raised.
+    """
+    if isinstance(result, Exception):
+        logger.warning('Photo %s could not be processed: %r', photo_id, result)
+        SessionPhoto.objects.filter(pk=photo_id).update(
+            status='failed', error=repr(result)[:255], updated_at=timezone.now(),
+        )
+        return
+    width, height = result
+    SessionPhoto.objects.filter(pk=photo_id).update(
+        status='ready', width=width, height=height, error='', updated_at=timezone.now(),
+    )
@@ -0,0 +1,237 @@
+# stapi/print/profiling.py
+
+import contextvars
+import json
+import logging
+import random
+import time
+import tracemalloc
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework import serializers
+
+logger = logging.getLogger('print.profiling')
+
+# ===========================================================================
+# قياس زمن كل طلب (SQL / View / Serializer / Render / PDF) مع Server-Timing
+# ===========================================================================
+_current = contextvars.ContextVar('print_request_profile', default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings = {}
+        self.queries = 0
+        self.sql_time = 0.0
+        self.view_started = None
+        self.view_time = None
+        self.render_started = None
+        self.render_time = None
+        self.serializer_depth = 0
+
+    def add(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper لكل اتصالات قاعدة البيانات
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_time += time.perf_counter() - started
+
+
+def _install(stack, profile):
+    for alias in connections:
+        stack.enter_context(connections[alias].execute_wrapper(profile))
+
+
+def current_profile():
+    return _current.get()
+
+
+@contextmanager
+def timed(name):
+    """
+    Add the duration of the block to the current request profile under `name`
+    (no-op when the request is not being profiled).
+    """
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - started)
+
+
+class TimedSerializerMixin:
+    """
+    Serializer mixin that adds the time spent in .data (the whole nested serialization of the
+    top-level serializer) to the current request profile. Lists built with many=True are timed too.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_serializer = super().many_init(*args, **kwargs)
+        if type(list_serializer) is serializers.ListSerializer:
+            list_serializer.__class__ = TimedListSerializer
+        return list_serializer
+
+    @property
+    def data(self):
+        profile = _current.get()
+        if profile is None or profile.serializer_depth:
+            return super().data
+        # serializer يستدعي .data لـ serializer آخر (SerializerMethodField): لا يُحسب مرتين
+        profile.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().data
+        finally:
+            profile.serializer_depth -= 1
+            profile.add('serializer', time.perf_counter() - started)
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class RequestProfilingMiddleware:
+    """
+    Opt-in (PROFILING_ENABLED) per-request profiler. For a PROFILING_SAMPLE_RATE share of
+    requests it records query count and SQL time, view, serializer, template/renderer and
+    PDF time (plus the tracemalloc peak with PROFILING_TRACEMALLOC) and reports them in a
+    JSON line on the 'print.profiling' logger, and in a Server-Timing header for staff users
+    (everyone with DEBUG). Serializer time covers serializers using TimedSerializerMixin.
+    Like MetricsMiddleware it runs natively in both the WSGI and the ASGI stack.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 1.0)
+        self.trace_memory = getattr(settings, 'PROFILING_TRACEMALLOC', False)
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        # أول Middleware في القائمة: لو كان متزامناً فقط لنُقلت كل سلسلة ASGI إلى خيط
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        profile = self.start()
+        token = _current.set(profile)
+        try:
+            with ExitStack() as stack:
+                _install(stack, profile)
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+
+        profile = self.start()
+        token = _current.set(profile)
+        # الاستعلامات تُنفذ في الخيط المتزامن للطلب، فتُركّب الأغلفة هناك (كما في metrics)
+        stack = ExitStack()
+        await sync_to_async(_install)(stack, profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    def start(self):
+        if self.trace_memory:
+            # القمة على مستوى العملية كلها: تقريبية عند تزامن عدة طلبات
+            tracemalloc.reset_peak()
+        return RequestProfile()
+
+    def finish(self, request, response, profile):
+        total = time.perf_counter() - profile.started
+        if profile.view_started is not None and profile.view_time is None:
+            # استجابة عادية (بدون render لاحق مثل PDF): الـ view استمر حتى النهاية
+            profile.view_time = time.perf_counter() - profile.view_started
+        metrics = [
+            ('db', profile.sql_time, f'{profile.queries} queries'),
+            ('view', profile.view_time, None),
+            ('serializer', profile.timings.get('serializer'), None),
+            ('render', profile.render_time, None),
+            ('pdf', profile.timings.get('pdf'), None),
+            ('total', total, None),
+        ]
+        peak = tracemalloc.get_traced_memory()[1] if self.trace_memory else None
+
+        entries = []
+        for name, seconds, description in metrics:
+            if seconds is None:
+                continue
+            entry = f'{name};dur={seconds * 1000:.1f}'
+            if description:
+                entry += f';desc="{description}"'
+            entries.append(entry)
+        if peak is not None:
+            entries.append(f'mem;desc="peak {peak / 1024:.0f}KiB"')
+        if self.show_timing(request):
+            response['Server-Timing'] = ', '.join(entries)
+
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': profile.queries,
+            **{f'{name}_ms': round(seconds * 1000, 1) for name, seconds, _ in metrics if seconds is not None},
+            **({'tracemalloc_peak_kib': round(peak / 1024)} if peak is not None else {}),
+        }))
+        return response
+
+    @staticmethod
+    def show_timing(request):
+        # الترويسة تكشف زمن SQL وعدد الاستعلامات: للموظفين فقط خارج وضع DEBUG
+        if settings.DEBUG:
+            return True
+        user = getattr(request, 'user', None)
+        return bool(user is not None and user.is_authenticated and user.is_staff)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile = _current.get()
+        if profile is not None:
+            profile.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF Response: الـ view انتهى، والـ render (JSON / HTML) سيحدث بعد هذا مباشرة
+        profile = _current.get()
+        if profile is not None and profile.view_started is not None:
+            now = time.perf_counter()
+            profile.view_time = now - profile.view_started
+            profile.render_started = now
+            response.add_post_render_callback(self._render_finished(profile))
+        return response
+
+    @staticmethod
+    def _render_finished(profile):
+        def callback(response):
+            profile.render_time = time.perf_counter() - profile.render_started
+        return callback
@@ -0,0 +1,170 @@
+# stapi/print/querylog.py
+
+import logging
+import re
+import time
+import traceback
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('print.querylog')
+
+# ===========================================================================
+# كشف استعلامات N+1 وسجل الاستعلامات البطيئة (للتطوير والاختبارات)
+# ===========================================================================
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+\b')
+_SPACES = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    """
+    Normalize a query so that the same statement with different values (or IN lists
+    of a different length) gives the same fingerprint.
+    """
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def origin_frame():
+    """
+    Innermost stack frame in the project's own code (not Django, DRF or this module).
+    """
+    base_dir = str(Path(settings.BASE_DIR).resolve())
+    this_file = str(Path(__file__).resolve())
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        filename = str(Path(frame.filename).resolve())
+        if filename.startswith(base_dir) and filename != this_file and 'site-packages' not in filename:
+            return f'{frame.filename}:{frame.lineno} in {frame.name}'
+    return None
+
+
+class QueryInspector:
+    """
+    Cursor wrapper (connection.execute_wrapper) for one request or test block: counts the
+    queries, groups them by fingerprint to spot N+1 patterns, logs the slow ones with their
+    parameters and, in strict mode, raises QueryBudgetExceeded at the query that crosses
+    `budget`.
+    """
+
+    def __init__(self, label='', budget=None, strict=False):
+        self.label = label
+        self.budget = budget
+        self.strict = strict
+        self.n_plus_one_threshold = getattr(settings, 'N_PLUS_ONE_THRESHOLD', 5)
+        self.slow_query_ms = getattr(settings, 'SLOW_QUERY_MS', 100)
+        self.count = 0
+        self.fingerprints = {}
+        self.n_plus_one = {}
+        self.slow_queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        if self.strict and self.budget is not None and self.count > self.budget:
+            raise QueryBudgetExceeded(
+                f'{self.label}: more than {self.budget} queries (query #{self.count}: {sql})'
+            )
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            self._record(sql, params, duration_ms, context['connection'].alias)
+
+    def _record(self, sql, params, duration_ms, alias):
+        key = fingerprint(sql)
+        seen = self.fingerprints.get(key, 0) + 1
+        self.fingerprints[key] = seen
+        if seen == self.n_plus_one_threshold:
+            self.n_plus_one[key] = origin_frame()
+        if duration_ms >= self.slow_query_ms:
+            frame = origin_frame()
+            self.slow_queries.append((sql, params, duration_ms, frame))
+            logger.warning(
+                'Slow query (%.1f ms, %s) in %s from %s: %s params=%r',
+                duration_ms, alias, self.label, frame, sql, params,
+            )
+
+    def report(self):
+        for key, frame in self.n_plus_one.items():
+            logger.warning(
+                'Possible N+1 in %s: %d similar queries from %s: %s',
+                self.label, self.fingerprints[key], frame, key,
+            )
+        if self.budget is not None and self.count > self.budget:
+            logger.warning('%s ran %d queries (budget %d)', self.label, self.count, self.budget)
+
+    @contextmanager
+    def installed(self):
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(self))
+            yield self
+
+
+@contextmanager
+def assert_max_queries(budget, label='block'):
+    """
+    For tests: fail as soon as the block runs more than `budget` queries.
+
+        with assert_max_queries(8):
+            client.get(f'/api/clients/{pk}/dashboard/')
+    """
+    inspector = QueryInspector(label=label, budget=budget, strict=True)
+    with inspector.installed():
+        yield inspector
+    inspector.report()
+
+
+def view_query_budget(view_func, method):
+    """
+    The `query_budget` declared on a DRF view/viewset: an int, or a dict per action
+    (e.g. {'list': 6, 'dashboard': 10}). Falls back to QUERY_BUDGET_DEFAULT.
+    """
+    default = getattr(settings, 'QUERY_BUDGET_DEFAULT', None)
+    budget = getattr(getattr(view_func, 'cls', None), 'query_budget', None)
+    if isinstance(budget, dict):
+        action = (getattr(view_func, 'actions', None) or {}).get(method.lower())
+        return budget.get(action, default)
+    return budget if budget is not None else default
+
+
+class QueryInspectorMiddleware:
+    """
+    Development middleware (QUERY_INSPECTOR_ENABLED): logs N+1 patterns and slow queries
+    for every request and adds an X-Query-Inspector header. With QUERY_BUDGET_STRICT the
+    request fails at the first query over the view's query_budget, so tests catch regressions.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSPECTOR_ENABLED', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.strict = getattr(settings, 'QUERY_BUDGET_STRICT', False)
+
+    def __call__(self, request):
+        inspector = QueryInspector(label=f'{request.method} {request.path}', strict=self.strict)
+        request._query_inspector = inspector
+        with inspector.installed():
+            response = self.get_response(request)
+        inspector.report()
+        response['X-Query-Inspector'] = (
+            f'queries={inspector.count}; n_plus_one={len(inspector.n_plus_one)}; slow={len(inspector.slow_queries)}'
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        inspector = getattr(request, '_query_inspector', None)
+        if inspector is not None:
+            inspector.budget = view_query_budget(view_func, request.method)
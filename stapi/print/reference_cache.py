@@ -0,0 +1,134 @@
+# stapi/print/reference_cache.py
+
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers
+
+from .db_routers import use_primary
+
+# ===========================================================================
+# ذاكرة داخل العملية للجداول المرجعية الصغيرة (باقات التصوير، المصورون)
+# ===========================================================================
+class ReferenceCache:
+    """
+    Keep every row of a small, rarely edited table in process memory, together with
+    its serialized representation. A version token in Django's shared cache is bumped
+    on every write (see print/signals.py). Each process checks it at most once every
+    REFERENCE_CACHE_CHECK_INTERVAL seconds and reloads the whole table when it changed.
+    """
+
+    def __init__(self, model, serializer_class):
+        self.model = model
+        self.serializer_class = serializer_class
+        self.version_key = f'ref-cache:version:{model._meta.label_lower}'
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        self._objects = {}
+        self._data = {}
+
+    def __deepcopy__(self, memo):
+        # حقول DRF تُنسخ لكل Serializer، أما الذاكرة فيجب أن تبقى مشتركة
+        return self
+
+    def _shared_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, uuid.uuid4().hex, None)
+            version = cache.get(self.version_key)
+        return version
+
+    def _ensure_fresh(self, force=False):
+        interval = getattr(settings, 'REFERENCE_CACHE_CHECK_INTERVAL', 1.0)
+        now = time.monotonic()
+        if not force and self._version is not None and now - self._checked_at < interval:
+            return
+        # قراءة النسخة قبل تحميل البيانات: أي تعديل لاحق سيغير النسخة ويفرض إعادة التحميل
+        version = self._shared_version()
+        with self._lock:
+            if force or version != self._version:
+                with use_primary():
+                    objects = {obj.pk: obj for obj in self.model._default_manager.all()}
+                self._data = {pk: self.serializer_class(obj).data for pk, obj in objects.items()}
+                self._objects = objects
+                self._version = version
+            self._checked_at = now
+
+    def _reload_if_missing(self, pk):
+        """
+        A row created in another process may not be visible yet (check interval, or a
+        per-process cache backend): reload once if it exists, rather than answer None.
+        """
+        if pk is None or pk in self._objects:
+            return
+        with use_primary():
+            exists = self.model._default_manager.filter(pk=pk).exists()
+        if exists:
+            self._ensure_fresh(force=True)
+
+    def bump(self):
+        """
+        Invalidate the table in every process (call after a committed write).
+        """
+        cache.set(self.version_key, uuid.uuid4().hex, None)
+        self._version = None
+
+    def get_data(self, pk):
+        self._ensure_fresh()
+        self._reload_if_missing(pk)
+        data = self._data.get(pk)
+        return dict(data) if data is not None else None
+
+    def get_object(self, pk):
+        self._ensure_fresh()
+        self._reload_if_missing(pk)
+        return self._objects.get(pk)
+
+    def all(self):
+        self._ensure_fresh()
+        return list(self._objects.values())
+
+# ===========================================================================
+# حقول Serializer تقرأ من الذاكرة بدلاً من قاعدة البيانات
+# ===========================================================================
+class ReferenceField(serializers.Field):
+    """
+    Read-only nested representation of a foreign key, looked up by id in a ReferenceCache.
+    Use it with source='<fk>_id' so the related row is never loaded from the database.
+    """
+
+    def __init__(self, reference_cache, **kwargs):
+        self.reference_cache = reference_cache
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return self.reference_cache.get_data(value)
+
+
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that validates the submitted id against a ReferenceCache
+    instead of running a query per request.
+    """
+
+    def __init__(self, reference_cache, **kwargs):
+        self.reference_cache = reference_cache
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = self.reference_cache.model._meta.pk.to_python(data)
+        except (DjangoValidationError, TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        instance = self.reference_cache.get_object(pk)
+        if instance is None:
+            self.fail('does_not_exist', pk_value=data)
+        return instance
@@ -0,0 +1,149 @@
+# stapi/print/rendering.py
+
+import asyncio
+import base64
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+from . import metrics
+from .profiling import timed
+
+# ===========================================================================
+# أدوات توليد ملفات PDF ورموز QR (الإيصالات والفواتير)
+# weasyprint و qrcode (ومعهما Pillow و Cairo/Pango) يتم تحميلها عند أول استخدام فقط،
+# حتى لا تدفع أوامر manage.py وبدء تشغيل العمليات ثمنها
+# ===========================================================================
+INVOICE_COMPANY_INFO = {
+    'name': 'استوديو الإبداع',
+    'address': 'شارع الفن، مدينة الإبداع، 12345',
+    'phone': '01001234567',
+    'email': 'info@creative-studio.com',
+    'website': 'www.creative-studio.com',
+    'tax_id': 'VAT123456789',
+}
+
+
+def preload():
+    """
+    Import the PDF/QR libraries now (RENDERING_PRELOAD), so that the first PDF request
+    of a worker does not pay for them.
+    """
+    import qrcode.image.pil  # noqa: F401
+    import weasyprint  # noqa: F401
+
+
+def qr_code_base64(data):
+    import qrcode
+
+    qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_L, box_size=10, border=4)
+    qr.add_data(data)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def document_context(qr_data):
+    """
+    Context shared by every receipt/invoice template: company info, logo and QR code.
+    """
+    return {
+        'company': INVOICE_COMPANY_INFO,
+        'company_logo_absolute_url': staticfiles_storage.url('images/logo.png'),
+        'qr_code_base64': qr_code_base64(qr_data),
+    }
+
+
+def payment_receipt_context(receipt):
+    # Use receipt.paid_amount and receipt.total_amount for QR data
+    qr_data = f"Receipt: {receipt.receipt_number}\nPaid: {receipt.paid_amount}\nTotal: {receipt.total_amount}\nMethod: {receipt.payment_method}"
+    return {
+        'receipt': receipt,
+        'printing': receipt.printing,
+        'photography_session': receipt.photography_session,
+        'remaining_amount': receipt.printing.remaining_amount if receipt.printing else (receipt.photography_session.remaining_amount if receipt.photography_session else Decimal('0.00')),
+        **document_context(qr_data),
+    }
+
+
+def print_job_invoice_context(print_job):
+    qr_data = f"Print Job: {print_job.receipt_number}\nClient: {print_job.client.name}\nTotal: {print_job.total_amount}\nPaid: {print_job.paid_amount}"
+    return {
+        'print_job': print_job,
+        'client': print_job.client,
+        'receipts': print_job.payment_receipts.all().order_by('date_issued'),
+        **document_context(qr_data),
+    }
+
+
+def photo_booking_context(photo_session):
+    qr_data = f"Booking: {photo_session.receipt_number}\nClient: {photo_session.client.name}\nDate: {photo_session.session_date}\nPaid: {photo_session.paid_amount}"
+    return {
+        'photo_session': photo_session,
+        'client': photo_session.client,
+        'receipts': photo_session.payment_receipts.all().order_by('date_issued'),
+        'booking_receipt_color': '#FFD700',
+        **document_context(qr_data),
+    }
+
+
+def html_to_pdf(html_string, base_url, template_name='unknown'):
+    from weasyprint import HTML
+
+    started = time.perf_counter()
+    with timed('pdf'):
+        pdf_file = HTML(string=html_string, base_url=base_url).write_pdf()
+    metrics.observe('stapi_pdf_render_duration_seconds', time.perf_counter() - started, template=template_name)
+    metrics.observe('stapi_pdf_size_bytes', len(pdf_file), template=template_name)
+    return pdf_file
+
+
+def pdf_response(pdf_file, file_name):
+    response = HttpResponse(pdf_file, content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{file_name}"'
+    return response
+
+
+def render_pdf_response(template_name, context, request, file_name):
+    html_string = render_to_string(template_name, context)
+    pdf_file = html_to_pdf(html_string, request.build_absolute_uri('/'), template_name)
+    return pdf_response(pdf_file, file_name)
+
+# ===========================================================================
+# تنفيذ WeasyPrint خارج حلقة الأحداث (ASGI) في مجموعة خيوط محدودة
+# ===========================================================================
+class RenderQueueFull(Exception):
+    pass
+
+
+_pdf_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'PDF_RENDER_WORKERS', 2), thread_name_prefix='pdf-render'
+)
+# عدد العمليات المسموح بها (قيد التنفيذ + في الانتظار) قبل رفض الطلبات الجديدة
+_pdf_slots = threading.BoundedSemaphore(
+    getattr(settings, 'PDF_RENDER_WORKERS', 2) + getattr(settings, 'PDF_RENDER_QUEUE', 16)
+)
+
+
+async def ahtml_to_pdf(html_string, base_url, template_name='unknown'):
+    """
+    Render HTML to PDF on the bounded render pool without blocking the event loop.
+    Raises RenderQueueFull when PDF_RENDER_WORKERS + PDF_RENDER_QUEUE renders are already pending.
+    The HTML must be rendered beforehand: the pool threads never touch the database.
+    """
+    if not _pdf_slots.acquire(blocking=False):
+        raise RenderQueueFull()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_pdf_executor, html_to_pdf, html_string, base_url, template_name)
+    finally:
+        _pdf_slots.release()
@@ -1,13 +1,26 @@
 # stapi/print/serializers.py
 
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
-from .models import Client, PrintJob, PaymentReceipt, Profile, PhotographyPackage, Photographer, PhotoSession # تم إضافة نماذج التصوير
+from django.urls import reverse
+import os
+from .models import Client, PrintJob, PaymentReceipt, Profile, PhotographyPackage, Photographer, PhotoSession, SessionPhoto, CalendarFeed # تم إضافة نماذج التصوير
+from .reference_cache import ReferenceCache, ReferenceField, CachedPrimaryKeyRelatedField
+from . import availability
+from .profiling import TimedSerializerMixin
+
+# ===========================================================================
+# أساس serializers النماذج (زمن التحويل يظهر في print/profiling.py)
+# ===========================================================================
+class ModelSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """ModelSerializer whose serialization time is reported by the request profiler."""
+
 
 # ===========================================================================
 # 1. User Serializer (لجلب بيانات المستخدم الأساسية وإنشاء/تحديث Profile)
 # ===========================================================================
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(ModelSerializer):
     # يعرض دور المستخدم المقروء بشريًا من Profile
     profile_role_display = serializers.CharField(source='profile.get_role_display', read_only=True)
     # حقل لكتابة الدور عند إنشاء/تحديث المستخدم
@@ -57,7 +70,7 @@ class UserSerializer(serializers.ModelSerializer):
 # ===========================================================================
 # 2. Profile Serializer (لإدارة ملفات تعريف المستخدمين - يستخدم بشكل أساسي داخليًا)
 # ===========================================================================
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(ModelSerializer):
     user = serializers.StringRelatedField(read_only=True) # يعرض اسم المستخدم
     role_display = serializers.CharField(source='get_role_display', read_only=True)
 
@@ -69,7 +82,7 @@ class ProfileSerializer(serializers.ModelSerializer):
 # ===========================================================================
 # 3. Client Serializer
 # ===========================================================================
-class ClientSerializer(serializers.ModelSerializer):
+class ClientSerializer(ModelSerializer):
     total_remaining_amount_on_jobs = serializers.SerializerMethodField()
 
     class Meta:
@@ -80,6 +93,9 @@ class ClientSerializer(serializers.ModelSerializer):
         ]
 
     def get_total_remaining_amount_on_jobs(self, obj):
+        # القيمة محسوبة مسبقاً في SQL (انظر with_outstanding_balance في api_views)
+        if getattr(obj, 'outstanding_balance', None) is not None:
+            return obj.outstanding_balance
         total_print_remaining = sum(job.remaining_amount for job in obj.print_jobs.all())
         total_photo_remaining = sum(session.remaining_amount for session in obj.photo_sessions.all())
         return total_print_remaining + total_photo_remaining
@@ -88,7 +104,7 @@ class ClientSerializer(serializers.ModelSerializer):
 # ===========================================================================
 # 4. Photography Package Serializer
 # ===========================================================================
-class PhotographyPackageSerializer(serializers.ModelSerializer):
+class PhotographyPackageSerializer(ModelSerializer):
     class Meta:
         model = PhotographyPackage
         fields = '__all__'
@@ -96,15 +112,21 @@ class PhotographyPackageSerializer(serializers.ModelSerializer):
 # ===========================================================================
 # 5. Photographer Serializer
 # ===========================================================================
-class PhotographerSerializer(serializers.ModelSerializer):
+class PhotographerSerializer(ModelSerializer):
     class Meta:
         model = Photographer
         fields = '__all__'
 
+# ===========================================================================
+# ذاكرة داخل العملية لباقات التصوير والمصورين (تُستخدم في PhotoSessionSerializer)
+# ===========================================================================
+package_cache = ReferenceCache(PhotographyPackage, PhotographyPackageSerializer)
+photographer_cache = ReferenceCache(Photographer, PhotographerSerializer)
+
 # ===========================================================================
 # 6. Payment Receipt Serializer
 # ===========================================================================
-class PaymentReceiptSerializer(serializers.ModelSerializer):
+class PaymentReceiptSerializer(ModelSerializer):
     get_payment_method_display = serializers.CharField(read_only=True)
     get_receipt_type_display = serializers.CharField(read_only=True)
 
@@ -121,6 +143,8 @@ class PaymentReceiptSerializer(serializers.ModelSerializer):
     photography_session_total_amount = serializers.DecimalField(source='photography_session.total_amount', max_digits=10, decimal_places=2, read_only=True)
     photography_session_paid_amount = serializers.DecimalField(source='photography_session.paid_amount', max_digits=10, decimal_places=2, read_only=True)
     photography_session_remaining_amount = serializers.DecimalField(source='photography_session.remaining_amount', max_digits=10, decimal_places=2, read_only=True)
+    # True للسجلات المقروءة من جداول الأرشيف (?include_archived=)
+    is_archived = serializers.BooleanField(read_only=True, default=False)
 
 
     class Meta:
@@ -134,7 +158,7 @@ class PaymentReceiptSerializer(serializers.ModelSerializer):
             'printing_paid_amount', 'printing_remaining_amount',
             'photography_session_id', 'photography_session_receipt_number',
             'photography_session_total_amount', 'photography_session_paid_amount',
-            'photography_session_remaining_amount',
+            'photography_session_remaining_amount', 'is_archived',
         ]
         read_only_fields = ['receipt_number', 'date_issued', 'issued_by']
 
@@ -142,7 +166,7 @@ class PaymentReceiptSerializer(serializers.ModelSerializer):
 # ===========================================================================
 # 7. Print Job Serializer
 # ===========================================================================
-class PrintJobSerializer(serializers.ModelSerializer):
+class PrintJobSerializer(ModelSerializer):
     client = ClientSerializer(read_only=True)
     client_id = serializers.PrimaryKeyRelatedField(queryset=Client.objects.all(), source='client', write_only=True)
 
@@ -155,6 +179,7 @@ class PrintJobSerializer(serializers.ModelSerializer):
     payment_receipts = PaymentReceiptSerializer(many=True, read_only=True)
 
     issued_by_username = serializers.CharField(source='issued_by.username', read_only=True)
+    is_archived = serializers.BooleanField(read_only=True, default=False)
 
 
     class Meta:
@@ -163,7 +188,7 @@ class PrintJobSerializer(serializers.ModelSerializer):
             'id', 'receipt_number', 'client', 'client_id', 'print_type', 'print_type_display',
             'size', 'size_display', 'total_amount', 'paid_amount', 'remaining_amount',
             'delivery_date', 'status', 'status_display', 'notes', 'issued_by',
-            'issued_by_username', 'created_at', 'updated_at', 'payment_receipts'
+            'issued_by_username', 'created_at', 'updated_at', 'payment_receipts', 'is_archived'
         ]
         read_only_fields = ['receipt_number', 'created_at', 'updated_at', 'issued_by', 'remaining_amount']
 
@@ -176,15 +201,16 @@ class PrintJobSerializer(serializers.ModelSerializer):
 # ===========================================================================
 # 8. Photo Session Serializer
 # ===========================================================================
-class PhotoSessionSerializer(serializers.ModelSerializer):
+class PhotoSessionSerializer(ModelSerializer):
     client = ClientSerializer(read_only=True)
     client_id = serializers.PrimaryKeyRelatedField(queryset=Client.objects.all(), source='client', write_only=True)
 
-    package = PhotographyPackageSerializer(read_only=True)
-    package_id = serializers.PrimaryKeyRelatedField(queryset=PhotographyPackage.objects.all(), source='package', write_only=True, required=False, allow_null=True)
+    # الباقة والمصور يُقرآن من الذاكرة (بدون JOIN أو استعلام لكل صف)
+    package = ReferenceField(package_cache, source='package_id')
+    package_id = CachedPrimaryKeyRelatedField(package_cache, queryset=PhotographyPackage.objects.all(), source='package', write_only=True, required=False, allow_null=True)
 
-    photographer = PhotographerSerializer(read_only=True)
-    photographer_id = serializers.PrimaryKeyRelatedField(queryset=Photographer.objects.all(), source='photographer', write_only=True, required=False, allow_null=True)
+    photographer = ReferenceField(photographer_cache, source='photographer_id')
+    photographer_id = CachedPrimaryKeyRelatedField(photographer_cache, queryset=Photographer.objects.all(), source='photographer', write_only=True, required=False, allow_null=True)
 
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     event_type_display = serializers.CharField(source='get_event_type_display', read_only=True)
@@ -192,12 +218,13 @@ class PhotoSessionSerializer(serializers.ModelSerializer):
 
     remaining_amount = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     issued_by_username = serializers.CharField(source='issued_by.username', read_only=True)
+    is_archived = serializers.BooleanField(read_only=True, default=False)
 
     class Meta:
         model = PhotoSession
         fields = [
             'id', 'receipt_number', 'client', 'client_id', 'package', 'package_id',
-            'photographer', 'photographer_id', 'session_date', 'session_time',
+            'photographer', 'photographer_id', 'session_date', 'session_time', 'duration_minutes',
             'location', 'total_amount', 'paid_amount', 'remaining_amount',
             'status', 'status_display', 'notes',
             'event_type', 'event_type_display',
@@ -210,10 +237,48 @@ class PhotoSessionSerializer(serializers.ModelSerializer):
             'agreement_notes',
             'digital_photos_delivered',
             'printed_photos_delivered', 'album_delivered', 'frame_delivered',
-            'issued_by', 'issued_by_username', 'created_at', 'updated_at'
+            'issued_by', 'issued_by_username', 'created_at', 'updated_at', 'is_archived'
         ]
         read_only_fields = ['receipt_number', 'created_at', 'updated_at', 'issued_by', 'remaining_amount']
 
+    # تغيير أي منها يستدعي التحقق من تعارض مواعيد المصور (وكذلك إعادة تفعيل جلسة ملغاة)
+    SCHEDULE_FIELDS = ('photographer', 'session_date', 'session_time', 'duration_minutes')
+
+    def needs_conflict_check(self, attrs):
+        """
+        New sessions, changes to the photographer/date/time/duration, and sessions moved
+        from an inactive status (cancelled) back to an active one. A status change between
+        active statuses (e.g. completed) does not touch the schedule and is not checked.
+        """
+        instance = self.instance
+        if instance is None:
+            return True
+        if 'photographer' in attrs and getattr(attrs['photographer'], 'pk', None) != instance.photographer_id:
+            return True
+        if any(field in attrs and attrs[field] != getattr(instance, field) for field in self.SCHEDULE_FIELDS[1:]):
+            return True
+        return instance.status in availability.INACTIVE_STATUSES and attrs.get('status', instance.status) not in availability.INACTIVE_STATUSES
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        instance = self.instance
+        if not self.needs_conflict_check(attrs):
+            return attrs
+        schedule = {
+            field: attrs[field] if field in attrs else getattr(instance, field, None) for field in (*self.SCHEDULE_FIELDS, 'status')
+        }
+        if schedule['photographer'] is None or schedule['session_date'] is None or schedule['status'] in availability.INACTIVE_STATUSES:
+            return attrs
+        conflicts = availability.find_conflicts(
+            schedule['photographer'].pk, schedule['session_date'], schedule['session_time'], schedule['duration_minutes'],
+            exclude_pk=getattr(instance, 'pk', None),
+        )
+        if conflicts:
+            raise serializers.ValidationError({
+                'photographer_id': f"المصور {schedule['photographer'].name} محجوز في هذا الوقت (الجلسات: {', '.join(f'#{pk}' for pk in conflicts)})."
+            })
+        return attrs
+
     def to_representation(self, instance):
         representation = super().to_representation(instance)
         if not representation.get('client'):
@@ -223,3 +288,129 @@ class PhotoSessionSerializer(serializers.ModelSerializer):
         if not representation.get('photographer'):
             representation['photographer'] = None
         return representation
+
+# ===========================================================================
+# 9. Batch Request Serializers (/api/batch/)
+# ===========================================================================
+class BatchSubRequestSerializer(serializers.Serializer):
+    id = serializers.CharField(required=False, max_length=100)
+    method = serializers.ChoiceField(choices=['GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE'])
+    path = serializers.CharField(max_length=2000)
+    body = serializers.JSONField(required=False, allow_null=True)
+
+    def to_internal_value(self, data):
+        if isinstance(data, dict) and isinstance(data.get('method'), str):
+            data = {**data, 'method': data['method'].upper()}
+        return super().to_internal_value(data)
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    requests = BatchSubRequestSerializer(many=True, allow_empty=False)
+    atomic = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        max_requests = getattr(settings, 'BATCH_MAX_REQUESTS', 20)
+        if len(value) > max_requests:
+            raise serializers.ValidationError(f"الحد الأقصى لعدد الطلبات في الدفعة هو {max_requests}.")
+        return value
+
+# ===========================================================================
+# 10. Client Dashboard Serializers (/api/clients/{id}/dashboard/)
+# ===========================================================================
+# العميل يظهر مرة واحدة في رأس الاستجابة، لذلك لا يتكرر داخل كل طلب أو جلسة
+class DashboardPrintJobSerializer(PrintJobSerializer):
+    client = None
+    client_id = None
+
+    class Meta(PrintJobSerializer.Meta):
+        fields = [field for field in PrintJobSerializer.Meta.fields if field not in ('client', 'client_id')]
+
+    def to_representation(self, instance):
+        return serializers.ModelSerializer.to_representation(self, instance)
+
+
+class DashboardPhotoSessionSerializer(PhotoSessionSerializer):
+    client = None
+    client_id = None
+    payment_receipts = PaymentReceiptSerializer(many=True, read_only=True)
+
+    class Meta(PhotoSessionSerializer.Meta):
+        fields = [
+            field for field in PhotoSessionSerializer.Meta.fields if field not in ('client', 'client_id')
+        ] + ['payment_receipts']
+
+    def to_representation(self, instance):
+        representation = serializers.ModelSerializer.to_representation(self, instance)
+        for field in ('package', 'photographer'):
+            if not representation.get(field):
+                representation[field] = None
+        return representation
+
+# ===========================================================================
+# 11. Session Photo Serializers (/api/photosessions/{id}/photos/)
+# ===========================================================================
+class SessionPhotoSerializer(ModelSerializer):
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    thumbnail_url = serializers.SerializerMethodField()
+    preview_url = serializers.SerializerMethodField()
+    original_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SessionPhoto
+        fields = [
+            'id', 'session', 'original_name', 'size', 'received_bytes', 'status', 'status_display',
+            'width', 'height', 'error', 'thumbnail_url', 'preview_url', 'original_url',
+            'uploaded_by', 'created_at', 'updated_at',
+        ]
+        read_only_fields = fields
+
+    def _url(self, instance, action):
+        # الروابط تظهر فقط بعد اكتمال الرفع والمعالجة
+        if instance.status != 'ready':
+            return None
+        url = reverse(f'sessionphoto-{action}', args=[instance.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_thumbnail_url(self, instance):
+        return self._url(instance, 'thumbnail')
+
+    def get_preview_url(self, instance):
+        return self._url(instance, 'preview')
+
+    def get_original_url(self, instance):
+        return self._url(instance, 'original')
+
+
+class SessionPhotoUploadSerializer(serializers.Serializer):
+    filename = serializers.CharField(max_length=255)
+    size = serializers.IntegerField(min_value=1)
+
+    def validate_filename(self, value):
+        allowed = getattr(settings, 'PHOTO_ALLOWED_EXTENSIONS', ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.webp'))
+        if os.path.splitext(value)[1].lower() not in allowed:
+            raise serializers.ValidationError(f"نوع الملف غير مدعوم، الأنواع المسموحة: {', '.join(allowed)}")
+        return os.path.basename(value)
+
+    def validate_size(self, value):
+        max_size = getattr(settings, 'PHOTO_MAX_FILE_SIZE', 100 * 1024 * 1024)
+        if value > max_size:
+            raise serializers.ValidationError(f"الحد الأقصى لحجم الصورة هو {max_size // (1024 * 1024)} ميجابايت.")
+        return value
+
+# ===========================================================================
+# 12. Calendar Feed Serializer (/api/calendar-feeds/)
+# ===========================================================================
+class CalendarFeedSerializer(ModelSerializer):
+    photographer_name = serializers.CharField(source='photographer.name', read_only=True, default=None)
+    url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CalendarFeed
+        fields = ['id', 'name', 'photographer', 'photographer_name', 'is_active', 'url', 'created_by', 'created_at']
+        read_only_fields = ['created_by', 'created_at']
+
+    def get_url(self, instance):
+        url = reverse('calendar_feed', args=[instance.token])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
@@ -1,9 +1,15 @@
 # stapi/print/signals.py
 
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.contrib.auth.models import User
 from django.dispatch import receiver
-from .models import Profile
+from rest_framework.authtoken.models import Token
+from . import caching, metrics, photos
+from .authentication import invalidate_user, token_cache
+from .events import change_event, change_hub
+from .models import Profile, Client, PrintJob, PhotoSession, PaymentReceipt, PhotographyPackage, Photographer, DeletionLog, SessionPhoto, BulkExport
+from .serializers import package_cache, photographer_cache
 
 # @receiver(post_save, sender=User)
 # def create_or_update_user_profile(sender, instance, created, **kwargs):
@@ -20,3 +26,124 @@ from .models import Profile
 
 # يمكنك حذف الكود أعلاه بالكامل أو تركه معلقًا كما هو موضح.
 # الأهم هو ألا يتم تشغيل هذا الـ signal.
+
+
+# ===========================================================================
+# إبطال ذاكرة التوكنات المؤقتة (CachedTokenAuthentication)
+# ===========================================================================
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    # تسجيل الخروج أو حذف التوكن
+    token_cache.delete(instance.key)
+    transaction.on_commit(lambda: invalidate_user(instance.user_id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def evict_user_tokens(sender, instance, **kwargs):
+    # تعطيل المستخدم أو تعديل بياناته أو حذفه
+    token_cache.delete_user(instance.pk)
+    transaction.on_commit(lambda: invalidate_user(instance.pk))
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def evict_profile_user_tokens(sender, instance, **kwargs):
+    # تغيير دور المستخدم
+    token_cache.delete_user(instance.user_id)
+    transaction.on_commit(lambda: invalidate_user(instance.user_id))
+
+
+# ===========================================================================
+# إبطال ذاكرة الاستجابات المؤقتة (ResponseCacheMixin)
+# ===========================================================================
+def invalidate_response_cache(sender, instance, **kwargs):
+    tags = caching.invalidation_tags(instance)
+    # بعد تأكيد المعاملة فقط، حتى لا يُعاد ملء الذاكرة ببيانات قديمة قبل الحفظ
+    transaction.on_commit(lambda: caching.bump_tags(tags))
+
+
+for model in (Client, PrintJob, PhotoSession, PaymentReceipt, PhotographyPackage, Photographer):
+    post_save.connect(invalidate_response_cache, sender=model, dispatch_uid=f'resp-cache-save-{model.__name__}')
+    post_delete.connect(invalidate_response_cache, sender=model, dispatch_uid=f'resp-cache-delete-{model.__name__}')
+
+
+# ===========================================================================
+# تحديث نسخة الذاكرة المرجعية (package_cache / photographer_cache)
+# ===========================================================================
+@receiver(post_save, sender=PhotographyPackage)
+@receiver(post_delete, sender=PhotographyPackage)
+def bump_package_cache(sender, instance, **kwargs):
+    transaction.on_commit(package_cache.bump)
+
+
+@receiver(post_save, sender=Photographer)
+@receiver(post_delete, sender=Photographer)
+def bump_photographer_cache(sender, instance, **kwargs):
+    transaction.on_commit(photographer_cache.bump)
+
+
+# ===========================================================================
+# نشر أحداث التغيير لاتصالات SSE (/api/events/)
+# ===========================================================================
+def publish_saved_change(sender, instance, **kwargs):
+    payload = change_event(instance, 'saved')
+    transaction.on_commit(lambda: change_hub.publish(payload))
+
+
+def publish_deleted_change(sender, instance, **kwargs):
+    payload = change_event(instance, 'deleted')
+    transaction.on_commit(lambda: change_hub.publish(payload))
+
+
+for model in (Client, PrintJob, PhotoSession, PaymentReceipt):
+    post_save.connect(publish_saved_change, sender=model, dispatch_uid=f'sse-save-{model.__name__}')
+    post_delete.connect(publish_deleted_change, sender=model, dispatch_uid=f'sse-delete-{model.__name__}')
+
+
+# ===========================================================================
+# تسجيل المحذوفات للمزامنة التزايدية (DeltaSyncMixin)
+# ===========================================================================
+def record_deletion(sender, instance, **kwargs):
+    # داخل نفس المعاملة: إذا تم التراجع عن الحذف يتم التراجع عن السجل أيضاً
+    DeletionLog.objects.create(model_name=instance._meta.model_name, object_id=instance.pk)
+
+
+for model in (Client, PrintJob, PhotoSession, PaymentReceipt, PhotographyPackage, Photographer):
+    post_delete.connect(record_deletion, sender=model, dispatch_uid=f'deletion-log-{model.__name__}')
+
+
+# ===========================================================================
+# عدادات الدفعات المسجلة (/metrics)
+# ===========================================================================
+@receiver(post_save, sender=PaymentReceipt)
+def count_posted_payment(sender, instance, created, **kwargs):
+    if not created:
+        return
+    labels = {'receipt_type': instance.receipt_type, 'payment_method': instance.payment_method}
+    paid_amount = float(instance.paid_amount or 0)
+
+    def record():
+        metrics.inc('stapi_payments_posted_total', **labels)
+        metrics.inc('stapi_payments_amount_total', paid_amount, **labels)
+
+    transaction.on_commit(record)
+
+
+# ===========================================================================
+# حذف ملفات صور الجلسات من القرص (بما فيها حذف الجلسة نفسها)
+# ===========================================================================
+@receiver(post_delete, sender=SessionPhoto)
+def delete_session_photo_files(sender, instance, **kwargs):
+    # بعد تأكيد الحذف فقط، حتى لا تضيع الملفات إذا تم التراجع عن المعاملة
+    transaction.on_commit(lambda: photos.delete_files(instance))
+
+
+# ===========================================================================
+# حذف ملفات التصدير الجماعي من القرص (BulkExport)
+# ===========================================================================
+@receiver(post_delete, sender=BulkExport)
+def delete_bulk_export_file(sender, instance, **kwargs):
+    # استيراد متأخر: bulk_exports يستورد api_views، وهذه الوحدة تُحمل في ready()
+    from . import bulk_exports
+    transaction.on_commit(lambda: bulk_exports.delete_file(instance))
@@ -1,3 +1,1061 @@
-from django.test import TestCase
+# stapi/print/tests.py
 
-# Create your tests here.
+import asyncio
+import io
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import warnings
+from contextlib import closing
+from datetime import date, time, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.core.cache import caches
+from django.db import connection, connections
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from drf_yasg.generators import OpenAPISchemaGenerator
+from rest_framework.authtoken.models import Token
+from rest_framework.generics import GenericAPIView
+from rest_framework.test import APIClient
+
+from .admin import EstimatedCountPaginator, estimated_row_count
+from .management.commands import load_test
+from .api_views import ClientViewSet
+from .authentication import TokenCache, authenticate_key, token_cache
+from . import bulk_exports, caching, exports, ledger, metrics, photos, views
+from .client_search import autocomplete
+from .checks import replica_sticky_cache_check
+from .db_routers import (
+    STICKY_CACHE_KEY, PrimaryReplicaRouter, ahas_recent_write, has_recent_write, mark_recent_write, use_primary, use_replica,
+)
+from .events import ChangeHub
+from .models import (
+    ArchivedPaymentReceipt, ArchivedPrintJob, BulkExport, CalendarFeed, Client, ClientNameSuffix, DeletionLog,
+    PaymentReceipt, Photographer, PhotoSession, PrintJob, Profile, SessionPhoto,
+)
+from .normalization import digits_only, name_suffixes, normalize_name
+from .querylog import QueryBudgetExceeded, assert_max_queries
+from .reference_cache import ReferenceCache
+from .serializers import ClientSerializer, PhotographerSerializer
+
+
+def create_history(client, user, count):
+    """`count` print jobs and photo sessions for `client`, each with one receipt."""
+    for index in range(count):
+        job = PrintJob.objects.create(
+            client=client, print_type='digital', size='A4', total_amount=Decimal('100'),
+            paid_amount=Decimal('40'), delivery_date=date(2025, 1, 1), issued_by=user,
+        )
+        PaymentReceipt.objects.create(
+            printing=job, receipt_type='printing', total_amount=Decimal('100'),
+            paid_amount=Decimal('40'), payment_method='cash', issued_by=user,
+        )
+        session = PhotoSession.objects.create(
+            client=client, session_date=date(2025, 1, 1 + index % 28), total_amount=Decimal('200'),
+            paid_amount=Decimal('50'), issued_by=user,
+        )
+        PaymentReceipt.objects.create(
+            photography_session=session, receipt_type='photography', total_amount=Decimal('200'),
+            paid_amount=Decimal('50'), payment_method='cash', issued_by=user,
+        )
+
+
+# ===========================================================================
+# حدود الاستعلامات (query_budget) للـ views في الوضع الصارم
+# ===========================================================================
+@override_settings(QUERY_INSPECTOR_ENABLED=True, QUERY_BUDGET_STRICT=True, PROFILING_ENABLED=False)
+class ClientQueryBudgetTests(TestCase):
+    """
+    The per-client endpoints run under QueryInspectorMiddleware in strict mode: a request
+    over ClientViewSet.query_budget raises QueryBudgetExceeded instead of returning 200.
+    The client gets a long history so that an N+1 would cross the budget.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('manager', password='x', is_staff=True)
+        cls.client_obj = Client.objects.create(name='أحمد سالم', phone='0790000001')
+        create_history(cls.client_obj, cls.user, 12)
+
+    def setUp(self):
+        caches['default'].clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def get(self, path):
+        response = self.api.get(path)
+        self.assertEqual(response.status_code, 200, response.content[:300])
+        return response
+
+    def test_dashboard(self):
+        response = self.get(f'/api/clients/{self.client_obj.pk}/dashboard/?page_size=20')
+        self.assertEqual(response.data['print_jobs']['count'], 12)
+        self.assertEqual(response.data['outstanding_balance']['total'], Decimal('12') * 60 + Decimal('12') * 150)
+
+    def test_dashboard_pages_and_timeline(self):
+        response = self.get(f'/api/clients/{self.client_obj.pk}/dashboard/?page_size=5&sessions_page=3&timeline_limit=3')
+        self.assertEqual(len(response.data['print_jobs']['results']), 5)
+        sessions = response.data['photo_sessions']
+        self.assertEqual((sessions['count'], len(sessions['results']), sessions['next']), (12, 2, None))
+        self.assertEqual([len(session['payment_receipts']) for session in sessions['results']], [1, 1])
+        self.assertNotIn('client', sessions['results'][0])
+        self.assertEqual(len(response.data['receipt_timeline']), 3)
+
+    def test_per_client_actions(self):
+        for action in ('printjobs', 'photosessions', 'receipts', 'total-remaining-amount-combined'):
+            with self.subTest(action=action):
+                self.get(f'/api/clients/{self.client_obj.pk}/{action}/')
+
+    def test_autocomplete(self):
+        for term in ('احمد', 'سالم', '0790'):
+            with self.subTest(term=term):
+                response = self.get(f'/api/clients/autocomplete/?q={term}')
+                self.assertEqual([row['id'] for row in response.data['results']], [self.client_obj.pk])
+
+    def test_budget_is_enforced(self):
+        # الـ middleware يقرأ query_budget من الـ view: حد أقل من اللازم يفشل الطلب
+        with mock.patch.object(ClientViewSet, 'query_budget', {'dashboard': 2}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.api.get(f'/api/clients/{self.client_obj.pk}/dashboard/')
+
+    def test_dashboard_queries_do_not_grow_with_history(self):
+        other = Client.objects.create(name='سالم', phone='0790000002')
+        create_history(other, self.user, 1)
+        with assert_max_queries(100) as small:
+            self.get(f'/api/clients/{other.pk}/dashboard/')
+        with assert_max_queries(100) as large:
+            self.get(f'/api/clients/{self.client_obj.pk}/dashboard/?page_size=20')
+        self.assertEqual(small.count, large.count)
+
+
+# ===========================================================================
+# المصادقة بالتوكن المخزنة مؤقتاً وإبطالها
+# ===========================================================================
+class CachedTokenAuthenticationTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        token_cache.clear()
+        self.user = User.objects.create(username='employee')
+        self.profile = Profile.objects.create(user=self.user, role='employee')
+        self.token = Token.objects.create(user=self.user)
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_logout_revokes_cached_token_in_every_process(self):
+        self.assertEqual(self.api.get('/api/current-user/').status_code, 200)
+        with self.assertNumQueries(0):
+            authenticate_key(self.token.key)
+        # ذاكرة عملية أخرى تشترك مع هذه العملية في الذاكرة المؤقتة نفسها
+        other_process = TokenCache()
+        other_process.set(self.token.key, self.token, self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.api.post('/api/logout/').status_code, 200)
+        self.assertEqual(self.api.get('/api/current-user/').status_code, 401)
+        self.assertIsNone(other_process.get(self.token.key))
+
+    def test_role_change_applies_to_cached_token(self):
+        User.objects.create(username='other')
+        self.assertEqual(self.api.get('/api/users/').data['count'], 1)
+        self.profile.role = 'manager'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.save()
+        self.assertEqual(self.api.get('/api/users/').data['count'], 2)
+
+
+# ===========================================================================
+# طلبات GET الشرطية (ETag / Last-Modified)
+# ===========================================================================
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.user = User.objects.create(username='reader')
+        self.client_obj = Client.objects.create(name='عميل')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def assert_not_modified(self, url, **headers):
+        with mock.patch.object(ClientSerializer, 'to_representation', side_effect=AssertionError('serialized')):
+            response = self.api.get(url, headers=headers)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def save(self, instance):
+        with self.captureOnCommitCallbacks(execute=True):
+            instance.save()
+
+    def test_list(self):
+        response = self.api.get('/api/clients/')
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assert_not_modified('/api/clients/', if_none_match=response['ETag'])
+        self.assert_not_modified('/api/clients/', if_modified_since=response['Last-Modified'])
+
+        # طلبات الطباعة تدخل في المبلغ المتبقي لكل عميل (etag_dependencies)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_history(self.client_obj, self.user, 1)
+        changed = self.api.get('/api/clients/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], response['ETag'])
+
+    def test_detail(self):
+        url = f'/api/clients/{self.client_obj.pk}/'
+        response = self.api.get(url)
+        self.assert_not_modified(url, if_none_match=response['ETag'])
+        self.assertNotEqual(self.api.get('/api/clients/')['ETag'], response['ETag'])
+
+        self.client_obj.name = 'عميل معدل'
+        self.save(self.client_obj)
+        changed = self.api.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual((changed.status_code, changed.data['name']), (200, 'عميل معدل'))
+
+
+# ===========================================================================
+# المزامنة التزايدية (?updated_since=) وقائمة المحذوفات
+# ===========================================================================
+class DeltaSyncTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.api = APIClient()
+        self.api.force_authenticate(User.objects.create(username='sync'))
+        self.since = timezone.now() - timedelta(minutes=1)
+
+    def sync(self, since, **params):
+        return self.api.get('/api/clients/', {'updated_since': since.isoformat(), **params})
+
+    def test_changes_and_tombstones(self):
+        unchanged, changed, deleted = (Client.objects.create(name=name) for name in ('ثابت', 'معدل', 'محذوف'))
+        Client.objects.filter(pk=unchanged.pk).update(updated_at=self.since - timedelta(hours=1))
+        deleted_pk = deleted.pk
+        deleted.delete()
+        DeletionLog.objects.create(model_name='client', object_id=unchanged.pk)
+        DeletionLog.objects.filter(object_id=unchanged.pk).update(deleted_at=self.since - timedelta(hours=1))
+
+        response = self.sync(self.since)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data['results']], [changed.pk])
+        self.assertEqual(response.data['deleted'], [deleted_pk])
+        overlap = timedelta(seconds=settings.DELTA_SYNC_OVERLAP_SECONDS)
+        self.assertLessEqual(response.data['sync_timestamp'], timezone.now() - overlap)
+
+    def test_older_than_the_deletion_log_requires_full_sync(self):
+        retention = timedelta(days=settings.DELETION_LOG_RETENTION_DAYS)
+        response = self.sync(timezone.now() - retention - timedelta(hours=1))
+        self.assertEqual(response.status_code, 410)
+        self.assertTrue(response.data['full_sync_required'])
+
+    def test_rejects_filters_and_invalid_timestamps(self):
+        self.assertEqual(self.sync(self.since, name='x').status_code, 400)
+        self.assertEqual(self.api.get('/api/clients/', {'updated_since': 'yesterday'}).status_code, 400)
+
+    def test_prune_deletion_log(self):
+        old, recent = DeletionLog.objects.bulk_create(DeletionLog(model_name='client', object_id=pk) for pk in (1, 2))
+        DeletionLog.objects.filter(pk=old.pk).update(deleted_at=timezone.now() - timedelta(days=31))
+        call_command('prune_deletion_log', days=30, stdout=io.StringIO())
+        self.assertEqual(list(DeletionLog.objects.values_list('object_id', flat=True)), [2])
+
+
+# ===========================================================================
+# تنفيذ عدة طلبات في طلب واحد (/api/batch/)
+# ===========================================================================
+class BatchTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.api = APIClient()
+        self.api.force_authenticate(User.objects.create(username='batch'))
+        self.client_obj = Client.objects.create(name='عميل')
+
+    def batch(self, requests, atomic=False):
+        response = self.api.post('/api/batch/', {'requests': requests, 'atomic': atomic}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return [(entry.get('id'), entry['status']) for entry in response.data['responses']]
+
+    def test_independent_sub_requests(self):
+        statuses = self.batch([
+            {'id': 'read', 'method': 'GET', 'path': f'/api/clients/{self.client_obj.pk}/'},
+            {'id': 'create', 'method': 'POST', 'path': '/api/clients/', 'body': {'name': 'جديد'}},
+            {'id': 'invalid', 'method': 'POST', 'path': '/api/clients/', 'body': {}},
+            {'id': 'missing', 'method': 'GET', 'path': '/api/clients/999999/'},
+        ])
+        self.assertEqual(statuses, [('read', 200), ('create', 201), ('invalid', 400), ('missing', 404)])
+        self.assertTrue(Client.objects.filter(name='جديد').exists())
+
+    def test_atomic_batch_rolls_back_and_skips_the_rest(self):
+        statuses = self.batch([
+            {'method': 'POST', 'path': '/api/clients/', 'body': {'name': 'جديد'}},
+            {'method': 'POST', 'path': '/api/clients/', 'body': {}},
+            {'method': 'GET', 'path': f'/api/clients/{self.client_obj.pk}/'},
+        ], atomic=True)
+        self.assertEqual([status_code for _, status_code in statuses], [201, 400, 424])
+        self.assertFalse(Client.objects.filter(name='جديد').exists())
+
+    def test_refused_sub_requests(self):
+        statuses = self.batch([
+            {'method': 'POST', 'path': '/api/batch/', 'body': {'requests': []}},
+            # نفس العرض بمسار مُرمّز
+            {'method': 'POST', 'path': '/api/%62atch/', 'body': {'requests': []}},
+            {'method': 'GET', 'path': '/api/async/alerts/'},
+            {'method': 'GET', 'path': '/admin/'},
+            {'method': 'GET', 'path': '/api/clients/export/'},
+        ])
+        self.assertEqual([status_code for _, status_code in statuses], [400, 400, 400, 400, 400])
+
+
+# ===========================================================================
+# ذاكرة الاستجابات المؤقتة
+# ===========================================================================
+class ResponseCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user('reader', password='x')
+        cls.writer = User.objects.create_user('writer', password='x')
+        cls.client_obj = Client.objects.create(name='قديم')
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def get_name(self, user):
+        api = APIClient()
+        api.force_authenticate(user)
+        response = api.get(f'/api/clients/{self.client_obj.pk}/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['name']
+
+    def change_name(self, name):
+        # كتابة مؤكدة: البيانات ثم نسخ الوسوم (كما تفعل الإشارات بعد التأكيد)
+        Client.objects.filter(pk=self.client_obj.pk).update(name=name)
+        caching.bump_tags(caching.invalidation_tags(self.client_obj))
+
+    def test_write_between_versions_and_data_is_not_cached(self):
+        original_get_object = GenericAPIView.get_object
+
+        def get_object_then_write(view):
+            instance = original_get_object(view)
+            self.change_name('جديد')
+            return instance
+
+        with mock.patch.object(GenericAPIView, 'get_object', get_object_then_write):
+            self.assertEqual(self.get_name(self.reader), 'قديم')
+        self.assertEqual(self.get_name(self.reader), 'جديد')
+
+    @override_settings(REPLICA_DATABASE_ALIAS='default')
+    def test_writer_does_not_read_replica_entries(self):
+        # 'default' يقوم مقام النسخة المتماثلة: القراءة تتم عبر الاسم المستعار للنسخة
+        self.assertEqual(self.get_name(self.reader), 'قديم')
+        # النسخة متأخرة: المدخل المخزن منها يبقى بنفس نسخ الوسوم بعد كتابة لم تصلها بعد
+        Client.objects.filter(pk=self.client_obj.pk).update(name='جديد')
+        self.assertEqual(self.get_name(self.reader), 'قديم')
+        mark_recent_write(self.writer.pk)
+        self.assertEqual(self.get_name(self.writer), 'جديد')
+
+
+# ===========================================================================
+# موجّه قاعدة البيانات والقراءة من الأساسية بعد الكتابة
+# ===========================================================================
+class PrimaryReplicaRouterTests(TestCase):
+    router = PrimaryReplicaRouter()
+
+    def test_reads_follow_the_selected_alias(self):
+        self.assertIsNone(self.router.db_for_read(Client))
+        with use_replica():
+            # لا توجد نسخة متماثلة في DATABASES: تبقى القراءة على الافتراضية
+            self.assertIsNone(self.router.db_for_read(Client))
+        with override_settings(REPLICA_DATABASE_ALIAS='default'), use_replica():
+            self.assertEqual(self.router.db_for_read(Client), 'default')
+            with use_primary():
+                self.assertIsNone(self.router.db_for_read(Client))
+
+    def test_writes_relations_and_migrations(self):
+        client = Client.objects.create(name='عميل')
+        with override_settings(REPLICA_DATABASE_ALIAS='default'), use_replica():
+            self.assertEqual(self.router.db_for_read(PrintJob, instance=client), 'default')
+            self.assertEqual(self.router.db_for_write(Client), 'default')
+            self.assertFalse(self.router.allow_migrate('default', 'print'))
+        self.assertIsNone(self.router.allow_migrate('default', 'print'))
+
+    @override_settings(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'router-default'},
+                'sticky': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'router-sticky'}},
+        REPLICA_STICKY_CACHE_ALIAS='sticky',
+    )
+    def test_recent_write_marker(self):
+        self.assertFalse(has_recent_write(1))
+        mark_recent_write(1)
+        mark_recent_write(None)
+        self.assertTrue(has_recent_write(1))
+        self.assertFalse(has_recent_write(2))
+        self.assertFalse(has_recent_write(None))
+        self.assertTrue(async_to_sync(ahas_recent_write)(1))
+        self.assertEqual(caches['default'].get(STICKY_CACHE_KEY.format(user_id=1)), None)
+        with override_settings(REPLICA_STICKY_SECONDS=0):
+            mark_recent_write(3)
+        self.assertFalse(has_recent_write(3))
+
+    @override_settings(REPLICA_DATABASE_ALIAS='default')
+    def test_process_local_sticky_cache_is_reported(self):
+        self.assertEqual([warning.id for warning in replica_sticky_cache_check(None)], ['print.W001'])
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': '/tmp/stapi-cache'}}
+        with override_settings(CACHES=shared):
+            self.assertEqual(replica_sticky_cache_check(None), [])
+        with override_settings(REPLICA_DATABASE_ALIAS='replica'):
+            self.assertEqual(replica_sticky_cache_check(None), [])
+
+
+class SyncReplicaTests(TestCase):
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.source = os.path.join(root.name, 'primary.sqlite3')
+        self.target = os.path.join(root.name, 'replica.sqlite3')
+        with closing(sqlite3.connect(self.source)) as source, source:
+            source.execute('CREATE TABLE item (name TEXT)')
+            source.execute("INSERT INTO item VALUES ('نسخة')")
+
+    def sync(self, target):
+        databases = {'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': target}}
+        with mock.patch.dict(connections.databases, databases), \
+                mock.patch.dict(connections.databases['default'], {'NAME': self.source}):
+            call_command('sync_replica', stdout=io.StringIO())
+
+    def test_copies_primary_into_replica(self):
+        self.sync(self.target)
+        with closing(sqlite3.connect(self.target)) as replica:
+            self.assertEqual(replica.execute('SELECT name FROM item').fetchall(), [('نسخة',)])
+
+    def test_refuses_missing_or_same_replica(self):
+        with self.assertRaises(CommandError):
+            call_command('sync_replica', stdout=io.StringIO())
+        with self.assertRaises(CommandError):
+            self.sync(self.source)
+
+
+# ===========================================================================
+# الذاكرة المرجعية داخل العملية (المصورون وباقات التصوير)
+# ===========================================================================
+class ReferenceCacheTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.photographer = Photographer.objects.create(name='سامر')
+        self.cache = ReferenceCache(Photographer, PhotographerSerializer)
+        self.assertEqual(self.cache.get_data(self.photographer.pk)['name'], 'سامر')
+
+    def test_served_from_memory(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.cache.get_object(self.photographer.pk), self.photographer)
+            self.assertEqual([photographer.pk for photographer in self.cache.all()], [self.photographer.pk])
+
+    def test_reloads_when_another_process_bumps_the_version(self):
+        Photographer.objects.filter(pk=self.photographer.pk).update(name='سامر علي')
+        # عملية أخرى حفظت التعديل وغيّرت النسخة المشتركة
+        ReferenceCache(Photographer, PhotographerSerializer).bump()
+        with override_settings(REFERENCE_CACHE_CHECK_INTERVAL=60):
+            self.assertEqual(self.cache.get_data(self.photographer.pk)['name'], 'سامر')
+        with override_settings(REFERENCE_CACHE_CHECK_INTERVAL=0):
+            self.assertEqual(self.cache.get_data(self.photographer.pk)['name'], 'سامر علي')
+
+    @override_settings(REFERENCE_CACHE_CHECK_INTERVAL=60)
+    def test_reloads_once_for_a_row_it_has_not_seen(self):
+        # أُنشئ في عملية أخرى ولم تصل النسخة الجديدة بعد
+        [created] = Photographer.objects.bulk_create([Photographer(name='منى')])
+        self.assertEqual(self.cache.get_object(created.pk).name, 'منى')
+        with self.assertNumQueries(1):
+            self.assertIsNone(self.cache.get_data(created.pk + 1))
+
+
+# ===========================================================================
+# البحث عن العملاء: توحيد الأسماء والإكمال التلقائي
+# ===========================================================================
+class ClientSearchTests(TestCase):
+
+    def test_normalize_name(self):
+        self.assertEqual(normalize_name('  أحـمَد   إبراهيم '), 'احمد ابراهيم')
+        self.assertEqual(normalize_name('فاطمة مصطفى'), 'فاطمه مصطفي')
+        self.assertEqual(normalize_name('John SMITH'), 'john smith')
+        self.assertEqual(digits_only('+962 (79) ٥٥٥'), '96279555')
+        self.assertEqual(name_suffixes('احمد سلمي حمدان'), ['سلمي حمدان', 'حمدان'])
+
+    def test_save_keeps_search_fields(self):
+        client = Client.objects.create(name='أحمد سلمى حمدان', phone='٠٧٩ ١٢٣')
+        self.assertEqual((client.normalized_name, client.phone_digits), ('احمد سلمي حمدان', '079123'))
+        self.assertEqual(set(client.name_suffixes.values_list('suffix', flat=True)), {'سلمي حمدان', 'حمدان'})
+        client.name = 'محمود علي'
+        client.save(update_fields=['name'])
+        self.assertEqual(list(client.name_suffixes.values_list('suffix', flat=True)), ['علي'])
+        self.assertEqual(ClientNameSuffix.objects.count(), 1)
+
+    def test_suffixes_rebuilt_only_when_name_changes(self):
+        client = Client.objects.get(pk=Client.objects.create(name='أحمد سالم').pk)
+        suffix_ids = list(client.name_suffixes.values_list('pk', flat=True))
+        client.address = 'عمان'
+        client.name = 'احمد  سالم'  # نفس الاسم الموحد
+        with self.assertNumQueries(3):  # SAVEPOINT + UPDATE + RELEASE
+            client.save()
+        self.assertEqual(list(client.name_suffixes.values_list('pk', flat=True)), suffix_ids)
+        client.name = 'أحمد خالد'
+        client.save()
+        self.assertEqual(list(client.name_suffixes.values_list('suffix', flat=True)), ['خالد'])
+
+    def test_autocomplete_ranking(self):
+        exact = Client.objects.create(name='سالم')
+        prefix = Client.objects.create(name='سالم أحمد')
+        family = Client.objects.create(name='أحمد سالم')
+        Client.objects.create(name='خالد')
+        self.assertEqual([row['id'] for row in autocomplete('سالم')], [exact.pk, prefix.pk, family.pk])
+        self.assertEqual(len(autocomplete('سالم', limit=2)), 2)
+        self.assertEqual(autocomplete('   '), [])
+
+
+# ===========================================================================
+# لوحة الإدارة للجداول الكبيرة
+# ===========================================================================
+class LargeTableAdminTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_superuser('admin', password='x')
+        for index in range(30):
+            Client.objects.create(name=f'عميل {index}', phone=f'07900{index:05d}')
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=10)
+    def test_estimated_count(self):
+        clients = Client.objects.order_by('-id')
+        self.assertEqual(estimated_row_count(Client, 'default'), 30)
+        self.assertEqual(EstimatedCountPaginator(clients, 10).count, 30)
+        Client.objects.filter(pk=clients.last().pk).delete()
+        # التقدير (MAX - MIN + 1) لا يلاحظ الفجوات، والقائمة المفلترة تُعد بدقة
+        self.assertGreaterEqual(EstimatedCountPaginator(Client.objects.order_by('-id'), 10).count, 29)
+        self.assertEqual(EstimatedCountPaginator(Client.objects.filter(name__startswith='عميل 1'), 10).count, 11)
+
+    def test_changelists(self):
+        self.client.force_login(self.admin_user)
+        for model in ('client', 'printjob', 'paymentreceipt', 'photosession'):
+            with self.subTest(model=model):
+                self.assertEqual(self.client.get(f'/admin/print/{model}/').status_code, 200)
+
+
+# ===========================================================================
+# تعارض مواعيد المصورين
+# ===========================================================================
+class PhotographerConflictTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('employee', password='x')
+        cls.photographer = Photographer.objects.create(name='سامر')
+        cls.client_obj = Client.objects.create(name='عميل')
+        # جلستان متداخلتان حُجزتا قبل إضافة التحقق
+        cls.first, cls.second = [
+            PhotoSession.objects.create(
+                client=cls.client_obj, photographer=cls.photographer, session_date=date(2025, 3, 1),
+                session_time=time(10, 0), duration_minutes=60, total_amount=Decimal('100'),
+            )
+            for _ in range(2)
+        ]
+
+    def setUp(self):
+        caches['default'].clear()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def patch(self, session, data):
+        return self.api.patch(f'/api/photosessions/{session.pk}/', data, format='json')
+
+    def test_status_change_is_not_a_booking(self):
+        response = self.patch(self.first, {'status': 'completed'})
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def test_reschedule_and_reactivation_are_checked(self):
+        self.assertEqual(self.patch(self.first, {'session_time': '10:30'}).status_code, 400)
+        self.assertEqual(self.patch(self.first, {'session_time': '12:00'}).status_code, 200)
+        self.assertEqual(self.patch(self.second, {'status': 'cancelled'}).status_code, 200)
+        self.assertEqual(self.patch(self.second, {'session_time': '12:30'}).status_code, 200)
+        self.assertEqual(self.patch(self.second, {'status': 'scheduled'}).status_code, 400)
+        self.assertEqual(self.patch(self.second, {'status': 'scheduled', 'session_time': '14:00'}).status_code, 200)
+
+
+# ===========================================================================
+# تقويمات iCalendar (.ics) للمصورين والاستوديو
+# ===========================================================================
+class CalendarFeedTests(TestCase):
+
+    def setUp(self):
+        self.client_obj = Client.objects.create(name='عميل التقويم', phone='0790000003')
+        self.photographer, other = Photographer.objects.create(name='سامر'), Photographer.objects.create(name='منى')
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        self.session = self.create_session(self.photographer, tomorrow, notes='ملاحظة طويلة ' * 10)
+        self.other_session = self.create_session(other, tomorrow)
+        self.cancelled = self.create_session(self.photographer, tomorrow, status='cancelled')
+        self.feed = CalendarFeed.objects.create(name='تقويم سامر', photographer=self.photographer)
+
+    def create_session(self, photographer, session_date, **fields):
+        return PhotoSession.objects.create(
+            client=self.client_obj, photographer=photographer, session_date=session_date, session_time=time(10),
+            duration_minutes=60, total_amount=Decimal('100'), **fields,
+        )
+
+    def get(self, feed, **headers):
+        return self.client.get(f'/calendar/{feed.token}.ics', headers=headers)
+
+    def text(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_photographer_and_studio_feeds(self):
+        text = self.text(self.get(self.feed))
+        self.assertTrue(text.startswith('BEGIN:VCALENDAR\r\n') and text.endswith('END:VCALENDAR\r\n'))
+        self.assertIn(f'UID:photosession-{self.session.pk}@', text)
+        self.assertNotIn(f'photosession-{self.other_session.pk}@', text)
+        self.assertNotIn(f'photosession-{self.cancelled.pk}@', text)
+        # الأسطر مطوية عند 75 بايت (RFC 5545)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in text.split('\r\n')))
+
+        studio = CalendarFeed.objects.create(name='الاستوديو')
+        self.assertEqual(self.text(self.get(studio)).count('BEGIN:VEVENT'), 2)
+
+    def test_not_modified_until_a_session_or_client_changes(self):
+        response = self.get(self.feed)
+        self.assertEqual(self.get(self.feed, if_none_match=response['ETag']).status_code, 304)
+
+        self.client_obj.name = 'اسم جديد'
+        self.client_obj.save()
+        changed = self.get(self.feed, if_none_match=response['ETag'])
+        self.assertIn('اسم جديد', self.text(changed).replace('\r\n ', ''))
+
+    def test_inactive_or_unknown_token(self):
+        CalendarFeed.objects.filter(pk=self.feed.pk).update(is_active=False)
+        self.assertEqual(self.get(self.feed).status_code, 404)
+        self.assertEqual(self.client.get('/calendar/unknown.ics').status_code, 404)
+
+
+# ===========================================================================
+# رفع صور الجلسات على أجزاء
+# ===========================================================================
+class PhotoUploadTests(TestCase):
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.enterContext(override_settings(PHOTO_STORAGE_ROOT=Path(root.name)))
+        session = PhotoSession.objects.create(
+            client=Client.objects.create(name='عميل'), session_date=date(2025, 1, 1), total_amount=Decimal('1'),
+        )
+        self.photo = SessionPhoto.objects.create(
+            session=session, original_name='a.jpg', file_path=photos.new_file_path(session.pk, 'a.jpg'), size=10,
+        )
+
+    def test_chunks_and_stale_retry(self):
+        photos.write_chunk(self.photo, 0, 5, io.BytesIO(b'01234'))
+        # إعادة إرسال جزء تم تأكيده (طلب متأخر أو متداخل) لا تلمس الملف الجزئي
+        stale = SessionPhoto.objects.get(pk=self.photo.pk)
+        stale.received_bytes = 0
+        with self.assertRaises(photos.UploadConflict) as conflict:
+            photos.write_chunk(stale, 0, 5, io.BytesIO(b'XXXXX'))
+        self.assertEqual(conflict.exception.received_bytes, 5)
+        with mock.patch.object(photos, 'submit'):
+            photos.write_chunk(self.photo, 5, 5, io.BytesIO(b'56789'))
+        self.assertEqual(photos.absolute_path(self.photo.file_path).read_bytes(), b'0123456789')
+        self.assertEqual(SessionPhoto.objects.get(pk=self.photo.pk).status, 'processing')
+        self.assertEqual(list(photos.absolute_path(self.photo.file_path).parent.iterdir()), [photos.absolute_path(self.photo.file_path)])
+
+    def test_interrupted_chunk(self):
+        with self.assertRaises(photos.UploadConflict):
+            photos.write_chunk(self.photo, 0, 5, io.BytesIO(b'012'))
+        self.assertEqual(SessionPhoto.objects.get(pk=self.photo.pk).received_bytes, 0)
+        photos.write_chunk(self.photo, 0, 5, io.BytesIO(b'01234'))
+        self.assertEqual(photos.absolute_path(f'{self.photo.file_path}.part').read_bytes(), b'01234')
+
+    def test_chunk_is_copied_outside_a_transaction(self):
+        depth = len(connection.atomic_blocks)
+        copy = photos.shutil.copyfileobj
+        copied_in = []
+
+        def copyfileobj(*args):
+            copied_in.append(len(connection.atomic_blocks))
+            return copy(*args)
+
+        with mock.patch.object(photos.shutil, 'copyfileobj', copyfileobj):
+            photos.write_chunk(self.photo, 0, 5, io.BytesIO(b'01234'))
+        self.assertEqual(copied_in, [depth])
+        self.assertEqual(SessionPhoto.objects.get(pk=self.photo.pk).received_bytes, 5)
+
+
+# ===========================================================================
+# أرشفة الطلبات والجلسات المغلقة
+# ===========================================================================
+class ArchiveTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.user = User.objects.create(username='archivist')
+        self.client_obj = Client.objects.create(name='عميل')
+        self.closed = self.create_job('delivered', Decimal('100'))
+        self.unpaid = self.create_job('delivered', Decimal('40'))
+        self.open = self.create_job('in_progress', Decimal('100'))
+        PrintJob.objects.update(updated_at=timezone.now() - timedelta(days=400))
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+
+    def create_job(self, status, paid):
+        job = PrintJob.objects.create(
+            client=self.client_obj, print_type='digital', size='A4', total_amount=Decimal('100'),
+            paid_amount=paid, status=status, delivery_date=date(2024, 1, 1), issued_by=self.user,
+        )
+        PaymentReceipt.objects.create(
+            printing=job, receipt_type='printing', total_amount=Decimal('100'),
+            paid_amount=paid, payment_method='cash', issued_by=self.user,
+        )
+        PrintJob.objects.filter(pk=job.pk).update(paid_amount=paid)
+        return job
+
+    def archive(self):
+        call_command('archive_closed_records', days=365, pause=0, stdout=io.StringIO())
+
+    def test_closed_paid_rows_are_copied_with_receipts(self):
+        receipt = self.closed.payment_receipts.get()
+        self.archive()
+        self.assertEqual(set(PrintJob.objects.values_list('pk', flat=True)), {self.unpaid.pk, self.open.pk})
+        archived = ArchivedPrintJob.objects.get(pk=self.closed.pk)
+        self.assertEqual(
+            (archived.receipt_number, archived.client_id, archived.paid_amount, archived.status),
+            (self.closed.receipt_number, self.client_obj.pk, Decimal('100'), 'delivered'),
+        )
+        self.assertEqual(ArchivedPaymentReceipt.objects.get(pk=receipt.pk).printing_id, self.closed.pk)
+        self.assertFalse(PaymentReceipt.objects.filter(pk=receipt.pk).exists())
+        self.assertTrue(DeletionLog.objects.filter(model_name='printjob', object_id=self.closed.pk).exists())
+
+    def test_include_archived(self):
+        self.archive()
+
+        def ids(query=''):
+            response = self.api.get(f'/api/printjobs/{query}')
+            self.assertEqual(response.status_code, 200)
+            return {row['id'] for row in response.data['results']}
+
+        self.assertEqual(ids(), {self.unpaid.pk, self.open.pk})
+        self.assertEqual(ids('?include_archived=true'), {self.closed.pk, self.unpaid.pk, self.open.pk})
+        self.assertEqual(ids('?include_archived=only'), {self.closed.pk})
+
+        url = f'/api/printjobs/{self.closed.pk}/'
+        self.assertEqual(self.api.get(url).status_code, 404)
+        self.assertEqual(self.api.get(url, {'include_archived': 'true'}).status_code, 200)
+        # السجلات المؤرشفة للقراءة فقط
+        self.assertEqual(self.api.patch(f'{url}?include_archived=true', {'notes': 'x'}).status_code, 404)
+
+
+# ===========================================================================
+# إصلاح paid_amount من الإيصالات
+# ===========================================================================
+class LedgerRepairTests(TestCase):
+
+    def test_repair_publishes_change_events(self):
+        user = User.objects.create(username='cashier')
+        create_history(Client.objects.create(name='عميل'), user, 2)
+        job, other = PrintJob.objects.order_by('pk')
+        PrintJob.objects.filter(pk=job.pk).update(paid_amount=Decimal('99'))
+
+        with mock.patch.object(ledger.change_hub, 'publish') as publish, self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(ledger.repair('printjob'), 1)
+        [(payload,), _] = publish.call_args
+        self.assertEqual((payload['model'], payload['id'], payload['action']), ('printjob', job.pk, 'saved'))
+        self.assertEqual(payload['updated_at'], PrintJob.objects.get(pk=job.pk).updated_at)
+        self.assertEqual(publish.call_count, 1)
+
+
+# ===========================================================================
+# ملفات التصدير الجماعي التي انقطعت بإعادة تشغيل الخادم
+# ===========================================================================
+class RecoverBulkExportsTests(TestCase):
+
+    def test_stale_exports_are_failed(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.enterContext(override_settings(BULK_EXPORT_ROOT=Path(root.name)))
+        stale, recent, done = [BulkExport.objects.create(kind='csv', model_name='printjob', row_count=1) for _ in range(3)]
+        BulkExport.objects.filter(pk=stale.pk).update(status='running', created_at=timezone.now() - timedelta(hours=2))
+        BulkExport.objects.filter(pk=done.pk).update(status='done', file_path='done.csv', created_at=timezone.now() - timedelta(hours=2))
+        for name in ('done.csv', 'partial.csv'):
+            path = Path(root.name) / name
+            path.write_text('x')
+            os.utime(path, (0, 0))
+
+        call_command('recover_bulk_exports', stdout=io.StringIO())
+        self.assertEqual(
+            dict(BulkExport.objects.values_list('pk', 'status')), {stale.pk: 'failed', recent.pk: 'pending', done.pk: 'done'},
+        )
+        self.assertEqual(sorted(path.name for path in Path(root.name).iterdir()), ['done.csv'])
+
+    def run_export(self, export, during=None):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.enterContext(override_settings(BULK_EXPORT_ROOT=Path(root.name)))
+        stream_csv = bulk_exports.exports.stream_csv
+
+        def stream(*args):
+            if during:
+                during()
+            yield from stream_csv(*args)
+
+        # الخيط الخلفي يغلق اتصاله في النهاية، وهذا يُفسد معاملة الاختبار
+        with mock.patch.object(bulk_exports, 'connection'), mock.patch.object(bulk_exports.exports, 'stream_csv', stream):
+            bulk_exports.run_export(export.pk, 'csv', PrintJob, [], 'http://testserver/')
+        export.refresh_from_db()
+        return list(Path(root.name).iterdir())
+
+    def test_export_finishes(self):
+        export = BulkExport.objects.create(kind='csv', model_name='printjob', row_count=0)
+        files = self.run_export(export)
+        self.assertEqual(export.status, 'done')
+        self.assertEqual([path.name for path in files], [export.file_path])
+
+    def test_export_recovered_while_running_stays_failed(self):
+        export = BulkExport.objects.create(kind='csv', model_name='printjob', row_count=0)
+
+        def recover():
+            BulkExport.objects.filter(pk=export.pk).update(status='failed', error='interrupted')
+
+        with self.assertLogs('print.bulk_exports', 'WARNING'):
+            files = self.run_export(export, during=recover)
+        self.assertEqual((export.status, export.error, export.file_path), ('failed', 'interrupted', ''))
+        self.assertEqual(files, [])
+
+    def test_recovered_export_is_not_started(self):
+        export = BulkExport.objects.create(kind='csv', model_name='printjob', row_count=0)
+        BulkExport.objects.filter(pk=export.pk).update(status='failed')
+        self.assertEqual(self.run_export(export), [])
+        self.assertEqual(export.status, 'failed')
+
+
+# ===========================================================================
+# بث التغييرات (SSE) عبر السجل المشترك
+# ===========================================================================
+class ChangeHubTests(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+
+    async def test_events_from_another_process_are_relayed(self):
+        hub = ChangeHub(poll_interval=0.01)
+        subscription, resumed = hub.subscribe()
+        self.addCleanup(subscription.close)
+        # عملية WSGI أخرى: hub منفصل يكتب في نفس الذاكرة المشتركة
+        await sync_to_async(ChangeHub().publish)({'model': 'client', 'id': 1})
+        events, overflowed = await subscription.next_batch(5)
+        self.assertTrue(resumed)
+        self.assertFalse(overflowed)
+        self.assertEqual([payload['id'] for _, _, payload in events], [1])
+
+    async def test_resume_from_last_event_id(self):
+        hub = ChangeHub(poll_interval=0.01)
+        first, _ = hub.subscribe()
+        self.addCleanup(first.close)
+        publisher = ChangeHub()
+        for pk in (1, 2, 3):
+            await sync_to_async(publisher.publish)({'model': 'client', 'id': pk})
+        events = []
+        while len(events) < 3:
+            events += (await first.next_batch(5))[0]
+        second, resumed = hub.subscribe(events[0][1])
+        self.addCleanup(second.close)
+        self.assertTrue(resumed)
+        self.assertEqual([payload['id'] for _, _, payload in (await second.next_batch(0))[0]], [2, 3])
+        third, resumed = hub.subscribe('unknown-5')
+        self.addCleanup(third.close)
+        self.assertFalse(resumed)
+
+    async def test_resume_beyond_buffer_resets(self):
+        hub = ChangeHub(buffer_size=2, poll_interval=0.01)
+        first, _ = hub.subscribe()
+        self.addCleanup(first.close)
+        for pk in (1, 2):
+            await sync_to_async(hub.publish)({'model': 'client', 'id': pk})
+        events = []
+        while len(events) < 2:
+            events += (await first.next_batch(5))[0]
+        stream_id = events[0][1].split('-')[0]
+        for pk in (3, 4, 5):
+            await sync_to_async(hub.publish)({'model': 'client', 'id': pk})
+        while hub._delivered < 5:
+            await asyncio.sleep(0.01)
+        # فاته 4 أحداث (2..5) والمخزن يتسع لحدثين فقط
+        late, resumed = hub.subscribe(f'{stream_id}-1')
+        self.addCleanup(late.close)
+        self.assertFalse(resumed)
+        self.assertEqual((await late.next_batch(0))[0], [])
+
+
+# ===========================================================================
+# مقاييس Prometheus
+# ===========================================================================
+class MetricsTests(TestCase):
+
+    @override_settings(METRICS_TOKEN=None, METRICS_ALLOWED_IPS=[])
+    def test_closed_without_configuration(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='secret', METRICS_ALLOWED_IPS=['10.0.0.0/8'])
+    def test_token_or_allowed_ip(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code, 401)
+        self.assertEqual(self.client.get('/metrics', headers={'Authorization': 'Bearer secret'}).status_code, 200)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.1.2.3').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='secret')
+    async def test_async_requests_are_counted(self):
+        await self.async_client.get('/api/events/')
+        response = await self.async_client.get('/metrics', headers={'Authorization': 'Bearer secret'})
+        self.assertIn('route="change_feed"', response.content.decode())
+
+    async def test_sync_view_queries_are_counted_under_asgi(self):
+        user = await User.objects.acreate(username='metrics', is_staff=True)
+        await self.async_client.aforce_login(user)
+        key = ('stapi_db_queries_per_request', (('route', 'client-list'),))
+        before = metrics.registry.collect().get(key, [0])[-1]
+        response = await self.async_client.get('/api/clients/')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(metrics.registry.collect()[key][-1], before)
+
+
+@override_settings(PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=1.0)
+class RequestProfilingTests(TestCase):
+
+    def test_sync_request(self):
+        self.client.force_login(User.objects.create(username='staff', is_staff=True))
+        with self.assertLogs('print.profiling'):
+            response = self.client.get('/api/clients/')
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+
+    async def test_async_request(self):
+        user = await User.objects.acreate(username='staff', is_staff=True)
+        await self.async_client.aforce_login(user)
+        with self.assertLogs('print.profiling'):
+            response = await self.async_client.get('/api/clients/')
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertIn('view;dur=', response['Server-Timing'])
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    async def test_unsampled_request_passes_through(self):
+        response = await self.async_client.get('/api/events/')
+        self.assertNotIn('Server-Timing', response)
+
+
+class StreamingResponseTests(TestCase):
+
+    @override_settings(STREAM_PULL_BYTES=1)
+    async def test_sync_iterator_is_pulled_not_buffered_under_asgi(self):
+        pulled = []
+
+        def lines():
+            for number in range(3):
+                pulled.append(number)
+                yield f'{number}\n'
+
+        response = exports.StreamingResponse(lines())
+        received = []
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            async for part in response:
+                # كل جزء يصل قبل قراءة الجزء التالي من المولّد
+                self.assertEqual(len(pulled), len(received) + 1)
+                received.append(part)
+        self.assertEqual(b''.join(received), b'0\n1\n2\n')
+
+    async def test_export_streams_database_rows_under_asgi(self):
+        await Client.objects.acreate(name='متدفق', phone='0790000009')
+        queryset = Client.objects.order_by('pk')
+        response = exports.export_response(queryset, ['name', 'phone'], 'csv', 'clients')
+        content = b''.join([part async for part in response]).decode()
+        self.assertIn('متدفق,0790000009', content)
+
+
+# ===========================================================================
+# مخطط OpenAPI المخزن لكل نسخة من الكود
+# ===========================================================================
+class SchemaCacheTests(TestCase):
+
+    def setUp(self):
+        views._schema_cache.clear()
+        self.addCleanup(views._schema_cache.clear)
+
+    def test_spec_is_generated_once_per_host(self):
+        get_schema = OpenAPISchemaGenerator.get_schema
+        with mock.patch.object(OpenAPISchemaGenerator, 'get_schema', autospec=True, side_effect=get_schema) as generate:
+            first = self.client.get('/swagger/?format=openapi')
+            second = self.client.get('/swagger/?format=openapi')
+            not_modified = self.client.get('/swagger/?format=openapi', headers={'If-None-Match': first['ETag']})
+            self.client.get('/swagger/?format=openapi', HTTP_HOST='api.example.com')
+        self.assertEqual((first.status_code, not_modified.status_code), (200, 304))
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(generate.call_count, 2)
+
+    def test_cache_is_bounded(self):
+        with mock.patch.object(views, 'SCHEMA_CACHE_MAX_ENTRIES', 1):
+            for host in ('a.example.com', 'b.example.com'):
+                self.assertEqual(self.client.get('/swagger/?format=openapi', HTTP_HOST=host).status_code, 200)
+        self.assertEqual([key[-1] for key in views._schema_cache], ['b.example.com'])
+
+
+# ===========================================================================
+# بيانات اختبار الحمل (seed_load_data / load_test)
+# ===========================================================================
+class LoadTestDataTests(TestCase):
+
+    def test_seeded_data_is_consistent(self):
+        call_command('seed_load_data', clients=30, seed=7, batch_size=10, stdout=io.StringIO())
+        self.assertEqual(Client.objects.count(), 30)
+        self.assertTrue(PrintJob.objects.exists())
+        # المبالغ المدفوعة مقسمة على الإيصالات: لا فروق في مطابقة الدفعات
+        for model_name in ledger.LEDGER_MODELS:
+            self.assertEqual(ledger.report(model_name)['mismatches'], 0)
+        # حقول البحث تُملأ رغم bulk_create
+        client = Client.objects.first()
+        self.assertEqual([row['id'] for row in autocomplete(client.phone)], [client.pk])
+        self.assertTrue(ClientNameSuffix.objects.filter(client=client).exists())
+
+    def test_mix_and_percentiles(self):
+        self.assertEqual(load_test.parse_mix('list=3,search=1'), {'list': 3.0, 'search': 1.0})
+        for mix in ('unknown=1', 'list=x', 'list=0'):
+            with self.subTest(mix=mix), self.assertRaises(CommandError):
+                load_test.parse_mix(mix)
+        values = list(range(1, 101))
+        self.assertEqual([load_test.percentile(values, pct) for pct in (50, 95, 99)], [50, 95, 99])
+        self.assertIsNone(load_test.percentile([], 50))
+
+    def test_refuses_to_run_without_data(self):
+        User.objects.create(username='load')
+        with self.assertRaises(CommandError):
+            call_command('load_test', mix='open_client=1', requests=1, stdout=io.StringIO())
+
+
+# ===========================================================================
+# تحميل مكتبات PDF عند أول استخدام فقط
+# ===========================================================================
+class LazyRenderingImportTests(SimpleTestCase):
+
+    def test_startup_does_not_import_pdf_libraries(self):
+        # عملية جديدة: هذه العملية ربما حمّلت المكتبات في اختبار آخر
+        code = (
+            'import importlib, sys, django; django.setup(); '
+            'from django.urls import resolve; resolve("/api/clients/"); '
+            '[importlib.import_module(f"print.{name}") for name in ("admin", "bulk_exports", "rendering")]; '
+            'sys.stdout.write(",".join(name for name in ("weasyprint", "qrcode", "PIL") if name in sys.modules))'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', code], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(result.stdout.strip(), '')
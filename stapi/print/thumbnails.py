@@ -0,0 +1,37 @@
+# stapi/print/thumbnails.py
+
+import os
+
+# ===========================================================================
+# توليد الصورة المصغرة والمعاينة لصورة جلسة (يعمل داخل عمليات ProcessPoolExecutor)
+# هذه الوحدة لا تستورد Django ولا النماذج: العمليات الفرعية لا تحتاج django.setup()
+# ===========================================================================
+# وسم EXIF الخاص بالاتجاه: القيم 5-8 تعني أن الصورة مدورة 90 درجة
+_EXIF_ORIENTATION = 0x0112
+
+
+def make_derivatives(source, derivatives, quality=85):
+    """
+    Write a JPEG for every (path, max_side) in `derivatives` from the image at `source`
+    and return its (width, height) as displayed.
+
+    JPEGs are decoded with Image.draft() at the smallest DCT scale (1/2 .. 1/8) that is
+    still larger than the biggest derivative, so a 24 MP original never needs its full
+    size in memory. Files are written next to the target and renamed into place.
+    """
+    from PIL import Image, ImageOps
+
+    largest = max(max_side for _, max_side in derivatives)
+    with Image.open(source) as image:
+        width, height = image.size
+        if image.getexif().get(_EXIF_ORIENTATION) in (5, 6, 7, 8):
+            width, height = height, width
+        image.draft('RGB', (largest, largest))
+        picture = ImageOps.exif_transpose(image).convert('RGB')
+
+    for path, max_side in sorted(derivatives, key=lambda derivative: -derivative[1]):
+        picture.thumbnail((max_side, max_side), Image.LANCZOS)
+        temporary = f'{path}.tmp'
+        picture.save(temporary, 'JPEG', quality=quality, optimize=True)
+        os.replace(temporary, path)
+    return width, height
@@ -2,7 +2,15 @@
 from django.shortcuts import render
 
 # print_management/views.py
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
 from rest_framework import permissions
+from rest_framework.response import Response
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
@@ -32,3 +40,78 @@ schema_view = get_schema_view(
    permission_classes=(permissions.AllowAny,),
 )
 
+
+# ===========================================================================
+# تخزين مخطط OpenAPI في الذاكرة (يُبنى مرة واحدة لكل نسخة من الكود)
+# ===========================================================================
+# المخطط يتضمن اسم المضيف، لكن ALLOWED_HOSTS = ['*']: عدد محدود من المفاتيح (LRU)
+_schema_cache = OrderedDict()
+_schema_cache_lock = threading.Lock()
+SCHEMA_CACHE_MAX_ENTRIES = 8
+# صيغ المخطط نفسه (openapi / .json / .yaml)، وليس صفحات swagger / redoc
+SPEC_FORMATS = ('openapi', 'json', 'yaml')
+
+
+def _cached_schema(key):
+    with _schema_cache_lock:
+        schema = _schema_cache.get(key)
+        if schema is not None:
+            _schema_cache.move_to_end(key)
+        return schema
+
+
+def _store_schema(key, schema):
+    with _schema_cache_lock:
+        _schema_cache[key] = schema
+        _schema_cache.move_to_end(key)
+        while len(_schema_cache) > SCHEMA_CACHE_MAX_ENTRIES:
+            _schema_cache.popitem(last=False)
+
+
+def get_code_version():
+    """
+    STAPI_CODE_VERSION from settings (e.g. the deployed git commit), or a hash of the
+    modification times of the project's Python files when it is not set.
+    """
+    version = getattr(settings, 'STAPI_CODE_VERSION', None)
+    if version:
+        return version
+    stamp = hashlib.md5(usedforsecurity=False)
+    for path in sorted(Path(settings.BASE_DIR).glob('*/*.py')):
+        stamp.update(f'{path}:{path.stat().st_mtime_ns}'.encode())
+    return stamp.hexdigest()[:12]
+
+
+class CachedSchemaView(schema_view):
+    """
+    Same as schema_view, but the spec (?format=openapi, .json, .yaml) is introspected only
+    once per code version and host (the last SCHEMA_CACHE_MAX_ENTRIES kept), then answered
+    from memory with ETag/Cache-Control.
+    """
+    code_version = None
+
+    def get(self, request, version='', format=None):
+        if request.accepted_renderer.format not in SPEC_FORMATS:
+            # صفحة Swagger/ReDoc نفسها لا تحتاج إلى فحص الـ API (تطلب المخطط لاحقاً)
+            return super().get(request, version, format)
+
+        if CachedSchemaView.code_version is None:
+            CachedSchemaView.code_version = get_code_version()
+        version = request.version or version or ''
+        key = (CachedSchemaView.code_version, version, request.scheme, request.get_host())
+        etag = '"%s"' % hashlib.md5(repr(key).encode(), usedforsecurity=False).hexdigest()
+
+        response = get_conditional_response(request._request, etag=etag)
+        if response is None:
+            schema = _cached_schema(key)
+            if schema is None:
+                schema = super().get(request, version, format).data
+                _store_schema(key, schema)
+            response = Response(schema)
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=getattr(settings, 'SCHEMA_CACHE_MAX_AGE', 3600))
+        return response
+
+
+schema_view = CachedSchemaView
+
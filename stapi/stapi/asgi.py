@@ -5,6 +5,30 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Deployment: the project runs as two servers behind nginx (both are in reqer.txt).
+
+- The API, the admin and the PDF/CSV downloads stay on WSGI (stapi/wsgi.py):
+      gunicorn stapi.wsgi:application --workers 4 --threads 4 --bind 127.0.0.1:8000
+  Under ASGI every sync DRF view runs through sync_to_async(thread_sensitive=True),
+  i.e. one at a time per process, so a slow PDF would block every cheap read. Do
+  not route them here. (If they are reached through ASGI anyway, the exports, .ics
+  feeds and file downloads still stream: print/exports.py StreamingResponse pulls
+  them in small batches instead of letting Django read them into memory.)
+- Only the async routes are served by this module:
+      uvicorn stapi.asgi:application --workers 1 --host 127.0.0.1 --port 8001
+  /api/async/ (print/async_views.py) and the change feed /api/events/ (Server-Sent
+  Events). Changes saved by the WSGI workers reach the feed through the log in the
+  shared cache (print/events.py), so CACHES[SSE_CACHE_ALIAS] must be shared between
+  the processes (not locmem); with a shared cache more uvicorn workers also work.
+
+nginx:
+    location /api/async/  { proxy_pass http://127.0.0.1:8001; }
+    location /api/events/ { proxy_pass http://127.0.0.1:8001; proxy_http_version 1.1;
+                            proxy_buffering off; proxy_read_timeout 1h; }
+    location /            { proxy_pass http://127.0.0.1:8000; }
+
+Under WSGI the change feed answers 501 and the frontend keeps polling.
 """
 
 import os
@@ -57,6 +57,9 @@ CORS_ALLOWED_ORIGINS = [
 #CORS_ALLOW_ALL_ORIGINS = True
 
 MIDDLEWARE = [
+    'print.profiling.RequestProfilingMiddleware', # <--- يعمل فقط عند تفعيل PROFILING_ENABLED
+    'print.querylog.QueryInspectorMiddleware', # <--- يعمل فقط عند تفعيل QUERY_INSPECTOR_ENABLED
+    'print.metrics.MetricsMiddleware', # <--- عدادات وزمن الطلبات لكل مسار (/metrics)
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -97,6 +100,24 @@ DATABASES = {
     }
 }
 
+# قاعدة قراءة متماثلة (اختيارية) للتقارير والقوائم وملفات PDF
+# لملف SQLite: شغّل `python manage.py sync_replica --interval 30` لإبقائه محدثاً
+# لقاعدة خادم (PostgreSQL/MySQL): عرّف 'replica' بإعدادات الخادم المتماثل بدون أي تعديل آخر
+if os.environ.get('STAPI_REPLICA_DB'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['STAPI_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['print.db_routers.PrimaryReplicaRouter']
+REPLICA_DATABASE_ALIAS = 'replica'
+# مدة (بالثواني) قراءة المستخدم من القاعدة الأساسية بعد أي عملية كتابة قام بها
+REPLICA_STICKY_SECONDS = 15
+# الذاكرة التي تحفظ علامة "كتب مؤخراً": يجب أن تكون مشتركة بين العمليات (ليست locmem) عند
+# وجود نسخة متماثلة وأكثر من عملية، وإلا قد يقرأ المستخدم بياناته القديمة من عملية أخرى (print.W001)
+REPLICA_STICKY_CACHE_ALIAS = 'default'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -123,7 +144,7 @@ AUTH_PASSWORD_VALIDATORS = [
 # إعدادات Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication', # <--- المصادقة بالتوكن (موصى بها للـ API)
+        'print.authentication.CachedTokenAuthentication', # <--- المصادقة بالتوكن مع تخزين مؤقت (موصى بها للـ API)
         'rest_framework.authentication.SessionAuthentication', # <--- للمتصفحات (للوصول إلى واجهة DRF)
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -145,6 +166,133 @@ REST_FRAMEWORK = {
     ]
 }
 
+# الذاكرة المؤقتة (Cache)
+# locmem خاصة بكل عملية؛ عند تشغيل أكثر من عملية (workers) استخدم ذاكرة مشتركة حتى يصل
+# الإبطال إلى جميع العمليات، مثلاً:
+#   'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': BASE_DIR / 'cache'
+#   'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'stapi_cache' (ثم createcachetable)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'stapi-default',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+RESPONSE_CACHE_ALIAS = 'default' # الذاكرة المستخدمة لاستجابات القوائم والتفاصيل
+RESPONSE_CACHE_TIMEOUT = 300 # مدة الاحتفاظ بالاستجابة بالثواني (الإبطال يتم فوراً عند أي تعديل)
+
+# أقصى مدة (بالثواني) قبل أن تلاحظ كل عملية تعديل باقات التصوير أو المصورين من عملية أخرى
+REFERENCE_CACHE_CHECK_INTERVAL = 1.0
+
+# نسخة الكود المنشورة (مثلاً رقم الـ commit)؛ يُعاد بناء مخطط Swagger/OpenAPI عند تغييرها
+STAPI_CODE_VERSION = os.environ.get('STAPI_CODE_VERSION')
+SCHEMA_CACHE_MAX_AGE = 3600 # مدة احتفاظ المتصفح بمخطط OpenAPI بالثواني
+
+# عدد الصفوف التي تُقرأ من قاعدة البيانات في كل دفعة عند التصدير (CSV / NDJSON)
+EXPORT_CHUNK_SIZE = 2000
+
+# توليد ملفات PDF في الواجهات غير المتزامنة (print/rendering.py)
+PDF_RENDER_WORKERS = 2 # عدد خيوط WeasyPrint في كل عملية
+PDF_RENDER_QUEUE = 16 # عدد الطلبات المسموح لها بالانتظار قبل الرد بـ 503
+RENDERING_PRELOAD = os.environ.get('STAPI_RENDERING_PRELOAD') == '1' # تحميل weasyprint عند بدء العملية بدلاً من أول طلب PDF (مثلاً مع gunicorn --preload)
+ALERT_UPCOMING_DAYS = 7 # عدد الأيام التي يعتبر فيها موعد التسليم قريباً
+
+# بث التغييرات عبر Server-Sent Events (print/events.py)
+# الأحداث تُكتب في سجل على الذاكرة المشتركة وتقرأها عملية ASGI كل SSE_POLL_INTERVAL ثانية:
+# مع أكثر من عملية يجب أن تكون SSE_CACHE_ALIAS ذاكرة مشتركة (وليس locmem)
+SSE_CACHE_ALIAS = 'default'
+SSE_POLL_INTERVAL = 1.0 # تأخير وصول الحدث إلى المتصفح (بالثواني) مقابل عدد قراءات الذاكرة
+SSE_HISTORY_SIZE = 1000 # عدد الأحداث المحفوظة للاستئناف عبر Last-Event-ID
+SSE_HISTORY_SECONDS = 3600 # مدة بقاء كل حدث في السجل المشترك
+SSE_CLIENT_BUFFER_SIZE = 100 # أقصى عدد أحداث في انتظار كل عميل بطيء قبل إرسال reset
+SSE_HEARTBEAT_SECONDS = 15 # فترة رسالة الإبقاء على الاتصال
+SSE_RETRY_MS = 5000 # مدة انتظار المتصفح قبل إعادة الاتصال
+SSE_TICKET_MAX_AGE = 60 # صلاحية تذكرة فتح البث بالثواني (POST /api/events/ticket/)
+
+# المزامنة التزايدية ?updated_since= (DeltaSyncMixin)
+DELETION_LOG_RETENTION_DAYS = 30 # مدة الاحتفاظ بسجل المحذوفات (انظر أمر prune_deletion_log)
+DELTA_SYNC_OVERLAP_SECONDS = 5 # هامش تداخل لتفادي فقدان التعديلات المتزامنة مع الطلب
+
+# أرشفة الطلبات والجلسات المغلقة (manage.py archive_closed_records)
+ARCHIVE_AFTER_DAYS = 365 # تُؤرشف الطلبات المغلقة التي لم تتغير منذ هذه المدة
+ARCHIVE_BATCH_SIZE = 500 # عدد السجلات المنقولة في كل معاملة
+ARCHIVE_CLOSED_STATUSES = ('delivered', 'cancelled')
+
+# لوحة الإدارة: الجداول الأكبر من هذا تُعرض بعدد صفوف تقديري بدلاً من COUNT(*) (print/admin.py)
+ADMIN_EXACT_COUNT_LIMIT = 10000
+# الإجراءات الجماعية (ZIP لمستندات PDF / CSV) في print/bulk_exports.py
+ADMIN_BULK_PDF_INLINE_LIMIT = 25 # أكثر من هذا العدد يُجهز في الخلفية مع رابط تنزيل
+ADMIN_BULK_CSV_INLINE_LIMIT = 5000
+ADMIN_BULK_PDF_WORKERS = 4 # عدد خيوط WeasyPrint لكل عملية تصدير
+ADMIN_BULK_EXPORT_WORKERS = 1 # عدد عمليات التصدير في الخلفية التي تعمل في نفس الوقت
+BULK_EXPORT_ROOT = Path(os.environ.get('STAPI_BULK_EXPORT_ROOT', BASE_DIR / 'exports'))
+
+# الإكمال التلقائي لأسماء العملاء وهواتفهم (print/client_search.py)
+CLIENT_AUTOCOMPLETE_LIMIT = 10 # عدد النتائج الافتراضي
+CLIENT_AUTOCOMPLETE_MAX_LIMIT = 25
+
+# أقصى عدد من الطلبات الفرعية في /api/batch/
+BATCH_MAX_REQUESTS = 20
+
+# صور جلسات التصوير (print/photos.py): رفع على أجزاء + صور مصغرة في مجموعة عمليات
+PHOTO_STORAGE_ROOT = Path(os.environ.get('STAPI_PHOTO_ROOT', BASE_DIR / 'photos'))
+PHOTO_MAX_FILE_SIZE = 100 * 1024 * 1024 # أقصى حجم للصورة الواحدة
+PHOTO_UPLOAD_CHUNK_MAX = 8 * 1024 * 1024 # أقصى حجم لكل جزء (Content-Range)
+PHOTO_ALLOWED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.webp')
+PHOTO_PROCESS_WORKERS = 2 # عدد عمليات Pillow في كل عملية خادم
+PHOTO_THUMBNAIL_SIZE = 320 # أطول ضلع للصورة المصغرة (بكسل)
+PHOTO_PREVIEW_SIZE = 1600 # أطول ضلع لصورة المعاينة (بكسل)
+
+# توفر المصورين وتعارض المواعيد (print/availability.py)
+PHOTO_WORKING_HOURS = ('09:00', '21:00') # بداية ونهاية يوم العمل
+PHOTO_SESSION_DEFAULT_MINUTES = 120 # مدة الجلسة التي لم تُحدد مدتها
+PHOTO_AVAILABILITY_MAX_DAYS = 62 # أقصى نطاق (بالأيام) لطلب /api/photosessions/availability/
+
+# تقويمات iCalendar على /calendar/<token>.ics (print/calendars.py)
+CALENDAR_FEED_PAST_DAYS = 30 # الجلسات السابقة المعروضة في التقويم
+CALENDAR_FEED_FUTURE_DAYS = 365 # الجلسات القادمة المعروضة في التقويم
+CALENDAR_FEED_MAX_AGE = 300 # Cache-Control: max-age (تطبيقات التقويم تعيد الطلب كل بضع دقائق)
+CALENDAR_FEED_UID_DOMAIN = 'stapi' # الجزء الثاني من UID الأحداث (يجب ألا يتغير بعد النشر)
+
+# قياس أداء الطلبات (print/profiling.py): ترويسة Server-Timing + سطر JSON في السجل
+PROFILING_ENABLED = os.environ.get('STAPI_PROFILING') == '1'
+PROFILING_SAMPLE_RATE = float(os.environ.get('STAPI_PROFILING_SAMPLE_RATE', '0.1')) # نسبة الطلبات التي يتم قياسها
+PROFILING_TRACEMALLOC = os.environ.get('STAPI_PROFILING_TRACEMALLOC') == '1' # قياس ذروة الذاكرة (مكلف نسبياً)
+
+# كشف استعلامات N+1 والاستعلامات البطيئة (print/querylog.py) - للتطوير والاختبارات
+QUERY_INSPECTOR_ENABLED = os.environ.get('STAPI_QUERY_INSPECTOR') == '1'
+QUERY_BUDGET_STRICT = os.environ.get('STAPI_QUERY_BUDGET_STRICT') == '1' # رفع استثناء عند تجاوز query_budget
+QUERY_BUDGET_DEFAULT = None # الحد الافتراضي للـ views التي لا تعرّف query_budget (None = بدون حد)
+N_PLUS_ONE_THRESHOLD = 5 # عدد الاستعلامات المتشابهة في نفس الطلب قبل اعتبارها N+1
+SLOW_QUERY_MS = 100 # الاستعلامات الأبطأ من هذا تُسجل مع معاملاتها
+
+# مقاييس Prometheus على /metrics (print/metrics.py)
+METRICS_ENABLED = os.environ.get('STAPI_METRICS', '1') == '1'
+METRICS_DIR = os.environ.get('STAPI_METRICS_DIR') # مجلد مشترك بين عمليات gunicorn/uvicorn (ملف لكل عملية)، بدونه تُعرض قيم العملية الحالية فقط
+METRICS_FLUSH_INTERVAL = 5 # كل كم ثانية تكتب العملية قيمها إلى METRICS_DIR
+METRICS_TOKEN = os.environ.get('STAPI_METRICS_TOKEN') # إذا تم تعيينه يجب أن يرسل Prometheus الترويسة Authorization: Bearer <token>
+# عناوين (أو شبكات CIDR) مسموح لها بقراءة /metrics بدون توكن، مثل 127.0.0.1,10.0.0.0/8
+# بدون توكن وبدون عناوين يبقى /metrics مغلقاً (403)؛ خلف reverse proxy يكون REMOTE_ADDR عنوان الـ proxy
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get('STAPI_METRICS_ALLOWED_IPS', '').split(',') if ip.strip()]
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'print': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
+# ذاكرة التوكنات المؤقتة لـ CachedTokenAuthentication (داخل كل عملية)
+AUTH_TOKEN_CACHE_SIZE = 1024 # أقصى عدد من التوكنات المخزنة
+# مدة صلاحية كل مدخل بالثواني. الإلغاء (خروج، تعطيل، تغيير دور) يصل فوراً لكل العمليات فقط إذا كانت
+# AUTH_TOKEN_CACHE_ALIAS ذاكرة مشتركة (Redis/Memcached/DB)؛ مع locmem هذه المدة هي أقصى تأخير في العمليات الأخرى
+AUTH_TOKEN_CACHE_TTL = 5
+AUTH_TOKEN_CACHE_ALIAS = 'default' # الذاكرة التي تُحفظ فيها نسخة صلاحيات كل مستخدم
+
 # إعدادات لملفات Static
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles' # <--- مجلد تجميع الـ static files في الإنتاج
@@ -5,6 +5,9 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework.authtoken import views as auth_views
 from print import api_views # تأكد من أن هذا الاستيراد صحيح
+from print import async_views
+from print import metrics
+from print import calendars
 
     # استيراد schema_view مباشرة من print.views
 from print.views import schema_view
@@ -19,6 +22,8 @@ router.register(r'users', api_views.UserViewSet)
 router.register(r'photographypackages', api_views.PhotographyPackageViewSet)
 router.register(r'photographers', api_views.PhotographerViewSet)
 router.register(r'photosessions', api_views.PhotoSessionViewSet)
+router.register(r'session-photos', api_views.SessionPhotoViewSet)
+router.register(r'calendar-feeds', api_views.CalendarFeedViewSet)
 
 
 urlpatterns = [
@@ -29,6 +34,26 @@ urlpatterns = [
     path('api/logout/', api_views.LogoutView.as_view(), name='api_logout'),
         # NEW: مسار مخصص لبيانات المستخدم الحالي
     path('api/current-user/', api_views.CurrentUserView.as_view(), name='current_user'), # إضافة هذا السطر
+        # تنفيذ عدة طلبات API في طلب واحد
+    path('api/batch/', api_views.BatchView.as_view(), name='api_batch'),
+        # مطابقة المبالغ المدفوعة مع مجموع إيصالات الدفع
+    path('api/ledger/reconciliation/', api_views.LedgerReconciliationView.as_view(), name='ledger_reconciliation'),
+
+        # مسارات القراءة غير المتزامنة (تعمل بكفاءة عند التشغيل عبر ASGI)
+    path('api/async/clients/lookup/', async_views.client_lookup, name='async_client_lookup'),
+    path('api/async/printjobs/<int:pk>/', async_views.printjob_detail, name='async_printjob_detail'),
+    path('api/async/photosessions/<int:pk>/', async_views.photosession_detail, name='async_photosession_detail'),
+    path('api/async/receipts/<int:pk>/pdf/', async_views.payment_receipt_pdf, name='async_payment_receipt_pdf'),
+    path('api/async/alerts/', async_views.alerts, name='async_alerts'),
+    path('api/async/reports/', async_views.reports, name='async_reports'),
+    path('api/events/', async_views.change_feed, name='change_feed'),
+    path('api/events/ticket/', async_views.change_feed_ticket, name='change_feed_ticket'),
+
+        # مقاييس Prometheus
+    path('metrics', metrics.metrics_view, name='metrics'),
+
+        # تقويمات iCalendar للمصورين والاستوديو (الرمز في الرابط هو المصادقة)
+    path('calendar/<str:token>.ics', calendars.calendar_feed, name='calendar_feed'),
 
         # مسار لتوثيق Swagger/OpenAPI
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
@@ -5,6 +5,9 @@ It exposes the WSGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
+
+This serves the whole API (gunicorn, see the deployment notes in stapi/asgi.py);
+only /api/async/ and /api/events/ are routed to the ASGI server.
 """
 
 import os